@@ -1,171 +1,701 @@
 import os
 import json
 import random
+import hashlib
 import numpy as np
-import requests
-from PIL import Image
 from io import BytesIO
-import traceback
-import torch
-from transformers import CLIPProcessor, CLIPModel
+import time
+import logging
+from collections import deque
+from itertools import islice
+
+from card_catalog import card_key, shared_catalog
+from logs import get_logger
+from native_threads import NativeThreadPool, start_native_thread
+
+# [Logging] 카드/단어 선택 로그는 AI 턴마다 찍히므로 DEBUG (LOG_LEVEL=DEBUG에서만 문자열을 만듦)
+log = get_logger('ai_engine')
 
 # ==========================================
 # [설정] AI 엔진 설정
 # ==========================================
-CACHE_FILE = "ai_cache_v2.npz"
+# [Cache] 정규화된 행렬(raw, memmap 가능) + JSON 인덱스. pickle 없음.
+CACHE_DIR = os.getenv('AI_CACHE_DIR', os.path.dirname(os.path.abspath(__file__)))
+CACHE_PREFIX = "ai_cache_v4"
+CACHE_INDEX_FILE = f"{CACHE_PREFIX}.json"
+CACHE_VERSION = 4
+LEGACY_CACHE_FILE = "ai_cache_v2.npz"
 MODEL_NAME = 'clip-ViT-B-32-multilingual-v1'
+IMAGE_MODEL_NAME = 'openai/clip-vit-base-patch32'
+# [Storyteller] 단어 선택 정책 (코사인 유사도 구간)
+SWEET_SPOT_RANGE = (0.4, 0.7)   # 너무 뻔하지도, 너무 뜬금없지도 않은 구간
+TOO_UNRELATED_BELOW = 0.35      # 최고점이 이보다 낮으면 리롤
+TOO_OBVIOUS_ABOVE = 0.85        # 최고점이 이보다 높으면 리롤
+# [Perf] 이미지 임베딩 파이프라인 (디코딩 워커 수 / CLIP 배치 크기)
+IMAGE_LOAD_WORKERS = max(1, int(os.getenv('AI_IMAGE_LOAD_WORKERS', 4)))
+IMAGE_BATCH_SIZE = max(1, int(os.getenv('AI_IMAGE_BATCH_SIZE', 16)))
+# [Runtime] 엔진 모드
+# - auto: 임베딩 아티팩트가 현재 단어/카드를 모두 포함하면 모델 없이 로드, 아니면 모델을 로드해 delta 빌드
+# - artifact: 아티팩트만 로드 (torch/transformers를 import하지 않음. 빠진 항목은 랜덤 모드)
+# - full: 항상 모델을 로드하고 캐시를 검증/갱신
+AI_ENGINE_MODE = os.getenv('AI_ENGINE_MODE', 'auto').lower()
+# [Memory] 임베딩 저장 정밀도 (float32 | float16 | int8)
+# - float16: 행렬/유사도 테이블 절반 크기
+# - int8: 행별 scale(float32)과 함께 저장, 행렬 1/4 크기. 채점은 int32 누적 후 scale을 곱함
+# 정밀도 차이로 인한 선택 변화는 verify_quantization.py로 확인할 수 있습니다.
+EMBEDDING_DTYPE = os.getenv('AI_EMBEDDING_DTYPE', 'float32').lower()
+EMBEDDING_DTYPES = {'float32': np.float32, 'float16': np.float16, 'int8': np.int8}
+EMBEDDING_SUFFIX = {'float32': 'f32', 'float16': 'f16', 'int8': 'i8'}
+SCORE_DTYPES = {'float32': np.float32, 'float16': np.float16, 'int8': np.float16}
+PRECISION_RANK = {'int8': 0, 'float16': 1, 'float32': 2}
 
 class AIEngine:
-    def __init__(self, card_list_file, static_cards_path, word_pool, external_image_url):
+    def __init__(self, card_list_file, static_cards_path, word_pool, external_image_url, card_catalog=None):
         self.is_ready = False
         self.model = None
-        self.word_embeddings = {}
-        self.card_embeddings = {}
+        # [Perf] 스코어링용 정규화 행렬 + 정수 id 맵 (_build_index에서 생성)
+        self.card_index = {}
+        self.card_matrix = np.zeros((0, 0), dtype=np.float32)
+        self.word_keys = []
+        self.word_index = {}
+        self.word_matrix = np.zeros((0, 0), dtype=np.float32)
+        # [Memory] int8 저장 시 행별 scale (float 저장이면 None)
+        self.card_scales = None
+        self.word_scales = None
+        # [Perf] 카드×단어 유사도 테이블 + 카드별 구간(sweet spot/too obvious/too unrelated) 인덱스
+        self.score_table = np.zeros((0, 0), dtype=np.float32)
+        self.sweet_spot_words = []
+        self.obvious_words = []
+        self.unrelated_words = []
+        self._card_row_cache = {}
+        self.embedding_failures = {}
         self.card_list_file = card_list_file
         self.static_cards_path = static_cards_path
+        # [Card Catalog] 카드 목록/임베딩 키는 app.py와 같은 프로세스 공용 카탈로그에서 가져옴
+        self.card_catalog = card_catalog or shared_catalog(card_list_file, static_cards_path, external_image_url)
         # [I18n] Extract Korean words for embedding generation if input is list of dicts
         self.word_pool = [w['ko'] if isinstance(w, dict) else w for w in word_pool]
+        # 리롤 시 원본 단어 객체({'ko', 'en'})를 돌려주기 위한 역참조
+        self.word_objects = {}
+        for w in word_pool:
+            self.word_objects.setdefault(w['ko'] if isinstance(w, dict) else w, w)
         self.external_image_url = external_image_url
         
-        print("🤖 [AI Engine] Initializing...")
+        # [Warmup] 모델 로드/캐시 준비는 warmup()에서 수행 (서버는 그동안 랜덤 모드로 동작)
+        self.state = 'idle'
+        self.progress = {'phase': None, 'done': 0, 'total': 0}
+        self.error = None
+        self._warmup_started_at = None
+        self._warmup_finished_at = None
+        self._warmup_thread = None
+
+    def start_warmup(self):
+        """백그라운드 스레드에서 warmup()을 시작합니다. 이미 시작했다면 아무것도 하지 않습니다."""
+        if self._warmup_thread is not None:
+            return self._warmup_thread
+        # [Cluster] eventlet 패치 아래에서도 OS 스레드에서 실행 (모델 로드/인코딩이 허브와 lease heartbeat를 막지 않도록)
+        self._warmup_thread = start_native_thread(self.warmup, name='ai-engine-warmup')
+        return self._warmup_thread
+
+    def warmup(self, mode=None):
+        """모델을 로드하고 임베딩 캐시를 준비합니다. 완료되면 is_ready가 True로 바뀝니다."""
+        mode = (mode or AI_ENGINE_MODE)
+        self._warmup_started_at = time.time()
+        log.info("🤖 [AI Engine] Initializing... (mode: %s)", mode)
         try:
-            from sentence_transformers import SentenceTransformer
-            from transformers import CLIPProcessor, CLIPModel
-            import torch
+            if mode != 'full' and self._load_artifact(strict=(mode == 'artifact')):
+                log.info("📦 [AI Engine] Loaded embedding artifact (no inference models).")
+            else:
+                try:
+                    self._load_models()
+                except ImportError as e:
+                    # 슬림 컨테이너(auto): 모델 패키지가 없으면 오래된 아티팩트라도 사용
+                    if mode != 'auto':
+                        raise
+                    log.warning("⚠️ [AI Engine] Inference packages unavailable (%s). Using artifact as-is.", e)
+                    self._load_artifact(strict=True)
+                else:
+                    self._set_state('building_cache')
+                    self._load_or_generate_cache()
 
-            print(f"📥 [AI Engine] Loading Text model '{MODEL_NAME}'...")
-            self.text_model = SentenceTransformer(MODEL_NAME)
-            
-            print(f"📥 [AI Engine] Loading Image model 'openai/clip-vit-base-patch32' via Transformers...")
-            self.image_model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
-            self.image_processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
-            
             self.is_ready = True
-            print("✅ [AI Engine] Models loaded successfully.")
-            
-            self._load_or_generate_cache()
+            self._set_state('ready')
+            log.info("✅ [AI Engine] Ready in %.1fs.", time.time() - self._warmup_started_at)
             
         except Exception as e:
-            print(f"⚠️ [AI Engine] Failed to load AI model. Falling back to Random Mode.")
-            print(f"   Error: {e}")
-            traceback.print_exc()
+            log.exception("⚠️ [AI Engine] Failed to load AI model. Falling back to Random Mode. (%s)", e)
             self.is_ready = False
+            self.error = str(e)
+            self._set_state('failed')
+        finally:
+            self._warmup_finished_at = time.time()
+
+    def _load_models(self):
+        # 무거운 의존성은 빌드가 필요할 때만 import (artifact 모드에서는 로드되지 않음)
+        from sentence_transformers import SentenceTransformer
+        from transformers import CLIPProcessor, CLIPModel
+
+        self._set_state('loading_models')
+        log.info("📥 [AI Engine] Loading Text model '%s'...", MODEL_NAME)
+        self.text_model = SentenceTransformer(MODEL_NAME)
+        
+        log.info("📥 [AI Engine] Loading Image model '%s' via Transformers...", IMAGE_MODEL_NAME)
+        self.image_model = CLIPModel.from_pretrained(IMAGE_MODEL_NAME)
+        self.image_processor = CLIPProcessor.from_pretrained(IMAGE_MODEL_NAME)
+        log.info("✅ [AI Engine] Models loaded successfully.")
+
+    def _load_artifact(self, strict):
+        """
+        오프라인 빌드된 임베딩 아티팩트만으로 인덱스를 구성합니다.
+        strict가 아니면(auto) 현재 단어/카드를 모두 포함하고 모델이 같을 때만 사용하고, 아니면 False를 반환합니다.
+        """
+        self._set_state('loading_artifact')
+        try:
+            meta, matrix, scales, scores = self._open_cache()
+            if scores is None:
+                raise ValueError("score table missing")
+        except Exception as e:
+            if strict:
+                raise
+            log.warning("⚠️ [AI Engine] No usable artifact (%s). Building with models...", e)
+            return False
+
+        cached_words = set(meta['words'])
+        missing_words = [w for w in dict.fromkeys(self.word_pool) if w not in cached_words]
+        missing_cards = [c for c in self._list_cards() if c not in meta['card_ids']]
+        models_match = meta['text_model'] == MODEL_NAME and meta['image_model'] == IMAGE_MODEL_NAME
+        if missing_words or missing_cards or not models_match:
+            log.warning("⚠️ [AI Engine] Artifact is stale (%d words, %d cards missing, models match: %s).",
+                        len(missing_words), len(missing_cards), models_match)
+            if not strict:
+                return False
+            log.warning("⚠️ [AI Engine] Missing items will use Random Mode. Run build_embeddings.py to refresh the artifact.")
+
+        self._index_cache(meta, matrix, scales, scores)
+        return True
+
+    def _list_cards(self):
+        """카드 목록 (card_list.json 우선, 없으면 static 폴더). 카탈로그가 읽어 둔 것을 사용합니다."""
+        return list(self.card_catalog.ids)
+
+    def _set_state(self, state, phase=None, total=0):
+        self.state = state
+        self.progress = {'phase': phase or state, 'done': 0, 'total': total}
+
+    def status(self):
+        """/api/health 용 엔진 상태 요약."""
+        started = self._warmup_started_at
+        elapsed = None
+        if started:
+            elapsed = round((self._warmup_finished_at or time.time()) - started, 2)
+        return {
+            'state': self.state,
+            'ready': self.is_ready,
+            'progress': dict(self.progress),
+            'elapsed': elapsed,
+            'words': len(self.word_index),
+            'cards': len(self.card_index),
+            'error': self.error,
+        }
 
     def _load_or_generate_cache(self):
-        """캐시를 로드하거나 새로 생성합니다."""
-        if not self.is_ready: return
+        """
+        캐시를 로드하고 변경분(delta)만 임베딩합니다.
+        - 단어: (텍스트 모델, 단어) 단위로 재사용
+        - 카드: (이미지 모델, 이미지 내용 해시) 단위로 재사용
+        추가된 항목만 새로 계산하고, 사라진 항목은 캐시에서 제거합니다.
+        """
 
         # 카드 목록 로드
-        all_cards = []
-        if os.path.exists(self.card_list_file):
-            with open(self.card_list_file, 'r', encoding='utf-8') as f:
-                all_cards = json.load(f)
+        all_cards = self._list_cards()
+
+        cache = self._read_cache()
+        words = list(dict.fromkeys(self.word_pool))
+
+        # 1. 단어: 캐시에 없는 단어만 임베딩
+        cached_words = cache['words']
+        missing_words = [w for w in words if w not in cached_words]
+        if missing_words:
+            log.info("⚙️ [AI Engine] Embedding %d new word(s)...", len(missing_words))
+            self._set_state('building_cache', 'words', len(missing_words))
+            word_vecs = self.text_model.encode(missing_words)
+            self.progress['done'] = len(missing_words)
+            for word, vec in zip(missing_words, word_vecs):
+                cached_words[word] = np.asarray(vec, dtype=np.float32)
+
+        # 2. 카드: 내용 해시가 바뀌었거나 처음 보는 카드만 임베딩
+        card_hashes = {}
+        unresolved = []
+        new_card_vectors = 0
+        for card_id in all_cards:
+            known_hash = cache['card_ids'].get(card_id)
+            local_path = os.path.join(self.static_cards_path, card_id)
+            # 외부 URL 카드는 파일명 단위로 버전 관리되므로 기존 해시를 신뢰 (로컬 파일은 항상 재검증)
+            if known_hash in cache['cards'] and not os.path.exists(local_path):
+                card_hashes[card_id] = known_hash
+            else:
+                unresolved.append(card_id)
+
+        if unresolved:
+            log.info("⚙️ [AI Engine] Resolving %d card(s)...", len(unresolved))
+            self._set_state('building_cache', 'cards', len(unresolved))
+            vectors, hashes, failures = self._embed_cards(unresolved, known=cache['cards'], legacy=cache['legacy_cards'])
+            new_card_vectors = len(vectors)
+            for card_id, content_hash in hashes.items():
+                card_hashes[card_id] = content_hash
+                if card_id in vectors:
+                    cache['cards'][content_hash] = vectors[card_id]
+            self.embedding_failures = failures
+            if failures:
+                log.warning("⚠️ [AI Engine] %d card(s) failed to embed", len(failures))
+                for card_id, reason in failures.items():
+                    log.warning("⚠️ [AI Engine] Card %s: %s", card_id, reason)
+
+        # 3. 현재 단어/카드만 남기고 정리 (prune)
+        word_store = {w: cached_words[w] for w in words if w in cached_words}
+        live_hashes = set(card_hashes.values())
+        pruned_words = len(cached_words) - len(word_store)
+        pruned_cards = len([h for h in cache['cards'] if h not in live_hashes])
+        card_store = {h: v for h, v in cache['cards'].items() if h in live_hashes}
+        card_hashes = {c: h for c, h in card_hashes.items() if h in card_store}
+
+        changed = (missing_words or new_card_vectors or pruned_words or pruned_cards
+                   or cache['card_ids'] != card_hashes or cache['scores'] is None or cache['dtype'] != EMBEDDING_DTYPE)
+        if changed:
+            log.info("🔄 [AI Engine] Cache delta: +%d words, +%d cards, -%d words, -%d cards pruned.",
+                     len(missing_words), new_card_vectors, pruned_words, pruned_cards)
+            try:
+                self._write_cache(word_store, card_store, card_hashes, previous=cache)
+            except Exception as e:
+                log.warning("⚠️ [AI Engine] Failed to save cache: %s", e)
         else:
-            if os.path.exists(self.static_cards_path):
-                all_cards = [f for f in os.listdir(self.static_cards_path) 
-                             if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
+            log.info("✅ [AI Engine] Cache is up to date.")
 
-        # 캐시 확인
-        cache_path = os.path.join(os.path.dirname(__file__), CACHE_FILE)
-        cache_valid = False
-        
-        if os.path.exists(cache_path):
+        # 4. 캐시 파일을 읽기 전용 memmap으로 열어 스코어링에 직접 사용 (프로세스 간 페이지 캐시 공유)
+        try:
+            meta, matrix, scales, scores = self._open_cache()
+            if scores is None:
+                raise ValueError("score table missing")
+            self._index_cache(meta, matrix, scales, scores)
+        except Exception as e:
+            log.warning("⚠️ [AI Engine] Cache not mappable (%s). Using in-memory embeddings.", e)
+            word_matrix = self._stack_rows(word_store.values())
+            card_matrix = self._stack_rows(card_store.values())
+            self._build_index(list(word_store), word_matrix, card_hashes, list(card_store), card_matrix,
+                              self._score_table(card_matrix, word_matrix))
+
+    def _open_cache(self):
+        """
+        인덱스(JSON)를 읽고 행렬 파일과 유사도 테이블을 읽기 전용으로 memmap 합니다.
+        (meta, matrix, scales, scores)를 반환합니다. scales는 int8일 때만, 테이블이 없으면 scores는 None.
+        """
+        with open(os.path.join(CACHE_DIR, CACHE_INDEX_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        dtype = meta.get('dtype')
+        if meta.get('version') != CACHE_VERSION or dtype not in EMBEDDING_DTYPES:
+            raise ValueError(f"unsupported cache version {meta.get('version')} ({dtype})")
+
+        rows = len(meta['words']) + len(meta['cards'])
+        dim = int(meta['dim'])
+        matrix_dtype = np.dtype(EMBEDDING_DTYPES[dtype])
+        matrix_path = os.path.join(CACHE_DIR, meta['matrix_file'])
+        expected = rows * dim * matrix_dtype.itemsize
+        if os.path.getsize(matrix_path) != expected:
+            raise ValueError(f"{meta['matrix_file']} size mismatch (expected {expected} bytes)")
+        if rows == 0:
+            return meta, np.zeros((0, dim), dtype=matrix_dtype), None, None
+        matrix = np.memmap(matrix_path, dtype=matrix_dtype, mode='r', shape=(rows, dim))
+
+        scales = None
+        if dtype == 'int8':
+            scale_path = os.path.join(CACHE_DIR, meta['scale_file'])
+            if os.path.getsize(scale_path) != rows * np.dtype(np.float32).itemsize:
+                raise ValueError(f"{meta['scale_file']} size mismatch")
+            scales = np.memmap(scale_path, dtype=np.float32, mode='r', shape=(rows,))
+
+        scores = None
+        shape = (len(meta['cards']), len(meta['words']))
+        score_dtype = np.dtype(SCORE_DTYPES[dtype])
+        score_path = os.path.join(CACHE_DIR, meta.get('score_file') or '')
+        if meta.get('score_file') and os.path.exists(score_path):
+            if os.path.getsize(score_path) == shape[0] * shape[1] * score_dtype.itemsize and all(shape):
+                scores = np.memmap(score_path, dtype=score_dtype, mode='r', shape=shape)
+        return meta, matrix, scales, scores
+
+    def _index_cache(self, meta, matrix, scales, scores):
+        """_open_cache 결과를 [단어 행 | 카드 행]으로 나눠 인덱스를 구성합니다."""
+        n_words = len(meta['words'])
+        word_scales = card_scales = None
+        if scales is not None:
+            word_scales, card_scales = scales[:n_words], scales[n_words:]
+        self._build_index(meta['words'], matrix[:n_words], meta['card_ids'], meta['cards'], matrix[n_words:], scores,
+                          word_scales=word_scales, card_scales=card_scales)
+
+    def _read_cache(self):
+        """
+        캐시를 읽습니다. 모델이 바뀐 쪽은 버립니다. float32 캐시의 벡터는 memmap 행 뷰로 반환됩니다 (복사 없음).
+        양자화된 캐시는 float32로 복원해 재사용하되, 설정보다 정밀도가 낮으면 버리고 다시 임베딩합니다.
+        구버전(v2) 캐시가 있으면 단어와 카드 벡터를 이관용으로 가져옵니다.
+        """
+        cache = {'words': {}, 'cards': {}, 'card_ids': {}, 'legacy_cards': {}, 'scores': None, 'meta': None, 'dtype': None}
+
+        if os.path.exists(os.path.join(CACHE_DIR, CACHE_INDEX_FILE)):
             try:
-                print(f"📂 [AI Engine] Loading cache from {CACHE_FILE}...")
-                data = np.load(cache_path, allow_pickle=True)
-                cached_words = data['words']
-                cached_cards = data['cards']
-                self.word_embeddings = data['word_embeddings'].item()
-                self.card_embeddings = data['card_embeddings'].item()
-                
-                # 데이터 변경 확인 (간단하게 개수와 첫/마지막 아이템으로 비교)
-                if (set(cached_words) == set(self.word_pool)) and (set(cached_cards) == set(all_cards)):
-                    print("✅ [AI Engine] Cache is up to date.")
-                    cache_valid = True
-                else:
-                    print("🔄 [AI Engine] Data changed. Rebuilding cache...")
+                log.info("📂 [AI Engine] Loading cache from %s...", CACHE_INDEX_FILE)
+                meta, matrix, scales, scores = self._open_cache()
+                cache['dtype'] = meta['dtype']
+                if PRECISION_RANK[meta['dtype']] < PRECISION_RANK.get(EMBEDDING_DTYPE, 2):
+                    log.warning("⚠️ [AI Engine] Cache is %s but %s requested. Re-embedding...", meta['dtype'], EMBEDDING_DTYPE)
+                    return cache
+                if meta['dtype'] != 'float32':
+                    matrix = self._dequantize_rows(matrix, scales)
+                n_words = len(meta['words'])
+                if meta['text_model'] == MODEL_NAME:
+                    cache['words'] = {w: matrix[i] for i, w in enumerate(meta['words'])}
+                if meta['image_model'] == IMAGE_MODEL_NAME:
+                    cache['cards'] = {h: matrix[n_words + i] for i, h in enumerate(meta['cards'])}
+                cache['card_ids'] = dict(meta['card_ids'])
+                if meta['text_model'] == MODEL_NAME and meta['image_model'] == IMAGE_MODEL_NAME:
+                    cache['scores'] = scores
+                    cache['meta'] = meta
+                return cache
             except Exception as e:
-                print(f"⚠️ [AI Engine] Cache corrupted. Rebuilding... ({e})")
+                log.warning("⚠️ [AI Engine] Cache corrupted. Rebuilding... (%s)", e)
 
-        if not cache_valid:
-            print("⚙️ [AI Engine] Generating embeddings... (This may take a few minutes)")
-            self._generate_embeddings(all_cards)
-            
-            # 캐시 저장
-            print(f"💾 [AI Engine] Saving cache to {CACHE_FILE}...")
-            np.savez_compressed(
-                cache_path, 
-                words=self.word_pool, 
-                cards=all_cards, 
-                word_embeddings=self.word_embeddings, 
-                card_embeddings=self.card_embeddings
-            )
-            print("✅ [AI Engine] Cache saved.")
-
-    def _generate_embeddings(self, all_cards):
-        """단어와 이미지의 임베딩을 생성합니다."""
-        
-        # 1. 단어 임베딩
-        print(f"   Running text embeddings for {len(self.word_pool)} words...")
-        word_vecs = self.text_model.encode(self.word_pool)
-        for i, word in enumerate(self.word_pool):
-            self.word_embeddings[word] = word_vecs[i]
-            
-        # 2. 이미지 임베딩
-        print(f"   Running image embeddings for {len(all_cards)} cards...")
-        processed_count = 0
+        legacy_path = os.path.join(CACHE_DIR, LEGACY_CACHE_FILE)
+        if os.path.exists(legacy_path):
+            try:
+                # 구버전은 dict pickle 포맷이라 이관 시 한 번만 읽습니다 (저장소에 포함된 신뢰 가능한 파일)
+                log.info("📂 [AI Engine] Migrating legacy cache %s...", LEGACY_CACHE_FILE)
+                data = np.load(legacy_path, allow_pickle=True)
+                cache['words'] = {w: np.asarray(v, dtype=np.float32) for w, v in data['word_embeddings'].item().items()}
+                cache['legacy_cards'] = {k: np.asarray(v, dtype=np.float32) for k, v in data['card_embeddings'].item().items()}
+            except Exception as e:
+                log.warning("⚠️ [AI Engine] Legacy cache unreadable. Ignoring... (%s)", e)
+        return cache
+
+    def _write_cache(self, word_store, card_store, card_hashes, previous=None):
+        """
+        [단어 행 | 카드 행] 순서의 정규화된 행렬을 raw 파일로, 나머지는 JSON 인덱스로 저장합니다.
+        카드×단어 유사도 테이블도 함께 저장하며, 이전 테이블에서 변하지 않은 칸은 재사용합니다.
+        테이블은 float32 벡터로 계산한 뒤 EMBEDDING_DTYPE에 맞춰 행렬과 함께 양자화합니다.
+        행렬 파일명에 내용 해시를 붙이고 인덱스를 마지막에 교체하므로, 읽는 쪽은 항상 짝이 맞는 파일을 봅니다.
+        """
+        if EMBEDDING_DTYPE not in EMBEDDING_DTYPES:
+            raise ValueError(f"unsupported AI_EMBEDDING_DTYPE '{EMBEDDING_DTYPE}'")
+        log.info("💾 [AI Engine] Saving cache to %s (%s)...", CACHE_INDEX_FILE, EMBEDDING_DTYPE)
+        words = list(word_store)
+        hashes = list(card_store)
+        matrix = self._stack_rows([word_store[w] for w in words] + [card_store[h] for h in hashes])
+        scores = self._score_table(matrix[len(words):], matrix[:len(words)], words, hashes, previous)
+        stored, scales = self._quantize_rows(matrix, EMBEDDING_DTYPE)
+
+        digest = hashlib.sha1(stored.tobytes()).hexdigest()[:12]
+        suffix = EMBEDDING_SUFFIX[EMBEDDING_DTYPE]
+        matrix_file = f"{CACHE_PREFIX}.{digest}.{suffix}"
+        score_file = f"{CACHE_PREFIX}.{digest}.scores.{'f32' if EMBEDDING_DTYPE == 'float32' else 'f16'}"
+        scale_file = f"{CACHE_PREFIX}.{digest}.scales.f32" if scales is not None else None
+        outputs = [(matrix_file, stored), (score_file, np.ascontiguousarray(scores, dtype=SCORE_DTYPES[EMBEDDING_DTYPE]))]
+        if scale_file:
+            outputs.append((scale_file, scales))
+        for name, array in outputs:
+            path = os.path.join(CACHE_DIR, name)
+            array.tofile(path + '.tmp')
+            os.replace(path + '.tmp', path)
+
+        meta = {
+            'version': CACHE_VERSION,
+            'dtype': EMBEDDING_DTYPE,
+            'dim': int(matrix.shape[1]),
+            'matrix_file': matrix_file,
+            'score_file': score_file,
+            'scale_file': scale_file,
+            'text_model': MODEL_NAME,
+            'image_model': IMAGE_MODEL_NAME,
+            'words': words,
+            'cards': hashes,
+            'card_ids': card_hashes,
+        }
+        index_path = os.path.join(CACHE_DIR, CACHE_INDEX_FILE)
+        with open(index_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(index_path + '.tmp', index_path)
+
+        # 이전 행렬 파일 정리 (이미 memmap 중인 프로세스는 삭제 후에도 계속 읽을 수 있음)
+        current = {name for name, _ in outputs}
+        stale_suffixes = tuple(f".{s}" for s in EMBEDDING_SUFFIX.values())
+        for name in os.listdir(CACHE_DIR):
+            if name.startswith(f"{CACHE_PREFIX}.") and name.endswith(stale_suffixes) and name not in current:
+                os.remove(os.path.join(CACHE_DIR, name))
+        log.info("✅ [AI Engine] Cache saved. (Matrix: %d KiB)", stored.nbytes // 1024)
+
+    def _load_image_bytes(self, card_id):
+        """카드 이미지 원본 바이트를 로컬 또는 외부 URL에서 읽어옵니다. 없으면 None."""
+        # 1) 로컬 시도
+        local_path = os.path.join(self.static_cards_path, card_id)
+        if os.path.exists(local_path):
+            with open(local_path, 'rb') as f:
+                return f.read()
         
-        # 이미지 로딩 헬퍼
-        def load_image(card_id):
-            # 1) 로컬 시도
-            local_path = os.path.join(self.static_cards_path, card_id)
-            if os.path.exists(local_path):
-                return Image.open(local_path)
-            
-            # 2) 외부 URL 시도 (Git Pages 등)
-            if self.external_image_url:
-                url = f"{self.external_image_url}/{card_id}"
-                try:
-                    response = requests.get(url, timeout=5)
-                    response.raise_for_status()
-                    return Image.open(BytesIO(response.content))
-                except:
-                    pass
-            return None
-
-        # 배치 처리 대신 간단히 순차 처리 (오류 발생 시 개별 건너뛰기 위함)
-        # 속도를 위해선 배치가 좋지만, 다운로드 실패 가능성 때문에 개별 처리
-        for i, card_id in enumerate(all_cards):
+        # 2) 외부 URL 시도 (Git Pages 등)
+        if self.external_image_url:
+            import requests
+            url = f"{self.external_image_url}/{card_id}"
             try:
-                img = load_image(card_id)
-                if img:
-                    # [Fix] WebP 호환성 문제 해결: 순수 RGB 이미지로 재생성
-                    rgb_img = Image.new("RGB", img.size)
-                    rgb_img.paste(img, (0, 0))
-                    
-                    inputs = self.image_processor(images=rgb_img, return_tensors="pt")
-                    with torch.no_grad():
-                         vec = self.image_model.get_image_features(**inputs)[0].cpu().numpy().flatten()
-                    # [Fix] 확장자 제거하여 키 저장 (.webp vs .png 불일치 해결)
-                    key = os.path.splitext(card_id)[0]
-                    self.card_embeddings[key] = vec
-                    processed_count += 1
-                else:
-                    print(f"   ⚠️ Image not found: {card_id}")
+                response = requests.get(url, timeout=5)
+                response.raise_for_status()
+                return response.content
+            except Exception:
+                pass
+        return None
+
+    def _prepare_image(self, card_id, known):
+        """
+        [Worker] 이미지 로드 + 내용 해시 계산.
+        이미 임베딩된 해시면 디코딩을 건너뛰고, 아니면 RGB 변환 + CLIP 전처리까지 수행합니다.
+        (card_id, content_hash, pixel_values, error)를 반환합니다.
+        """
+        try:
+            from PIL import Image
+            data = self._load_image_bytes(card_id)
+            if data is None:
+                return card_id, None, None, "image not found"
+            content_hash = hashlib.sha1(data).hexdigest()
+            if content_hash in known:
+                return card_id, content_hash, None, None
+            # [Fix] WebP 호환성 문제 해결: 순수 RGB 이미지로 재생성
+            with Image.open(BytesIO(data)) as img:
+                rgb_img = img.convert("RGB")
+            inputs = self.image_processor(images=rgb_img, return_tensors="pt")
+            return card_id, content_hash, inputs['pixel_values'], None
+        except Exception as e:
+            return card_id, None, None, f"decode failed: {e}"
+
+    def _forward_images(self, pixel_values):
+        import torch
+        if isinstance(pixel_values, list):
+            pixel_values = torch.cat(pixel_values)
+        with torch.no_grad():
+            return self.image_model.get_image_features(pixel_values=pixel_values).cpu().numpy()
+
+    def _embed_cards(self, card_ids, known=None, legacy=None):
+        """
+        [Streaming Pipeline] 워커 풀에서 이미지를 디코딩/전처리하고,
+        IMAGE_BATCH_SIZE 단위로 묶어 CLIP forward를 한 번에 실행합니다.
+        배치 실패 시 해당 배치만 개별 처리로 재시도하여 불량 카드를 격리합니다.
+        known(해시 -> 벡터)에 있는 카드와 legacy(키 -> 벡터)로 이관 가능한 카드는 재계산하지 않습니다.
+
+        Returns:
+            ({card_id: vec}, {card_id: content_hash}, {card_id: reason})
+        """
+        known = known or {}
+        legacy = legacy or {}
+        vectors = {}
+        hashes = {}
+        failures = {}
+        total = len(card_ids)
+        done = 0
+        reused = 0
+        batch = []
+
+        def flush(batch):
+            try:
+                vecs = self._forward_images([pv for _, pv in batch])
+                for (card_id, _), vec in zip(batch, vecs):
+                    vectors[card_id] = vec.flatten()
             except Exception as e:
-                print(f"   ⚠️ Error processing {card_id}: {e}")
-                traceback.print_exc()
-            
-            if (i + 1) % 10 == 0:
-                print(f"   ... Processed {i + 1}/{len(all_cards)} images")
+                log.warning("⚠️ [AI Engine] Batch forward failed (%s). Retrying %d card(s) one by one...", e, len(batch))
+                for card_id, pv in batch:
+                    try:
+                        vectors[card_id] = self._forward_images(pv)[0].flatten()
+                    except Exception as item_error:
+                        failures[card_id] = f"forward failed: {item_error}"
+                        hashes.pop(card_id, None)
+
+        # 미리 디코딩해 둘 이미지 수를 제한 (메모리 보호)
+        window = IMAGE_LOAD_WORKERS * IMAGE_BATCH_SIZE
+        with NativeThreadPool(IMAGE_LOAD_WORKERS) as pool:
+            pending = deque()
+            queue = iter(card_ids)
+            for card_id in islice(queue, window):
+                pending.append(pool.submit(self._prepare_image, card_id, known))
+
+            while pending:
+                card_id, content_hash, pixel_values, error = pending.popleft().result()
+                next_id = next(queue, None)
+                if next_id is not None:
+                    pending.append(pool.submit(self._prepare_image, next_id, known))
+
+                legacy_key = self.card_catalog.key(card_id)
+                if error:
+                    failures[card_id] = error
+                elif pixel_values is None:
+                    hashes[card_id] = content_hash
+                    reused += 1
+                elif legacy_key in legacy:
+                    # [Migration] 구버전 캐시 벡터를 해시 키로 이관
+                    hashes[card_id] = content_hash
+                    vectors[card_id] = legacy[legacy_key]
+                    reused += 1
+                else:
+                    hashes[card_id] = content_hash
+                    batch.append((card_id, pixel_values))
+                    if len(batch) >= IMAGE_BATCH_SIZE:
+                        flush(batch)
+                        batch = []
 
-        print(f"✅ [AI Engine] Embeddings generated. (Words: {len(self.word_embeddings)}, Cards: {processed_count})")
+                done += 1
+                self.progress['done'] = done
+                if done % 10 == 0:
+                    log.debug("🖼️ [AI Engine] Processed %d/%d images", done, total)
 
-    def _cosine_similarity(self, vec1, vec2):
-        norm1 = np.linalg.norm(vec1)
-        norm2 = np.linalg.norm(vec2)
-        if norm1 == 0 or norm2 == 0: return 0.0
-        return np.dot(vec1, vec2) / (norm1 * norm2)
+        if batch:
+            flush(batch)
+
+        log.info("🖼️ [AI Engine] Cards: %d embedded, %d reused, %d failed", total - reused - len(failures), reused, len(failures))
+        return vectors, hashes, failures
+
+    @staticmethod
+    def _normalize_rows(matrix):
+        """행 단위 L2 정규화. norm이 0인 행은 0으로 남겨 코사인 0.0과 동일하게 취급합니다."""
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        if matrix.size == 0:
+            return matrix
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return np.ascontiguousarray(matrix / norms, dtype=np.float32)
+
+    @classmethod
+    def _stack_rows(cls, vecs):
+        vecs = list(vecs)
+        if not vecs:
+            return np.zeros((0, 0), dtype=np.float32)
+        return cls._normalize_rows(np.stack(vecs))
+
+    @staticmethod
+    def _quantize_rows(matrix, dtype):
+        """
+        정규화된 float32 행렬을 저장 정밀도로 변환합니다. (stored, scales)를 반환하며 scales는 int8일 때만 있습니다.
+        int8은 행마다 scale = max|v| / 127 로 대칭 양자화합니다 (값 범위를 꽉 채워 행 간 오차를 균일하게).
+        """
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if dtype == 'float32':
+            return np.ascontiguousarray(matrix), None
+        if dtype == 'float16':
+            return np.ascontiguousarray(matrix, dtype=np.float16), None
+        if dtype != 'int8':
+            raise ValueError(f"unsupported embedding dtype '{dtype}'")
+        scales = np.abs(matrix).max(axis=1) / 127.0 if matrix.size else np.zeros(len(matrix), dtype=np.float32)
+        scales = np.ascontiguousarray(scales, dtype=np.float32)
+        safe = np.where(scales > 0, scales, 1.0)[:, None]
+        stored = np.clip(np.rint(matrix / safe), -127, 127).astype(np.int8)
+        return np.ascontiguousarray(stored), scales
+
+    @staticmethod
+    def _dequantize_rows(stored, scales=None):
+        """_quantize_rows의 역변환 (float32 복사본)."""
+        matrix = np.asarray(stored, dtype=np.float32)
+        if scales is not None:
+            matrix = matrix * np.asarray(scales, dtype=np.float32)[:, None]
+        return matrix
+
+    @staticmethod
+    def _score_table(card_matrix, word_matrix, words=None, hashes=None, previous=None):
+        """
+        카드×단어 코사인 유사도 테이블을 계산합니다.
+        previous(이전 캐시)가 주어지면 양쪽 모두 그대로인 칸은 복사하고, 새 카드 행/새 단어 열만 계산합니다.
+        """
+        n_cards, n_words = len(card_matrix), len(word_matrix)
+        if not n_cards or not n_words:
+            return np.zeros((n_cards, n_words), dtype=np.float32)
+
+        old_scores = previous.get('scores') if previous else None
+        if old_scores is None or words is None or hashes is None:
+            return np.ascontiguousarray(card_matrix @ word_matrix.T, dtype=np.float32)
+
+        old_meta = previous['meta']
+        old_word_col = {w: i for i, w in enumerate(old_meta['words'])}
+        old_card_row = {h: i for i, h in enumerate(old_meta['cards'])}
+        word_cols = np.array([old_word_col.get(w, -1) for w in words])
+        card_rows = np.array([old_card_row.get(h, -1) for h in hashes])
+        kept_w, kept_c = np.flatnonzero(word_cols >= 0), np.flatnonzero(card_rows >= 0)
+        new_w, new_c = np.flatnonzero(word_cols < 0), np.flatnonzero(card_rows < 0)
+
+        table = np.empty((n_cards, n_words), dtype=np.float32)
+        if len(kept_c) and len(kept_w):
+            table[np.ix_(kept_c, kept_w)] = old_scores[np.ix_(card_rows[kept_c], word_cols[kept_w])]
+        if len(new_c):
+            table[new_c] = card_matrix[new_c] @ word_matrix.T
+        if len(new_w) and len(kept_c):
+            table[np.ix_(kept_c, new_w)] = card_matrix[kept_c] @ word_matrix[new_w].T
+        log.debug("🧮 [AI Engine] Score table: %dx%d, recomputed %d card row(s) and %d word column(s)",
+                  n_cards, n_words, len(new_c), len(new_w))
+        return table
+
+    def _build_index(self, word_keys, word_matrix, card_hashes, hash_keys, card_matrix, score_table,
+                     word_scales=None, card_scales=None):
+        """
+        정규화된 행렬과 정수 id 맵, 유사도 테이블과 카드별 구간 인덱스를 설정합니다.
+        카드는 내용 해시 단위로 한 행이며, 카드 키(확장자 제거)는 해당 해시의 행을 가리킵니다.
+        int8 행렬이면 행별 scale을 함께 받습니다.
+        """
+        self.word_keys = list(word_keys)
+        self.word_index = {w: i for i, w in enumerate(self.word_keys)}
+        self.word_matrix = word_matrix
+        self.word_scales = word_scales
+        self.card_scales = card_scales
+
+        hash_row = {h: i for i, h in enumerate(hash_keys)}
+        self.card_index = {card_key(c): hash_row[h] for c, h in card_hashes.items() if h in hash_row}
+        self.card_matrix = card_matrix
+
+        # 카드별로 구간에 속한 단어 행 번호를 정렬된 집합으로 보관 (storyteller는 조회 + 교집합만 수행)
+        lo, hi = SWEET_SPOT_RANGE
+        self.sweet_spot_words = [frozenset(np.flatnonzero((row >= lo) & (row <= hi)).tolist()) for row in score_table]
+        self.obvious_words = [frozenset(np.flatnonzero(row > TOO_OBVIOUS_ABOVE).tolist()) for row in score_table]
+        self.unrelated_words = [frozenset(np.flatnonzero(row < TOO_UNRELATED_BELOW).tolist()) for row in score_table]
+        self.score_table = score_table
+
+        self._card_row_cache = {}
+        log.info("🧮 [AI Engine] Index built. (Words: %d, Cards: %d, Dim: %d, %s)",
+                 len(self.word_index), len(self.card_index), self.word_matrix.shape[-1], self.word_matrix.dtype)
+
+    def _card_row(self, card_id):
+        """카드 id(확장자 포함)를 행 번호로 변환합니다. 없으면 -1. 결과는 메모이즈."""
+        row = self._card_row_cache.get(card_id)
+        if row is None:
+            # [Fix] 확장자 제거한 키로 조회 (.webp vs .png 불일치 해결). 카탈로그 카드는 미리 계산된 키 사용
+            row = self.card_index.get(self.card_catalog.key(card_id), -1)
+            self._card_row_cache[card_id] = row
+        return row
+
+    def _score_cards(self, word_row, card_ids):
+        """카드 목록 전체를 한 번의 행렬곱으로 채점합니다. 임베딩이 없는 카드는 -1.0."""
+        rows = np.fromiter((self._card_row(c) for c in card_ids), dtype=np.int64, count=len(card_ids))
+        scores = np.full(len(card_ids), -1.0, dtype=np.float32)
+        known = rows >= 0
+        if known.any():
+            cards, word = self.card_matrix[rows[known]], self.word_matrix[word_row]
+            if self.card_scales is None:
+                scores[known] = cards.astype(np.float32, copy=False) @ word.astype(np.float32, copy=False)
+            else:
+                # [int8] 정수 내적(int32 누적) 후 카드/단어 scale 적용
+                dots = cards.astype(np.int32) @ word.astype(np.int32)
+                scores[known] = dots * (self.card_scales[rows[known]] * self.word_scales[word_row])
+        return scores
+
+    @staticmethod
+    def _top_k(scores, k):
+        """점수 상위 k개의 위치를 내림차순으로 반환합니다 (argpartition + 부분 정렬)."""
+        n = len(scores)
+        if n == 0:
+            return np.zeros(0, dtype=np.int64)
+        k = min(k, n)
+        if k < n:
+            idx = np.argpartition(-scores, k - 1)[:k]
+        else:
+            idx = np.arange(n)
+        return idx[np.argsort(-scores[idx], kind='stable')]
 
     # --- Public Methods ---
 
@@ -178,126 +708,190 @@ class AIEngine:
         Returns:
             (selected_word, should_reroll)
         """
-        # [Fix] 확장자 제거하여 키 조회
-        key = os.path.splitext(card_id)[0]
-        if not self.is_ready or key not in self.card_embeddings:
-            print(f"⚠️ [AI Storyteller] Embedding not found for {card_id} (Key: {key})")
+        card_row = self._card_row(card_id) if self.is_ready else -1
+        if card_row < 0:
+            log.warning("⚠️ [AI Storyteller] Embedding not found for %s (Key: %s)", card_id, self.card_catalog.key(card_id))
             return random.choice(candidates), False
 
         try:
-            card_vec = self.card_embeddings[key]
-            scores = []
-            
+            # [I18n] word comes as dict {'ko':..., 'en':...} or string
+            known = []
+            word_rows = []
             for word in candidates:
-                # [I18n] word comes as dict {'ko':..., 'en':...} or string
                 word_text = word['ko'] if isinstance(word, dict) else word
-                
-                if word_text in self.word_embeddings:
-                    sim = self._cosine_similarity(card_vec, self.word_embeddings[word_text])
-                    scores.append((word, sim)) # Return original object
-            
-            scores.sort(key=lambda x: x[1], reverse=True)
+                row = self.word_index.get(word_text)
+                if row is not None:
+                    known.append(word) # Return original object
+                    word_rows.append(row)
             
             # --- 전략 1: Sweet Spot (0.4 ~ 0.7) 찾기 ---
             # 너무 뻔하지도(>0.8), 너무 뜬금없지도(<0.3) 않은 구간
-            sweet_spots = [item for item in scores if 0.4 <= item[1] <= 0.7]
+            # [Perf] 미리 계산된 카드별 sweet spot 집합과의 교집합
+            sweet = self.sweet_spot_words[card_row]
+            sweet_spots = [i for i, row in enumerate(word_rows) if row in sweet]
             
             if sweet_spots:
                 # 적절한 단어가 있으면 그 중에서 랜덤 선택
-                selected = random.choice(sweet_spots)
-                # selected[0] is the word object/string
-                word_log = selected[0]['ko'] if isinstance(selected[0], dict) else selected[0]
-                print(f"🧠 [AI Storyteller] Found Sweet Spot! Card: {card_id} -> {word_log} ({selected[1]:.2f})")
-                return selected[0], False
+                pick = random.choice(sweet_spots)
+                selected = known[pick]
+                word_log = selected['ko'] if isinstance(selected, dict) else selected
+                log.debug("🧠 [AI Storyteller] Found Sweet Spot! Card: %s -> %s (%.2f)",
+                          card_id, word_log, self.score_table[card_row, word_rows[pick]])
+                return selected, False
             
             # --- 전략 2: Sweet Spot이 없다면? ---
             # 만약 모든 단어가 너무 뻔하거나(>0.8) 너무 관련없다면(<0.3) -> 리롤 추천
             # 다만, 상위권 점수가 너무 낮으면(<0.3) 무조건 리롤
-            top_score = scores[0][1] if scores else 0
-            if top_score < 0.35:
-                print(f"🧠 [AI Storyteller] Scores too low (Top: {top_score:.2f}). Suggest Reroll.")
+            sims = self.score_table[card_row, word_rows] if word_rows else np.zeros(0, dtype=np.float32)
+            top = int(np.argmax(sims)) if len(sims) else -1
+            top_score = float(sims[top]) if len(sims) else 0
+            if top_score < TOO_UNRELATED_BELOW:
+                log.debug("🧠 [AI Storyteller] Scores too low (Top: %.2f). Suggest Reroll.", top_score)
                 return None, True
             
-            if top_score > 0.85:
-                 print(f"🧠 [AI Storyteller] Scores too obvious (Top: {top_score:.2f}). Suggest Reroll.")
+            if top_score > TOO_OBVIOUS_ABOVE:
+                 log.debug("🧠 [AI Storyteller] Scores too obvious (Top: %.2f). Suggest Reroll.", top_score)
                  return None, True
 
             # 리롤 조건에 해당하지 않지만 Sweet Spot도 아닌 애매한 경우 -> 그냥 Top Pick 사용
             # (계속 리롤할 순 없으므로)
-            word_log = scores[0][0]['ko'] if isinstance(scores[0][0], dict) else scores[0][0]
-            print(f"🧠 [AI Storyteller] No Sweet Spot, but usable. Pick Top 1: {word_log}")
-            return scores[0][0], False
+            top_word = known[top]
+            word_log = top_word['ko'] if isinstance(top_word, dict) else top_word
+            log.debug("🧠 [AI Storyteller] No Sweet Spot, but usable. Pick Top 1: %s", word_log)
+            return top_word, False
             
         except Exception as e:
-            print(f"⚠️ [AI Error] analyze_storyteller_candidates: {e}")
+            log.exception("⚠️ [AI Error] analyze_storyteller_candidates: %s", e)
             return random.choice(candidates), False
 
+    def plan_storyteller_turn(self, hand, candidates, allow_reroll=True, candidate_count=10):
+        """
+        [Storyteller Planner] 손패 전체 × 후보 단어를 한 번에 채점해 (카드, 단어) 쌍을 고릅니다.
+        1) 후보 단어 중 sweet spot 쌍이 있으면 그 중 랜덤 선택
+        2) 없고 리롤이 허용되면 단어 풀 전체에서 sweet spot 쌍을 찾아 새 후보 목록에 포함
+        3) 그래도 없으면 후보 중 너무 뻔하지 않은 최고점 쌍 (없으면 최고점)
+        
+        Returns:
+            (card_id, word, new_candidates)  # 리롤하지 않았으면 new_candidates는 None
+        """
+        hand_ids = [c['id'] for c in hand]
+        if not hand_ids or not candidates:
+            return (random.choice(hand_ids) if hand_ids else None), (random.choice(candidates) if candidates else None), None
+
+        card_rows = [self._card_row(c) for c in hand_ids] if self.is_ready else []
+        known_cards = [i for i, row in enumerate(card_rows) if row >= 0]
+        if not known_cards:
+            log.warning("⚠️ [AI Storyteller] No embeddings for hand. Picking random.")
+            return random.choice(hand_ids), random.choice(candidates), None
+
+        try:
+            cand_words = []
+            cand_rows = []
+            for word in candidates:
+                row = self.word_index.get(word['ko'] if isinstance(word, dict) else word)
+                if row is not None:
+                    cand_words.append(word)
+                    cand_rows.append(row)
+
+            # [Perf] 손패 × 단어 풀 전체 점수를 테이블에서 한 번에 가져옴
+            hand_scores = self.score_table[[card_rows[i] for i in known_cards]]
+            lo, hi = SWEET_SPOT_RANGE
+
+            # --- 1. 현재 후보 중 sweet spot 쌍 ---
+            if cand_rows:
+                sub = hand_scores[:, cand_rows]
+                pairs = np.argwhere((sub >= lo) & (sub <= hi))
+                if len(pairs):
+                    h, w = pairs[random.randrange(len(pairs))]
+                    card_id, word = hand_ids[known_cards[h]], cand_words[w]
+                    log.debug("🧠 [AI Storyteller] Sweet Spot in candidates: %s -> %s (%.2f)",
+                              card_id, self._word_text(word), sub[h, w])
+                    return card_id, word, None
+
+            # --- 2. 리롤: 단어 풀 전체에서 sweet spot 쌍 ---
+            if allow_reroll:
+                pairs = np.argwhere((hand_scores >= lo) & (hand_scores <= hi))
+                if len(pairs):
+                    h, w = pairs[random.randrange(len(pairs))]
+                    card_id = hand_ids[known_cards[h]]
+                    word = self.word_objects.get(self.word_keys[w], self.word_keys[w])
+                    others = [o for k, o in self.word_objects.items() if k != self.word_keys[w]]
+                    new_candidates = random.sample(others, min(candidate_count - 1, len(others))) + [word]
+                    random.shuffle(new_candidates)
+                    log.debug("🧠 [AI Storyteller] Sweet Spot via reroll: %s -> %s (%.2f)",
+                              card_id, self._word_text(word), hand_scores[h, w])
+                    return card_id, word, new_candidates
+
+            # --- 3. Fallback: 후보 중 너무 뻔하지 않은 최고점 쌍 ---
+            if cand_rows:
+                sub = hand_scores[:, cand_rows]
+                usable = np.where(sub <= TOO_OBVIOUS_ABOVE, sub, -np.inf)
+                flat = int(np.argmax(usable)) if np.isfinite(usable).any() else int(np.argmax(sub))
+                h, w = divmod(flat, sub.shape[1])
+                card_id, word = hand_ids[known_cards[h]], cand_words[w]
+                log.debug("🧠 [AI Storyteller] No Sweet Spot. Pick best pair: %s -> %s (%.2f)",
+                          card_id, self._word_text(word), sub[h, w])
+                return card_id, word, None
+
+            return hand_ids[known_cards[0]], random.choice(candidates), None
+
+        except Exception as e:
+            log.exception("⚠️ [AI Error] plan_storyteller_turn: %s", e)
+            return random.choice(hand_ids), random.choice(candidates), None
+
+    @staticmethod
+    def _word_text(word):
+        return word['ko'] if isinstance(word, dict) else word
+
     def get_best_card(self, word, card_hand_list):
         """[제출 단계] 제시어와 가장 비슷한 카드를 내 손에서 선택합니다."""
-        if not self.is_ready or word not in self.word_embeddings:
+        word_row = self.word_index.get(word) if self.is_ready else None
+        if word_row is None:
             return random.choice(card_hand_list)['id']
 
         try:
-            word_vec = self.word_embeddings[word]
-            scores = []
-            
-            for card in card_hand_list:
-                card_id_orig = card['id']
-                # [Fix] 확장자 제거
-                key = os.path.splitext(card_id_orig)[0]
-                
-                if key in self.card_embeddings:
-                    sim = self._cosine_similarity(self.card_embeddings[key], word_vec)
-                    scores.append((card_id_orig, sim))
-                else:
-                    scores.append((card_id_orig, -1.0)) # 임베딩 없으면 최하점
-            
-            scores.sort(key=lambda x: x[1], reverse=True)
+            card_ids = [card['id'] for card in card_hand_list]
+            # [Perf] 손패 전체를 한 번에 채점 (임베딩 없으면 최하점 -1.0)
+            scores = self._score_cards(word_row, card_ids)
+            top = self._top_k(scores, 3)
             
             # 가장 높은 점수 선택
-            best_card = scores[0][0]
-            print(f"🧠 [AI Submit] Word: '{word}' -> Hand Scores: {[f'{c[:5]}..({s:.2f})' for c, s in scores[:3]]} -> Picked: {best_card}")
+            best_card = card_ids[top[0]]
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("🧠 [AI Submit] Word: '%s' -> Hand Scores: %s -> Picked: %s",
+                          word, [f'{card_ids[i][:5]}..({scores[i]:.2f})' for i in top], best_card)
             return best_card
 
         except Exception as e:
-            print(f"⚠️ [AI Error] get_best_card: {e}")
+            log.exception("⚠️ [AI Error] get_best_card: %s", e)
             return random.choice(card_hand_list)['id']
 
     def get_voted_card(self, word, voting_candidates, my_card_id=None):
         """[투표 단계] 제시어와 가장 비슷한 카드를 찾습니다 (본인 카드 제외)"""
         # voting_candidates: [{'user_id':..., 'card_id':...}, ...]
-        if not self.is_ready or word not in self.word_embeddings:
+        word_row = self.word_index.get(word) if self.is_ready else None
+        if word_row is None:
              # 랜덤 선택 (본인 카드 제외)
             valid = [c for c in voting_candidates if c['card_id'] != my_card_id]
             if not valid: return None
             return random.choice(valid)['card_id']
 
         try:
-            word_vec = self.word_embeddings[word]
-            scores = []
-            
-            for candidate in voting_candidates:
-                c_id = candidate['card_id']
-                if c_id == my_card_id: continue # 내 카드는 투표 불가 (이미 필터링 되어 오겠지만 안전장치)
-                
-                # [Fix] 확장자 제거
-                key = os.path.splitext(c_id)[0]
-                if key in self.card_embeddings:
-                    sim = self._cosine_similarity(self.card_embeddings[key], word_vec)
-                    scores.append((c_id, sim, candidate['user_id']))
-                else:
-                    scores.append((c_id, -1.0, candidate['user_id']))
+            # 내 카드는 투표 불가 (이미 필터링 되어 오겠지만 안전장치)
+            card_ids = [c['card_id'] for c in voting_candidates if c['card_id'] != my_card_id]
+            if not card_ids: return None
 
-            scores.sort(key=lambda x: x[1], reverse=True)
-            
-            if not scores: return None
+            scores = self._score_cards(word_row, card_ids)
+            top = self._top_k(scores, 3)
             
             # 투표는 정답을 맞춰야 하므로 Top 1 선택
-            best_choice = scores[0][0]
-            print(f"🧠 [AI Vote] Word: '{word}' -> Vote Scores: {[f'{c[:5]}..({s:.2f})' for c, s, u in scores[:3]]} -> Voted: {best_choice}")
+            best_choice = card_ids[top[0]]
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("🧠 [AI Vote] Word: '%s' -> Vote Scores: %s -> Voted: %s",
+                          word, [f'{card_ids[i][:5]}..({scores[i]:.2f})' for i in top], best_choice)
             return best_choice
             
         except Exception as e:
-            print(f"⚠️ [AI Error] get_voted_card: {e}")
+            log.exception("⚠️ [AI Error] get_voted_card: %s", e)
             valid = [c for c in voting_candidates if c['card_id'] != my_card_id]
             return random.choice(valid)['card_id'] if valid else None
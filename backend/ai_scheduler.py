@@ -0,0 +1,156 @@
+import time
+import threading
+
+from logs import get_logger
+
+log = get_logger('ai_scheduler')
+
+# 대기 중인 작업이 취소됐는지 확인하는 간격(초). 취소된 태스크는 길어야 이만큼 더 남아 있다가 끝납니다.
+CANCEL_CHECK_INTERVAL = 0.25
+
+
+class _Task:
+    __slots__ = ('room_id', 'epoch', 'seat_id', 'due', 'action', 'args', 'cancelled', 'running', 'rearm')
+
+    def __init__(self, room_id, epoch, seat_id, due, action, args):
+        self.room_id = room_id
+        self.epoch = epoch
+        self.seat_id = seat_id
+        self.due = due
+        self.action = action
+        self.args = args
+        self.cancelled = False
+        self.running = False
+        self.rearm = None  # 실행 중에 같은 좌석 예약이 들어오면 그 delay (끝난 뒤 한 번 더 실행)
+
+
+class AITurnScheduler:
+    """
+    [AI Scheduler] 방 단위 AI 행동 타이머.
+
+    - 작업은 (방, 라운드, 페이즈, 좌석) 키로 관리되며, 좌석마다 독립된 백그라운드 태스크에서 동시에 대기합니다.
+    - sync()로 방의 현재 (라운드, 페이즈)가 바뀌면 이전 epoch의 대기 작업은 모두 취소됩니다.
+      이미 본 것보다 오래된 rev의 상태로 부른 sync()는 무시됩니다.
+    - 같은 키의 작업이 이미 대기 중이면 새 요청은 합쳐집니다 (중복 트리거 무시).
+      실행 중이면 끝난 뒤 같은 epoch일 때 한 번 더 예약합니다 (실행 중 행동이 CAS 충돌로 밀린 경우 등).
+
+    spawn/sleep은 socketio.start_background_task / socketio.sleep을 넘겨 async 모드(eventlet 등)에 맞춥니다.
+    """
+
+    def __init__(self, spawn, sleep):
+        self._spawn = spawn
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._rooms = {}  # room_id -> {'epoch': (round, phase), 'tasks': {seat_id: _Task}}
+        self.stats = {'scheduled': 0, 'collapsed': 0, 'rearmed': 0, 'cancelled': 0, 'stale': 0, 'fired': 0,
+                      'failed': 0}
+
+    def sync(self, room_id, round_no, phase, rev=None):
+        """
+        방의 현재 epoch를 기록하고, 다른 epoch의 작업을 취소합니다. phase가 None이면 모두 취소.
+        rev(읽은 방 상태의 rev)가 이미 본 것보다 오래됐으면 아무것도 하지 않고 False를 반환합니다
+        (동시에 처리된 이벤트 중 먼저 읽은 쪽이 나중에 도착해 새 페이즈의 작업을 취소하지 않도록).
+        """
+        epoch = (round_no, phase)
+        with self._lock:
+            room = self._rooms.get(room_id)
+            if room is not None and rev is not None and room.get('rev') is not None and rev < room['rev']:
+                self.stats['stale'] += 1
+                return False
+            if room is None:
+                if phase is not None:
+                    self._rooms[room_id] = {'epoch': epoch, 'tasks': {}, 'rev': rev}
+                return True
+            if rev is not None:
+                room['rev'] = rev
+            if room['epoch'] == epoch:
+                return True
+            self._cancel_locked(room)
+            if phase is None:
+                del self._rooms[room_id]
+            else:
+                room['epoch'] = epoch
+            return True
+
+    def cancel_room(self, room_id):
+        with self._lock:
+            room = self._rooms.pop(room_id, None)
+            if room:
+                self._cancel_locked(room)
+
+    def schedule(self, room_id, round_no, phase, seat_id, delay, action, *args):
+        """
+        delay초 후 action(*args)를 실행하도록 예약합니다.
+        방의 epoch가 (round_no, phase)가 아니거나 같은 좌석 작업이 이미 있으면 False.
+        """
+        epoch = (round_no, phase)
+        with self._lock:
+            room = self._rooms.setdefault(room_id, {'epoch': epoch, 'tasks': {}})
+            if room['epoch'] != epoch:
+                return False
+            existing = room['tasks'].get(seat_id)
+            if existing and not existing.cancelled:
+                if existing.running and existing.rearm is None:
+                    existing.rearm = delay
+                self.stats['collapsed'] += 1
+                return False
+            task = self._add_locked(room, room_id, seat_id, delay, action, args)
+        self._spawn(self._run, task, delay)
+        return True
+
+    def _add_locked(self, room, room_id, seat_id, delay, action, args):
+        task = _Task(room_id, room['epoch'], seat_id, time.time() + delay, action, args)
+        room['tasks'][seat_id] = task
+        self.stats['scheduled'] += 1
+        return task
+
+    def pending(self, room_id):
+        """방의 대기/실행 중인 작업 {seat_id: 남은 시간(초)}."""
+        now = time.time()
+        with self._lock:
+            room = self._rooms.get(room_id)
+            if not room:
+                return {}
+            return {seat: max(0.0, round(t.due - now, 2)) for seat, t in room['tasks'].items()}
+
+    def status(self):
+        with self._lock:
+            tasks = [task for room in self._rooms.values() for task in room['tasks'].values()]
+            return dict(self.stats, rooms=len(self._rooms), pending=len(tasks),
+                        running=sum(1 for task in tasks if task.running))
+
+    def _cancel_locked(self, room):
+        for task in room['tasks'].values():
+            if not task.cancelled and not task.running:
+                self.stats['cancelled'] += 1
+            task.cancelled = True
+        room['tasks'].clear()
+
+    def _run(self, task, delay):
+        # 취소된 작업이 delay를 끝까지 기다리며 쌓이지 않도록 CANCEL_CHECK_INTERVAL초씩 나눠 자며 확인
+        remaining = delay
+        while remaining > 0 and not task.cancelled:
+            self._sleep(min(remaining, CANCEL_CHECK_INTERVAL))
+            remaining = task.due - time.time()
+        with self._lock:
+            if task.cancelled:
+                return
+            task.running = True
+            self.stats['fired'] += 1
+        try:
+            task.action(*task.args)
+        except Exception as e:
+            with self._lock:
+                self.stats['failed'] += 1
+            log.exception("❌ [AI Scheduler] %s in room %s %s failed: %s", task.seat_id, task.room_id, task.epoch, e)
+        finally:
+            again = None
+            with self._lock:
+                room = self._rooms.get(task.room_id)
+                if room and room['tasks'].get(task.seat_id) is task:
+                    del room['tasks'][task.seat_id]
+                    if task.rearm is not None and not task.cancelled and room['epoch'] == task.epoch:
+                        again = self._add_locked(room, task.room_id, task.seat_id, task.rearm, task.action, task.args)
+                        self.stats['rearmed'] += 1
+            if again:
+                self._spawn(self._run, again, task.rearm)
@@ -1,13 +1,35 @@
 import os
+# [Cluster] eventlet 모드에서는 Redis 호출(방 owner 채널의 블로킹 구독 포함)이 허브를 막지 않도록 가장 먼저 패치
+# (CPU를 쓰는 AI warmup은 native_threads.py로 패치 전 OS 스레드에서 실행)
+try:
+    import eventlet
+    eventlet.monkey_patch()
+except ImportError:
+    pass
+import sys
 import json
 import uuid
+import atexit
+import signal
+import logging
 import random
 import time
 from datetime import datetime
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 from flask_socketio import SocketIO, join_room, leave_room, emit
 import redis
+from state_broadcast import StateBroadcaster, user_channel
+from emit_coalescer import EmitCoalescer
+from room_store import RoomStore
+from card_catalog import shared_catalog
+from room_owner import RoomOwnership
+from room_lifecycle import RoomLifecycle, ACTIVE_ROOMS_KEY
+from room_ids import RoomIdAllocator
+from room_directory import RoomDirectory
+from disconnect_reaper import DisconnectReaper
+from metrics import Metrics
+from logs import setup_logging, get_logger, with_log_context, bind_socketio_context
 
 # ==========================================
 # [설정] 깃허브 이미지 주소
@@ -32,7 +54,17 @@ allowed_origins = [
 
 CORS(app, resources={r"/api/*": {"origins": allowed_origins}})
 # [수정] 모바일 연결 끊김 감지를 위해 ping interval/timeout 설정 추가 (5초 주기)
-socketio = SocketIO(app, cors_allowed_origins=allowed_origins, ping_interval=5, ping_timeout=5)
+# [Cluster] SOCKETIO_MESSAGE_QUEUE(예: redis://redis:6379/0)를 지정하면 브로드캐스트가 Redis pub/sub로 모든 워커에 전달됩니다
+socketio = SocketIO(app, cors_allowed_origins=allowed_origins, ping_interval=5, ping_timeout=5,
+                    message_queue=os.getenv('SOCKETIO_MESSAGE_QUEUE') or None)
+# [Logging] LOG_LEVEL(기본 INFO) 이상만 큐로 넘기고 출력은 별도 스레드에서. 자주 찍히는 debug 경로는 trace(방마다 10초에 5개)
+setup_logging()
+log = get_logger('app')
+trace = get_logger('app.trace', sample=(5, 10.0))
+bind_socketio_context(socketio)
+# [Metrics] 모든 @socketio.on 핸들러의 지연 시간과 Redis 사용량을 집계 (핸들러 등록 전에 설치)
+metrics = Metrics()
+metrics.instrument_socketio(socketio)
 
 # Redis 연결 설정
 redis_client = redis.Redis(
@@ -40,37 +72,72 @@ redis_client = redis.Redis(
     port=int(os.getenv('REDIS_PORT', 6379)),
     decode_responses=True
 )
+metrics.instrument_redis(redis_client)
+# [Schema v2] 방/참가자는 필드 단위 해시, 손패는 별도 키 (room_store.py 참고)
+room_store = RoomStore(redis_client)
+try:
+    migrated, failed = room_store.migrate_legacy_rooms()
+    if migrated or failed:
+        log.info("🔧 [Schema] Migrated %d legacy room(s) to field-level schema (%d failed)", migrated, failed)
+except redis.RedisError as e:
+    log.warning("⚠️ [Schema] Legacy room migration skipped (%s). Run migrate_schema.py once Redis is up.", e)
+# [Room IDs] 4자리부터 시작해 사용률 90%를 넘으면 자동으로 자리수를 늘리는 방 코드 할당기
+room_ids = RoomIdAllocator(redis_client)
+# [Room Directory] 로비 방 목록용 상태별 정렬 인덱스 (방 생성/입장/퇴장/게임 시작·종료 때 갱신)
+room_directory = RoomDirectory(redis_client)
+try:
+    backfilled = room_directory.backfill(redis_client.sscan_iter(ACTIVE_ROOMS_KEY))
+    if backfilled:
+        log.info("📇 [Room Directory] Indexed %d existing room(s)", backfilled)
+except redis.RedisError as e:
+    log.warning("⚠️ [Room Directory] Backfill skipped (%s)", e)
 
-ROOM_KEY_PREFIX = 'room:'
 CARD_LIST_FILE = os.path.join(os.path.dirname(__file__), 'card_list.json')
+STATIC_CARDS_PATH = os.path.join(os.path.dirname(__file__), 'static', 'cards')
 
-def get_room_key(room_id):
-    return f"{ROOM_KEY_PREFIX}{room_id}"
+# [Card Catalog] 카드 목록과 이미지 URL은 시작 시 한 번 만들어 두고 AI 엔진과 공유합니다.
+# 깃허브 사용 시 EXTERNAL_IMAGE_URL, 아니면 로컬 서버 주소. 원본이 바뀌면 백그라운드에서 다시 읽습니다.
+card_catalog = shared_catalog(CARD_LIST_FILE, STATIC_CARDS_PATH, EXTERNAL_IMAGE_URL)
+socketio.start_background_task(card_catalog.watch, socketio.sleep,
+                               float(os.getenv('CARD_CATALOG_POLL_INTERVAL', 10)))
 
 # [신규] 이미지 URL 생성 헬퍼 함수
 def get_card_url(filename):
-    if EXTERNAL_IMAGE_URL:
-        # 깃허브 사용 시 주소 반환
-        return f"{EXTERNAL_IMAGE_URL}/{filename}"
-    else:
-        # 로컬 서버 사용 시
-        return f"https://api.lumiverselab.com/static/cards/{filename}"
+    return card_catalog.url(filename)
 
 # --- API ---
+def runtime_status():
+    """헬스 체크에 포함할 백그라운드 구성요소 상태."""
+    return {
+        'ai_engine': ai_engine.status(),
+        'ai_scheduler': ai_scheduler.status(),
+        'state_sync': state_broadcaster.status(),
+        'emit_coalescer': emit_coalescer.status(),
+        'card_catalog': card_catalog.status(),
+        'room_owner': room_owner.status(),
+        'room_lifecycle': room_lifecycle.status(),
+        'room_ids': room_ids.status(),
+        'disconnect_reaper': disconnect_reaper.status(),
+    }
+
 @app.route('/api/health')
 def health_check():
     try:
         redis_client.ping()
-        return jsonify({'status': 'healthy', 'redis': 'connected'})
+        return jsonify({'status': 'healthy', 'redis': 'connected', **runtime_status()})
     except Exception as e:
-        return jsonify({'status': 'unhealthy', 'redis': str(e)}), 500
+        return jsonify({'status': 'unhealthy', 'redis': str(e), **runtime_status()}), 500
+
+@app.route('/api/metrics')
+def metrics_endpoint():
+    """[Metrics] Prometheus 텍스트 형식 (이 워커 기준)."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/api/rooms', methods=['POST'])
 def create_room():
     try:
         data = request.get_json() or {}
-        room_id = str(uuid.uuid4().int)[:4]
-        room_key = get_room_key(room_id)
+        room_id = room_ids.claim()
         
         room_data = {
             'id': room_id,
@@ -79,31 +146,42 @@ def create_room():
             'host_id': None,
             'created_at': datetime.now().isoformat()
         }
-        redis_client.set(room_key, json.dumps(room_data))
-        redis_client.sadd('rooms:active', room_id)
+        room_store.update_room(room_id, room_data)
+        redis_client.sadd(ACTIVE_ROOMS_KEY, room_id)
+        room_lifecycle.touch(room_id, force=True)
+        room_directory.refresh(room_id)
         return jsonify({'success': True, 'room': room_data}), 201
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/rooms', methods=['GET'])
+def list_rooms():
+    """로비 방 목록. ?status=waiting|full|playing|finished&sort=created|players&limit=20&cursor=..."""
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+        page = room_directory.list(status=request.args.get('status', 'waiting'),
+                                   sort=request.args.get('sort', 'created'),
+                                   limit=limit, cursor=request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    return jsonify({'success': True, **page})
+
 @app.route('/api/rooms/<room_id>/users', methods=['POST'])
 def join_room_api(room_id):
-    room_key = get_room_key(room_id)
-    if not redis_client.exists(room_key):
+    if not room_store.room_exists(room_id):
         return jsonify({'success': False, 'error': 'Room not found'}), 404
     return jsonify({'success': True, 'room_id': room_id})
 
 # --- Helper Functions ---
-def update_room_users(room_id):
-    users_key = f"room:{room_id}:users"
-    users_json_list = redis_client.hvals(users_key)
-    users = [json.loads(u) for u in users_json_list]
-    
-    # Get Host ID (Handle potential None/Missing)
-    room_key = get_room_key(room_id)
-    room_raw = redis_client.get(room_key)
-    host_id = "UNKNOWN"
-    if room_raw:
-        host_id = str(json.loads(room_raw).get('host_id', ''))
+# [State Sync] 버전 patch 전송 (공개 상태는 방 전체, 손패는 본인 채널로만)
+state_broadcaster = StateBroadcaster(socketio.emit)
+
+def sorted_users(room_data, players):
+    """표시 순서(방장 → 사람 → AI, 같은 그룹은 입장 순)대로 정렬된 유저 목록."""
+    users = list(players.values())
+    host_id = str(room_data.get('host_id', ''))
 
     # Sorting Logic (Score-based)
     def get_sort_priority(u):
@@ -121,275 +199,444 @@ def update_room_users(room_id):
 
     # Primary sort: Priority, Secondary sort: Join Time (Earlier is better)
     users.sort(key=lambda u: (get_sort_priority(u), u.get('joined_at', 0)))
-    
-    # [Debug] Print sorted list to verify
-    print(f"📋 [Debug] Room {room_id} Sorted Users:", flush=True)
-    for i, u in enumerate(users):
-        role = "HOST" if str(u['user_id']) == host_id else ("AI" if str(u.get('is_ai', False)).lower()=='true' else "HUMAN")
-        print(f"   {i+1}. {u['username']} ({role}) - Joined: {u.get('joined_at')}", flush=True)
-
-    socketio.emit('update_user_list', {'users': users}, room=room_id)
-
-def emit_game_state(room_id):
-    room_key = get_room_key(room_id)
-    raw_data = redis_client.get(room_key)
-    if not raw_data: return
-    room_data = json.loads(raw_data)
-    
-    users_key = f"room:{room_id}:users"
-    users_list = [json.loads(u) for u in redis_client.hvals(users_key)]
-    
-    socketio.emit('game_state_update', {
-        'room': room_data,
-        'users': users_list
-    }, room=room_id)
+    return users
+
+@metrics.tracked('flush_state')
+@with_log_context(room='room_id')
+def flush_room_state(room_id, reasons, session=None):
+    """[Emit Coalescer] 합쳐진 변경을 전송합니다. 핸들러가 커밋한 세션이 있으면 다시 읽지 않습니다."""
+    if session is None:
+        session = room_store.session(room_id)
+    if not session.exists: return
+    room_data = session.room
+    users = sorted_users(room_data, session.players)
+
+    if 'users' in reasons and trace.isEnabledFor(logging.DEBUG):
+        # [Debug] 정렬된 참가자 목록 확인용 (DEBUG에서만 문자열을 만듦)
+        host_id = str(room_data.get('host_id', ''))
+        trace.debug("📋 [Debug] Sorted users: %s", ', '.join(
+            f"{u['username']}({'HOST' if str(u['user_id']) == host_id else ('AI' if is_ai_user(u) else 'HUMAN')})"
+            for u in users))
+
+    state_broadcaster.publish(room_id, room_data, users, rev=session.rev)
+
+# [Emit Coalescer] 같은 tick(또는 EMIT_COALESCE_WINDOW초) 안의 전송 요청은 방마다 한 번으로 합침
+emit_coalescer = EmitCoalescer(flush_room_state, socketio.start_background_task, socketio.sleep,
+                               window=float(os.getenv('EMIT_COALESCE_WINDOW', 0)))
+
+def update_room_users(room_id, session=None):
+    dispatch_room_task({'room_id': room_id, 'kind': 'users'}, session)
+
+def emit_game_state(room_id, session=None):
+    dispatch_room_task({'room_id': room_id, 'kind': 'state'}, session)
+
+def send_state_snapshot(room_id, user_id, sid):
+    """[State Sync] 대기 중인 변경을 먼저 보낸 뒤 해당 소켓에 전체 스냅샷(본인 손패 포함)을 보냅니다."""
+    dispatch_room_task({'room_id': room_id, 'kind': 'snapshot', 'user_id': user_id, 'sid': sid})
+
+def update_room_state(room_id, mutate, retries=3):
+    """
+    [Unit of Work] 방 상태를 한 번 읽어 mutate(session)으로 고치고, rev 확인(CAS)과 함께 한 번에 기록합니다.
+    그 사이 다른 요청이 먼저 기록했으면 새로 읽어 다시 적용합니다.
+    (커밋된 session, mutate 반환값)을 반환하고, 방이 없거나 재시도가 모두 실패하면 (None, None).
+    """
+    for _ in range(retries):
+        session = room_store.session(room_id)
+        if not session.exists:
+            return None, None
+        result = mutate(session)
+        if session.commit():
+            return session, result
+    log.warning("⚠️ [Unit of Work] Room %s kept changing, gave up after %d attempts", room_id, retries)
+    return None, None
 
 # --- AI Engine 초기화 ---
 from ai_engine import AIEngine
 
-print("⏳ [App] Initializing AI Engine...")
+log.info("⏳ [App] Initializing AI Engine...")
 ai_engine = AIEngine(
     card_list_file=CARD_LIST_FILE,
-    static_cards_path=os.path.join(os.path.dirname(__file__), 'static', 'cards'),
+    static_cards_path=STATIC_CARDS_PATH,
     word_pool=WORD_POOL,
-    external_image_url=EXTERNAL_IMAGE_URL
+    external_image_url=EXTERNAL_IMAGE_URL,
+    card_catalog=card_catalog
 )
+# 턴마다 부르는 AI 호출만 측정 (한 번뿐인 warmup은 mindsync_ai_warmup_seconds 게이지로 따로)
+metrics.instrument_methods(ai_engine, ['analyze_storyteller_candidates', 'plan_storyteller_turn',
+                                       'get_best_card', 'get_voted_card'])
+# [Warmup] 모델 로드는 백그라운드에서 진행. 준비 전까지 AI 좌석은 랜덤 모드로 동작
+ai_engine.start_warmup()
 
 # --- AI Logic ---
-def trigger_ai_check(room_id):
-    # socketio.sleep(1.5) # 디버깅을 위해 잠시 주석 처리 or 짧게
-    socketio.sleep(0.5)
-
-    print(f"🔍 [Debug] Triggering AI Check for Room {room_id}", flush=True)
-    room_key = get_room_key(room_id)
-    raw_room = redis_client.get(room_key)
-    if not raw_room: 
-        print(f"   [Debug] Room {room_id} not found in Redis.", flush=True)
+from ai_scheduler import AITurnScheduler
+
+# [AI Scheduler] 좌석별 '생각하는 척' 딜레이 범위 (초). 좌석마다 독립적으로 대기하므로 동시에 고민합니다.
+AI_THINK_TIME = {
+    'storyteller_choosing': (0.5, 1.0),
+    'audience_submitting': (2.5, 4.5),
+    'voting': (3.5, 6.5),
+}
+# [Vote] 마지막 표를 넣은 호출이 결과를 계산합니다. CAS 충돌 시 RESULT_RETRIES번까지 다시 읽어 적용하고,
+# 그래도 실패하면 백그라운드에서 RESULT_RETRY_DELAY초부터 간격을 두 배씩 늘려 (최대 RESULT_RETRY_MAX_DELAY초) 재시도
+RESULT_RETRIES = int(os.getenv('RESULT_RETRIES', 20))
+RESULT_RETRY_DELAY = float(os.getenv('RESULT_RETRY_DELAY', 0.1))
+RESULT_RETRY_MAX_DELAY = float(os.getenv('RESULT_RETRY_MAX_DELAY', 5))
+ai_scheduler = AITurnScheduler(socketio.start_background_task, socketio.sleep)
+
+def is_ai_user(user):
+    return str(user.get('is_ai', False)).lower() == 'true'
+
+def trigger_ai_check(room_id, session=None):
+    dispatch_room_task({'room_id': room_id, 'kind': 'ai'}, session)
+
+@with_log_context(room='room_id')
+def schedule_ai_turns(room_id, session=None):
+    """
+    [AI Scheduler] 방 상태를 한 번 읽고(핸들러가 커밋한 session이 있으면 그대로 사용),
+    이번 페이즈에 아직 행동하지 않은 AI 좌석마다 타이머를 예약합니다.
+    핸들러는 기다리지 않고 바로 반환됩니다. 페이즈가 바뀌면 이전 타이머는 취소되고, 중복 트리거는 합쳐집니다.
+    """
+    if session is None:
+        session = room_store.session(room_id)
+    room_data = session.room
+    if room_data is None:
+        ai_scheduler.cancel_room(room_id)
+        room_owner.release(room_id)
         return
-    room_data = json.loads(raw_room)
-    
-    print(f"   [Debug] Status: {room_data.get('status')}, Phase: {room_data.get('phase')}", flush=True)
-
-    # [Zombie Fix] AI 실행 시점의 목표 라운드와 페이즈를 고정 (NameError 방지)
-    target_phase = room_data.get('phase')
-    target_round = room_data.get('current_round', 1)
+    phase = room_data.get('phase')
+    round_no = room_data.get('current_round', 1)
 
-    if room_data['status'] != 'playing': 
-        print("   [Debug] Game not playing. Skipping AI check.", flush=True)
+    if room_data.get('status') != 'playing' or phase not in AI_THINK_TIME:
+        ai_scheduler.sync(room_id, round_no, None, rev=session.rev)
         return
+    if not ai_scheduler.sync(room_id, round_no, phase, rev=session.rev):
+        return  # 더 최신 상태로 이미 예약됨
+
+    users_map = session.players
+    storyteller_id = room_data.get('storyteller_id')
+    target_limit = int(room_data.get('audience_card_limit', 1))
 
-    users_key = f"room:{room_id}:users"
-    users_map = {uid: json.loads(data) for uid, data in redis_client.hgetall(users_key).items()}
-    
-    # AI 유저 필터링 로직 강화
-    ai_users = []
-    print(f"   [Debug] Checking {len(users_map)} users...", flush=True)
     for uid, u in users_map.items():
-        is_ai_val = u.get('is_ai')
-        is_ai_bool = str(is_ai_val).lower() == 'true'
-        if is_ai_bool:
-            ai_users.append(u)
-        print(f"      - User {u.get('username')} ({uid}): is_ai={is_ai_val} (Type: {type(is_ai_val)}) -> Parsed: {is_ai_bool}", flush=True)
+        if not is_ai_user(u):
+            continue
+        if phase == 'storyteller_choosing':
+            if uid != storyteller_id: continue
+            action = run_ai_storyteller
+        elif uid == storyteller_id:
+            continue
+        elif phase == 'audience_submitting':
+            if u.get('submitted_count', 0) >= target_limit: continue
+            action = run_ai_audience
+        else:
+            if u.get('voted'): continue
+            action = run_ai_voter
+
+        delay = random.uniform(*AI_THINK_TIME[phase])
+        if ai_scheduler.schedule(room_id, round_no, phase, uid, delay, action, room_id, uid, round_no, phase):
+            trace.debug("⏰ [AI Scheduler] R%s %s: %s acts in %.1fs", round_no, phase, u.get('username'), delay)
+
+# --- Room Ownership ---
+# [Cluster] 방마다 lease를 가진 워커 하나만 AI 타이머와 상태 전송(버전 patch 기록)을 담당합니다.
+# 다른 워커에서 처리된 이벤트는 상태만 Redis에 기록하고, 전송/AI 예약은 owner 워커 채널로 넘깁니다.
+def dispatch_room_task(message, session=None):
+    """이 워커가 방의 owner면 바로 처리하고(session은 로컬에서만 재사용), 아니면 owner에게 넘깁니다."""
+    room_id = message['room_id']
+    kind = message['kind']
+    if kind == 'reaped':
+        forget_room(room_id)
+        return
+    if not message.get('hops'):
+        # [Room Lifecycle] 상태가 바뀐 워커에서 한 번만 TTL 갱신 (방마다 주기 제한)
+        room_lifecycle.touch(room_id, session.room if session else None)
+    owned, owner_id = room_owner.claim(room_id)
+    # owner 워커가 죽어 있으면 forward()가 lease를 넘겨받고 False를 돌려주므로 여기서 처리
+    if not owned and room_owner.forward(owner_id, message):
+        return
+    if kind in ('state', 'users'):
+        emit_coalescer.mark_dirty(room_id, kind, session)
+    elif kind == 'ai':
+        schedule_ai_turns(room_id, session)
+    elif kind == 'snapshot':
+        # 스냅샷이 최신 상태를 담도록 대기 중인 변경을 먼저 전송
+        emit_coalescer.flush_now(room_id)
+        state_broadcaster.send_snapshot(room_id, message['user_id'], message['sid'])
+
+def drop_room_ownership(room_id):
+    """lease를 잃으면 이 워커의 타이머와 전송 기록을 버립니다 (새 owner가 스냅샷부터 다시 보냄)."""
+    ai_scheduler.cancel_room(room_id)
+    state_broadcaster.forget(room_id)
+
+def adopt_room(room_id):
+    """만료된 lease를 넘겨받은 방: 진행 중인 AI 차례를 다시 예약하고 상태를 스냅샷으로 다시 보냅니다."""
+    schedule_ai_turns(room_id)
+    emit_coalescer.mark_dirty(room_id, 'state')
+
+room_owner = RoomOwnership(
+    redis_client, socketio.start_background_task, socketio.sleep,
+    worker_id=os.getenv('WORKER_ID') or None,
+    ttl=float(os.getenv('ROOM_LEASE_TTL', 15)),
+    on_message=dispatch_room_task, on_lost=drop_room_ownership, on_adopt=adopt_room,
+)
+room_owner.start()
 
-    print(f"   [Debug] Found {len(ai_users)} AI users.", flush=True)
-    
-    phase = room_data['phase']
-    storyteller_id = room_data['storyteller_id']
+def release_leases_on_exit(signum=None, frame=None):
+    """종료 시 lease를 내려놓아 다른 워커가 TTL을 기다리지 않고 바로 방을 넘겨받게 합니다."""
+    try:
+        room_owner.release_all()
+    except Exception as e:
+        log.warning("⚠️ [Room Owner] Failed to release leases on shutdown (%s)", e)
+    if signum is not None:
+        sys.exit(0)
+
+atexit.register(release_leases_on_exit)
+try:
+    signal.signal(signal.SIGTERM, release_leases_on_exit)
+except ValueError:
+    pass  # 메인 스레드가 아닌 곳에서 import된 경우 (테스트 등)
+
+# --- Room Lifecycle ---
+# [Room Lifecycle] 활동이 있을 때마다 방 키 TTL을 갱신하고, 백그라운드 sweeper가 만료/빈/버려진 방과
+# 고아 키, 소켓 매핑을 SCAN으로 조금씩 정리합니다.
+def forget_room(room_id):
+    """정리된 방의 로컬 상태(AI 타이머, 전송 기록, lease, TTL 갱신 기록)를 버립니다."""
+    drop_room_ownership(room_id)
+    room_owner.release(room_id)
+    room_lifecycle.forget(room_id)
+
+def on_room_reaped(room_id, owner_id):
+    room_ids.release(room_id)
+    room_directory.remove(room_id)
+    if not owner_id or owner_id == room_owner.worker_id \
+            or not room_owner.forward(owner_id, {'room_id': room_id, 'kind': 'reaped'}):
+        forget_room(room_id)
+
+room_lifecycle = RoomLifecycle(
+    redis_client, socketio.start_background_task, socketio.sleep,
+    idle_ttl=float(os.getenv('ROOM_IDLE_TTL', 7200)),
+    game_over_ttl=float(os.getenv('ROOM_GAME_OVER_TTL', 600)),
+    grace=float(os.getenv('ROOM_ABANDON_GRACE', 300)),
+    interval=float(os.getenv('ROOM_SWEEP_INTERVAL', 60)),
+    budget=float(os.getenv('ROOM_SWEEP_BUDGET', 10)),
+    on_reaped=on_room_reaped,
+)
+room_lifecycle.start()
+
+def load_ai_turn(room_id, user_id, round_no, phase):
+    """
+    타이머 실행 시점에 방/좌석을 한 번 읽어 검증합니다.
+    페이즈·라운드가 바뀌었거나 좌석이 사라졌거나 사람이 재접속해 AI가 아니면 None, 아니면 (session, 좌석 유저).
+    """
+    session = room_store.session(room_id)
+    room_data, user = session.room, session.players.get(user_id)
+    if room_data is None or user is None:
+        return None
+    if room_data.get('phase') != phase or room_data.get('current_round', 1) != round_no:
+        log.debug("🛑 [AI Kill Switch] Stale turn for %s (Target: %s/%s, Actual: %s/%s). Skipping.", user.get('username'),
+                  phase, round_no, room_data.get('phase'), room_data.get('current_round'))
+        return None
+    if not is_ai_user(user):
+        return None
+    return session, user
+
+@metrics.tracked('ai_storyteller')
+@with_log_context(room='room_id', user='user_id')
+def run_ai_storyteller(room_id, user_id, round_no, phase):
+    turn = load_ai_turn(room_id, user_id, round_no, phase)
+    if not turn: return
+    session, storyteller_user = turn
+    room_data = session.room
+
+    ai_hand = storyteller_user.get('hand', [])
+    if not ai_hand: return
+    log.debug("[Debug] Storyteller %s is AI. Executing logic...", storyteller_user.get('username'))
+
+    # [Planner] 손패 전체 × 후보 단어(리롤 가능 시 단어 풀 전체)를 한 번에 채점해 (카드, 단어) 결정
+    can_reroll = room_data.get('reroll_count', 0) > 0
+    selected_card_id, final_word, new_candidates = ai_engine.plan_storyteller_turn(
+        ai_hand, room_data['word_candidates'], allow_reroll=can_reroll)
+
+    # 리롤한 경우에만 후보군도 함께 저장 (사람 이야기꾼과 동일하게 리롤 횟수 차감)
+    if new_candidates:
+        log.info("🎲 [AI Storyteller] Rerolled candidates to include '%s'", final_word)
+
+    handle_submit_story({
+        'room_id': room_id,
+        'card_id': selected_card_id,
+        'word': final_word,
+        'user_id': user_id
+    }, is_internal=True, word_candidates=new_candidates)
+
+@metrics.tracked('ai_audience')
+@with_log_context(room='room_id', user='user_id')
+def run_ai_audience(room_id, user_id, round_no, phase):
+    turn = load_ai_turn(room_id, user_id, round_no, phase)
+    if not turn: return
+    session, u = turn
+    room_data = session.room
+
+    selected_word = room_data.get('selected_word')
+    target_limit = int(room_data.get('audience_card_limit', 1))
+    submitted_count = u.get('submitted_count', 0)
+    if submitted_count >= target_limit:
+        log.debug("%s already submitted %d/%d cards. Skipping.", u['username'], submitted_count, target_limit)
+        return
+    log.debug("Processing submission for %s (%d/%d)...", u['username'], submitted_count, target_limit)
 
-    if phase == 'storyteller_choosing':
-        storyteller_user = users_map.get(storyteller_id, {})
-        is_storyteller_ai = str(storyteller_user.get('is_ai')).lower() == 'true'
-        
-        if is_storyteller_ai:
-            print(f"   [Debug] Storyteller {storyteller_user.get('username')} is AI. Executing logic...")
-            ai_hand = storyteller_user.get('hand', [])
-            if ai_hand:
-                # 1. 카드는 랜덤 선택 (다양성을 위해)
-                selected_card = random.choice(ai_hand)
-                
-                # 2. 단어 선택 (Smart Reroll Logic)
-                final_word = None
-                reroll_attempts = 0
-                max_rerolls = 3
-                
-                while reroll_attempts < max_rerolls:
-                    word_candidates = room_data['word_candidates']
-                    # 분석: (단어, 리롤필요여부)
-                    chosen, should_reroll = ai_engine.analyze_storyteller_candidates(selected_card['id'], word_candidates)
-                    
-                    if not should_reroll and chosen:
-                        final_word = chosen
-                        break
-                    
-                    # 리롤 필요한 경우
-                    print(f"🎲 [AI Storyteller] Rerolling candidates... (Attempt {reroll_attempts+1}/{max_rerolls})")
-                    room_data['word_candidates'] = random.sample(WORD_POOL, min(10, len(WORD_POOL)))
-                     # Redis 업데이트 (클라이언트 동기화는 굳이 안 해도 됨, 어차피 AI 내부 결정 과정임)
-                    reroll_attempts += 1
-                
-                # 리롤 다 써도 못 찾으면 -> 현재 후보 중 가장 나은 것(analyze가 None 리턴했을 경우 대비)
-                if not final_word:
-                    # analyze가 None을 반환했다면 리롤 추천 상황 -> 현재 후보 중 Top 1 강제 선택 로직 필요하지만
-                    # 편의상 analyze 함수가 fallback으로 None을 줄 수도 있으므로 다시 호출하거나 랜덤
-                    # 여기서는 그냥 현재 후보 중 랜덤 (혹은 가장 높은 점수) 안전장치
-                    print("⚠️ [AI Storyteller] Max rerolls reached. Picking random.")
-                    final_word = random.choice(room_data['word_candidates'])
-
-                # 최종 결정된 단어 후보군을 Redis 저장 (리롤 했다면 바뀌었으므로)
-                redis_client.set(room_key, json.dumps(room_data))
-
-                handle_submit_story({
-                    'room_id': room_id,
-                    'card_id': selected_card['id'],
-                    'word': final_word,
-                    'user_id': storyteller_id 
-                }, is_internal=True)
-
-    elif phase == 'audience_submitting':
-        print("   [Debug] Phase is audience_submitting. Checking AI submissions...")
-        selected_word = room_data.get('selected_word')
-        target_limit = int(room_data.get('audience_card_limit', 1))
-
-        for u in ai_users:
-            if u['user_id'] == storyteller_id: continue
-            
-            submitted_count = u.get('submitted_count', 0)
-            if submitted_count >= target_limit:
-                print(f"      - {u['username']} alread submitted {submitted_count}/{target_limit} cards. Skipping.")
-                continue 
-            
-            print(f"      - Processing submission for {u['username']} ({submitted_count}/{target_limit})...")
-
-            # [Feature] 인간적인 딜레이 추가 (너무 빠르면 어색함)
-            delay = random.uniform(2.0, 4.0)
-            socketio.sleep(delay)
-
-            # [Zombie Fix] 딜레이 후 상태 검증 (라운드/페이즈 변경 시 종료)
-            curr_room = json.loads(redis_client.get(room_key))
-            if curr_room['phase'] != target_phase or curr_room.get('current_round') != target_round:
-                print(f"🛑 [AI Kill Switch] Zombie process detected (Target: {target_phase}/{target_round}, Actual: {curr_room['phase']}/{curr_room.get('current_round')}). Stopping.")
-                return
+    cards_to_submit = target_limit - submitted_count
 
-            cards_to_submit = target_limit - submitted_count
-            available_hand = u['hand'][:] # 복사본 생성 (원본 보존)
-            
-            # 이미 제출된 카드가 있다면 hand에서 제외해야 함 (재접속/중간 재실행 시 중복 방지)
-            submission_key = f"room:{room_id}:submissions"
-            existing_subs = [json.loads(s) for s in redis_client.hvals(submission_key) if json.loads(s)['user_id'] == u['user_id']]
-            submitted_card_ids = set(s['card_id'] for s in existing_subs)
-            available_hand = [c for c in available_hand if c['id'] not in submitted_card_ids]
-
-            while cards_to_submit > 0 and available_hand:
-                try:
-                    # AI가 제시어와 가장 비슷한 카드를 선택
-                    best_card_id = None
-                    if selected_word:
-                        # [I18n] Extract Korean word for AI Engine
-                        target_word = selected_word['ko'] if isinstance(selected_word, dict) else selected_word
-                        best_card_id = ai_engine.get_best_card(target_word, available_hand)
-                    
-                    pick = None
-                    if not best_card_id:
-                        print(f"⚠️ [AI Audience] Could not find best card for word '{target_word}'. Picking random.")
-                        pick = random.choice(available_hand)
-                    else:
-                        # src 찾기
-                        pick = next((c for c in available_hand if c['id'] == best_card_id), None)
-                        if not pick:
-                            print(f"⚠️ [AI Audience] Best card ID {best_card_id} not in hand. Picking random.")
-                            pick = random.choice(available_hand)
-
-                    handle_submit_card({
-                        'room_id': room_id,
-                        'user_id': u['user_id'],
-                        'card_id': pick['id'],
-                        'card_src': pick['src'],
-                        'username': u['username']
-                    }, is_internal=True)
-                    print(f"🤖 [AI Audience] {u['username']} submitted card {pick['id']} for '{selected_word}'")
-                    
-                    # [Critical Fix] 제출한 카드는 로컬 핸드 목록에서 제거 (중복 제출 방지)
-                    available_hand = [c for c in available_hand if c['id'] != pick['id']]
-                    cards_to_submit -= 1
-
-                    # [Race Condition Fix] 페이즈가 변경되었는지 즉시 확인
-                    # 만약 다른 프로세스/스레드에 의해 이미 투표 단계로 넘어갔다면, 더 이상 제출하지 말고 종료
-                    updated_room = json.loads(redis_client.get(room_key))
-                    if updated_room['phase'] != 'audience_submitting':
-                        print(f"🛑 [Debug] Phase changed to {updated_room['phase']} during AI submission. Stopping AI check.", flush=True)
-                        return
-
-                except Exception as e:
-                    print(f"❌ [AI Error] Audience submission failed for {u['username']}: {e}")
-                    # 치명적 오류 시에도 랜덤 제출 시도 (게임 진행 보장)
-                    try:
-                        pick = random.choice(available_hand)
-                        handle_submit_card({
-                            'room_id': room_id,
-                            'user_id': u['user_id'],
-                            'card_id': pick['id'],
-                            'card_src': pick['src'],
-                            'username': u['username']
-                        }, is_internal=True)
-                        print(f"⚠️ [AI Audience] Recovered with random submission for {u['username']}")
-                        available_hand = [c for c in available_hand if c['id'] != pick['id']]
-                        cards_to_submit -= 1
-                        
-                        # [Race Condition Fix] 오류 복구 후에도 페이즈 체크
-                        updated_room = json.loads(redis_client.get(room_key))
-                        if updated_room['phase'] != 'audience_submitting':
-                            print(f"🛑 [Debug] Phase changed during AI fallback. Stopping.", flush=True)
-                            return
-
-                    except:
-                        pass
-
-    elif phase == 'voting':
-        selected_word = room_data.get('selected_word')
-        voting_candidates = room_data.get('voting_candidates', [])
-        
-        for u in ai_users:
-            if u['user_id'] == storyteller_id: continue
-            if u.get('voted'): continue
+    # 이미 제출된 카드가 있다면 hand에서 제외해야 함 (재접속/중간 재실행 시 중복 방지)
+    submitted_card_ids = set(s['card_id'] for s in session.submissions.values() if s['user_id'] == user_id)
+    available_hand = [c for c in u['hand'] if c['id'] not in submitted_card_ids]
+    # [I18n] Extract Korean word for AI Engine
+    target_word = selected_word['ko'] if isinstance(selected_word, dict) else selected_word
+
+    while cards_to_submit > 0 and available_hand:
+        try:
+            # AI가 제시어와 가장 비슷한 카드를 선택
+            best_card_id = ai_engine.get_best_card(target_word, available_hand) if target_word else None
+
+            pick = None
+            if not best_card_id:
+                log.warning("⚠️ [AI Audience] Could not find best card for word '%s'. Picking random.", target_word)
+                pick = random.choice(available_hand)
+            else:
+                # src 찾기
+                pick = next((c for c in available_hand if c['id'] == best_card_id), None)
+                if not pick:
+                    log.warning("⚠️ [AI Audience] Best card ID %s not in hand. Picking random.", best_card_id)
+                    pick = random.choice(available_hand)
+        except Exception as e:
+            # 치명적 오류 시에도 랜덤 제출 (게임 진행 보장)
+            log.exception("❌ [AI Error] Audience submission failed for %s: %s", u['username'], e)
+            pick = random.choice(available_hand)
+
+        status = handle_submit_card({
+            'room_id': room_id,
+            'user_id': user_id,
+            'card_id': pick['id'],
+            'card_src': pick['src'],
+            'username': u['username']
+        }, is_internal=True)
+        log.debug("🤖 [AI Audience] %s submitted card %s for '%s'", u['username'], pick['id'], selected_word)
+
+        # [Critical Fix] 제출한 카드는 로컬 핸드 목록에서 제거 (중복 제출 방지)
+        available_hand = [c for c in available_hand if c['id'] != pick['id']]
+        cards_to_submit -= 1
+
+        # [Race Condition Fix] 2장 제출 모드에서 이미 투표 단계로 넘어갔다면 더 내지 않음
+        if cards_to_submit > 0 and status not in ('submitted', 'waiting'):
+            log.debug("🛑 [Debug] Phase changed during AI submission. Stopping.")
+            return
+
+@metrics.tracked('ai_voter')
+@with_log_context(room='room_id', user='user_id')
+def run_ai_voter(room_id, user_id, round_no, phase):
+    turn = load_ai_turn(room_id, user_id, round_no, phase)
+    if not turn: return
+    session, u = turn
+    room_data = session.room
+    if u.get('voted'): return
+
+    selected_word = room_data.get('selected_word')
+    voting_candidates = room_data.get('voting_candidates', [])
+
+    # 본인이 낸 카드 ID 찾기
+    my_card_id = next((c['card_id'] for c in voting_candidates if c['user_id'] == user_id), None)
 
-            # 내 카드는 제외하고 투표해야 함 (voting_candidates에는 내 카드가 포함되어 있을 수 있음)
-            # 서버 로직상 본인 카드 투표 방지는 handle_submit_vote 내부에는 없으므로(클라이언트가 막음), AI도 걸러줘야 함
-            # 하지만 voting_candidates는 익명화된 상태라 user_id가 있음.
-            
-            # [Feature] 투표 고민하는 척 딜레이
-            delay = random.uniform(3.0, 6.0)
-            socketio.sleep(delay)
-
-            # [Zombie Fix] 딜레이 후 상태 검증
-            curr_room = json.loads(redis_client.get(room_key))
-            if curr_room['phase'] != target_phase or curr_room.get('current_round') != target_round:
-                 print(f"🛑 [AI Kill Switch] Zombie process detected during voting. Stopping.")
-                 return
-
-            # 본인이 낸 카드 ID 찾기
-            my_submission_key = f"room:{room_id}:submissions"
-            submissions_map = redis_client.hgetall(my_submission_key)
-            my_card_id = None
-            for cid, sub_json in submissions_map.items():
-                sub = json.loads(sub_json)
-                if sub['user_id'] == u['user_id']:
-                    my_card_id = cid
-                    break
-            
-            # [Fix] 본인 카드는 투표 후보에서 제외
-            valid_candidates = [c for c in voting_candidates if c['user_id'] != u['user_id']]
-
-            # AI가 정답(혹은 가장 유사한 카드)을 추론
-            # [I18n] Extract Korean word for AI Engine
-            target_word = selected_word['ko'] if isinstance(selected_word, dict) else selected_word
-            target_card_id = ai_engine.get_voted_card(target_word, valid_candidates, my_card_id=my_card_id)
-            
-            if target_card_id:
-                handle_submit_vote({
-                    'room_id': room_id,
-                    'user_id': u['user_id'],
-                    'card_id': target_card_id
-                }, is_internal=True)
+    # [Fix] 본인 카드는 투표 후보에서 제외
+    valid_candidates = [c for c in voting_candidates if c['user_id'] != user_id]
+
+    # AI가 정답(혹은 가장 유사한 카드)을 추론
+    # [I18n] Extract Korean word for AI Engine
+    target_word = selected_word['ko'] if isinstance(selected_word, dict) else selected_word
+    target_card_id = ai_engine.get_voted_card(target_word, valid_candidates, my_card_id=my_card_id)
+
+    if target_card_id:
+        handle_submit_vote({
+            'room_id': room_id,
+            'user_id': user_id,
+            'card_id': target_card_id
+        }, is_internal=True)
+
+# --- Disconnect Reaper ---
+def next_host(players, leaving_id, humans_only=False):
+    """방장 승계 대상: 접속 중인 사람 우선(같으면 먼저 들어온 순), humans_only가 아니면 없을 때 AI 포함. 없으면 None."""
+    candidates = [u for uid, u in players.items() if uid != leaving_id]
+    humans = [u for u in candidates if not is_ai_user(u) and u.get('connected', True)]
+    pool = humans if humans or humans_only else candidates
+    if not pool:
+        return None
+    return min(pool, key=lambda u: u.get('joined_at', 0))['user_id']
+
+@metrics.tracked('disconnect_expired')
+@with_log_context(room='room_id', user='user_id')
+def expire_disconnected(room_id, user_id):
+    """
+    [Disconnect Reaper] 유예 시간이 지나도 다시 접속하지 않은 유저 정리.
+    게임 중이면 AI로 전환하고, 대기실이면 내보냅니다. 방장이었으면 승계합니다 (모두 CAS 커밋 한 번).
+    """
+    def settle(session):
+        user = session.players.get(user_id)
+        # 유예 중에 다시 접속했거나 이미 정리됨
+        if user is None or user.get('connected', True) or is_ai_user(user):
+            return None
+        playing = session.room.get('status') == 'playing'
+        if playing:
+            username = user['username']
+            if "(AI)" not in username:
+                username += " (AI)"
+            session.set_player(user_id, is_ai=True, username=username)
+        else:
+            username = user['username']
+            session.remove_player(user_id)
+        new_host = None
+        if session.room.get('host_id') == user_id:
+            new_host = next_host(session.players, user_id, humans_only=playing)
+            if new_host:
+                session.set_room(host_id=new_host)
+        return playing, username, new_host
+
+    session, result = update_room_state(room_id, settle)
+    if not result:
+        return
+    playing, username, new_host = result
+    if playing:
+        socketio.emit('notification', {'type': 'warning', 'key': 'notification_disconnect_ai', 'params': {'name': username}}, room=room_id)
+    else:
+        log.info("🚪 [Lobby] Removed %s from room %s after disconnect grace period", username, room_id)
+    if new_host:
+        socketio.emit('notification', {'type': 'info', 'key': 'notification_host_changed'}, room=room_id)
+    if new_host or not playing:
+        room_directory.refresh(room_id)
+    update_room_users(room_id, session)
+    if playing:
+        trigger_ai_check(room_id, session)
+
+# [Disconnect Reaper] 끊긴 유저는 DISCONNECT_GRACE초 뒤 백그라운드 루프 하나가 모아서 정리합니다
+disconnect_reaper = DisconnectReaper(
+    redis_client, socketio.start_background_task, socketio.sleep,
+    grace=float(os.getenv('DISCONNECT_GRACE', 3)),
+    on_expired=expire_disconnected,
+)
+disconnect_reaper.start()
+
+# --- Metrics ---
+# [Metrics] /api/metrics 요청 때만 계산되는 게이지
+def ai_task_counts():
+    status = ai_scheduler.status()
+    return {('pending',): status['pending'] - status['running'], ('running',): status['running']}
+
+metrics.gauge('mindsync_rooms', 'Rooms in the lobby directory, by status', ('status',),
+              lambda: {(status,): n for status, n in room_directory.counts().items()})
+metrics.gauge('mindsync_active_rooms', 'Rooms tracked in rooms:active', (),
+              lambda: redis_client.scard(ACTIVE_ROOMS_KEY))
+metrics.gauge('mindsync_owned_rooms', 'Rooms whose lease this worker holds', (),
+              lambda: len(room_owner.owned_rooms()))
+metrics.gauge('mindsync_ai_tasks', 'AI turn timers on this worker', ('state',), ai_task_counts)
+metrics.gauge('mindsync_pending_disconnects', 'Disconnected players waiting for the grace period', (),
+              disconnect_reaper.pending)
+metrics.gauge('mindsync_ai_warmup_seconds', 'AI engine warmup time (still growing while it runs)', (),
+              lambda: ai_engine.status()['elapsed'] or 0)
 
 # --- Socket Events ---
 @socketio.on('connect')
@@ -398,108 +645,54 @@ def handle_connect():
 
 @socketio.on('disconnect')
 def handle_disconnect():
+    """[Disconnect Reaper] 끊김 표시와 유예 만료 시각만 기록하고 바로 반환합니다 (정리는 expire_disconnected)."""
     user_map_key = f"socket_map:{request.sid}"
     mapping_data = redis_client.get(user_map_key)
-    
-    if mapping_data:
-        data = json.loads(mapping_data)
-        room_id = data.get('room_id')
-        user_id = data.get('user_id')
-        
-        if room_id and user_id:
-            users_key = f"room:{room_id}:users"
-            user_json = redis_client.hget(users_key, user_id)
-            
-            room_key = get_room_key(room_id)
-            room_raw = redis_client.get(room_key)
-            if room_raw:
-                room_data = json.loads(room_raw)
-                # 방장이 나갔을 경우 방장 승계 로직 (여기서는 즉시 처리하지 않고 아래 sleep 후 처리로 위임)
-                # if room_data.get('host_id') == user_id:
-                #     remaining_ids = [uid for uid in redis_client.hkeys(users_key) if uid != user_id]
-                #     if remaining_ids:
-                #         room_data['host_id'] = remaining_ids[0]
-                #         redis_client.set(room_key, json.dumps(room_data))
-                #         emit('notification', {'message': '👑 방장이 변경되었습니다.'}, room=room_id)
-
-            if user_json:
-                user = json.loads(user_json)
-                room_key = get_room_key(room_id)
-                room_raw = redis_client.get(room_key)
-                
-                # 게임 중이면 AI로 전환
-                if room_raw and json.loads(room_raw)['status'] == 'playing':
-                    user['is_ai'] = True
-                    if "(AI)" not in user['username']:
-                        user['username'] += " (AI)"
-                    redis_client.hset(users_key, user_id, json.dumps(user))
-                    emit('notification', {'type': 'warning', 'key': 'notification_disconnect_ai', 'params': {'name': user['username']}}, room=room_id)
-                    update_room_users(room_id)
-                    trigger_ai_check(room_id)
-                else:
-                    # [Lobby] 대기실에서는 즉시 삭제하지 않고 잠시 대기 (새로고침 지원)
-                    # 1. 연결 끊김 표시
-                    user['connected'] = False
-                    redis_client.hset(users_key, user_id, json.dumps(user))
-                    
-                    # 2. 3초 대기 (새로고침 시 재접속 시간 허용)
-                    socketio.sleep(3)
-                    
-                    # 3. 상태 다시 확인
-                    current_user_json = redis_client.hget(users_key, user_id)
-                    if current_user_json:
-                        current_user = json.loads(current_user_json)
-                        # 만약 재접속했으면(connected=True) 삭제하지 않음
-                        if current_user.get('connected', False):
-                            print(f"♻️ [Lobby] User {user['username']} reconnected via refresh. Skipping cleanup.")
-                            return
-
-                        # 여전히 끊겨있으면 삭제 진행
-                        redis_client.hdel(users_key, user_id)
-                        update_room_users(room_id)
-
-                        # 만약 방장이었다면 방장 승계 (삭제 후 남아있는 사람 중)
-                        room_data = json.loads(redis_client.get(room_key)) # 최신 데이터 조회
-                        if room_data.get('host_id') == user_id:
-                            remaining_ids = [uid for uid in redis_client.hkeys(users_key) if uid != user_id]
-                            if remaining_ids:
-                                room_data['host_id'] = remaining_ids[0]
-                                redis_client.set(room_key, json.dumps(room_data))
-                                emit('notification', {'type': 'info', 'key': 'notification_host_changed'}, room=room_id)
-                            else:
-                                # 방에 아무도 없으면 방 삭제 고려 (여기선 단순 유지)
-                                pass
-
-            redis_client.delete(user_map_key)
-            if room_raw and json.loads(room_raw)['status'] == 'playing':
-                 emit_game_state(room_id) 
+    if not mapping_data:
+        return
+    redis_client.delete(user_map_key)
+
+    data = json.loads(mapping_data)
+    room_id = data.get('room_id')
+    user_id = data.get('user_id')
+    if not (room_id and user_id) or not room_store.has_player(room_id, user_id):
+        return
+
+    # 새로고침/네트워크 순단이면 유예 시간 안에 다시 join_game으로 connected=True가 됨
+    room_store.update_player(room_id, user_id, {'connected': False})
+    disconnect_reaper.schedule(room_id, user_id)
 
 @socketio.on('join_game')
 def handle_join_game(data):
     room_id = data.get('room_id')
     user_id = data.get('user_id')
     username = data.get('username')
-    
+
+    # [Room Lifecycle] 정리된(만료된) 방에 다시 들어오면 참가자 키만 새로 생기지 않도록 로비로 돌려보냄
+    if not room_store.room_exists(room_id):
+        emit('error', {'message': '방을 찾을 수 없습니다.'})
+        return
+
     join_room(room_id)
-    users_key = f"room:{room_id}:users"
-    existing = redis_client.hget(users_key, user_id)
+    # [State Sync] 손패 등 본인 전용 데이터를 받는 채널
+    join_room(user_channel(room_id, user_id))
+    existing = room_store.get_player(room_id, user_id)
     
     # [수정됨] 재접속 처리 로직 강화
     if existing:
-        user_info = json.loads(existing)
         # 이미 존재한다면 AI 상태 해제 및 제어권 회복
-        user_info['is_ai'] = False
-        user_info['username'] = username.replace(" (AI)", "") # AI 태그 제거한 원래 이름 복구
+        restored_name = username.replace(" (AI)", "") # AI 태그 제거한 원래 이름 복구
         
         # 만약 연결이 끊겨서 AI로 이름이 바뀌어 있었다면 알림
-        if "(AI)" in json.loads(existing).get('username', ''):
-             emit('notification', {'type': 'success', 'key': 'notification_user_reconnected', 'params': {'name': user_info['username']}}, room=room_id)
+        if "(AI)" in existing.get('username', ''):
+             emit('notification', {'type': 'success', 'key': 'notification_user_reconnected', 'params': {'name': restored_name}}, room=room_id)
         
         # [Refresh Fix] 재접속 시 status 업데이트
-        user_info['connected'] = True
+        room_store.update_player(room_id, user_id, {'is_ai': False, 'username': restored_name, 'connected': True})
+        disconnect_reaper.cancel(room_id, user_id)
     else:
         # 신규 입장
-        user_info = {
+        room_store.add_player(room_id, {
             'user_id': user_id,
             'username': username,
             'ready': False,
@@ -508,22 +701,28 @@ def handle_join_game(data):
             'is_ai': False,
             'connected': True, # [Refresh Fix] 연결 상태 초기화
             'joined_at': time.time() # [Sort Fix] 입장 시간 기록
-        }
+        })
     
-    redis_client.hset(users_key, user_id, json.dumps(user_info))
     redis_client.set(f"socket_map:{request.sid}", json.dumps({'room_id': room_id, 'user_id': user_id}))
     
-    room_key = get_room_key(room_id)
-    room_data_raw = redis_client.get(room_key)
-    if room_data_raw:
-        room_data = json.loads(room_data_raw)
-        # 방장이 없으면 현재 접속자를 방장으로 지정 (방장이 나가서 빈 자리가 된 경우 등)
-        if not room_data.get('host_id'):
-            room_data['host_id'] = user_id
-            redis_client.set(room_key, json.dumps(room_data))
+    # 방장이 없으면 현재 접속자를 방장으로 지정 (방장이 나가서 빈 자리가 된 경우 등)
+    if room_store.room_exists(room_id) and not room_store.get_room_field(room_id, 'host_id'):
+        room_store.update_room(room_id, {'host_id': user_id})
 
+    room_directory.refresh(room_id)
     update_room_users(room_id)
     emit_game_state(room_id)
+    send_state_snapshot(room_id, user_id, request.sid)
+
+@socketio.on('sync_state')
+def handle_sync_state(data=None):
+    """[State Sync] 클라이언트 버전이 어긋났을 때 전체 스냅샷 재전송 (본인 손패 포함)."""
+    mapping_data = redis_client.get(f"socket_map:{request.sid}")
+    # ack로 거절을 알려 클라이언트가 재요청 대기(pending)를 풀게 합니다
+    if not mapping_data: return False
+    mapping = json.loads(mapping_data)
+    send_state_snapshot(mapping['room_id'], mapping['user_id'], request.sid)
+    return True
 
 @socketio.on('update_profile')
 def handle_update_profile(data):
@@ -531,12 +730,8 @@ def handle_update_profile(data):
     user_id = data.get('user_id')
     new_name = data.get('username')
     
-    users_key = f"room:{room_id}:users"
-    user_json = redis_client.hget(users_key, user_id)
-    if user_json:
-        user = json.loads(user_json)
-        user['username'] = new_name
-        redis_client.hset(users_key, user_id, json.dumps(user))
+    if room_store.has_player(room_id, user_id):
+        room_store.update_player(room_id, user_id, {'username': new_name})
         update_room_users(room_id)
 
 @socketio.on('add_ai')
@@ -544,22 +739,18 @@ def handle_add_ai(data):
     room_id = data.get('room_id')
     requester_id = data.get('user_id')
     
-    room_key = get_room_key(room_id)
-    room_data = json.loads(redis_client.get(room_key))
-    
     # 권한 체크: 방장만 가능
-    if room_data.get('host_id') != requester_id:
+    if room_store.get_room_field(room_id, 'host_id') != requester_id:
         return
         
-    users_key = f"room:{room_id}:users"
-    if redis_client.hlen(users_key) >= 6: # 최대 인원 제한
+    if room_store.count_players(room_id) >= 6: # 최대 인원 제한
         return
 
     ai_names = ["AlphaGo", "Jarvis", "Hal-9000", "Skynet", "GLaDOS", "T-800", "Wall-E"]
     ai_id = f"ai_{uuid.uuid4().hex[:6]}"
     
     # [Unique Name Logic]
-    current_users = [json.loads(u) for u in redis_client.hvals(users_key)]
+    current_users = room_store.get_players(room_id).values()
     existing_names = set(u['username'].replace(" (AI)", "") for u in current_users) # AI 태그 제외하고 비교
 
     random.shuffle(ai_names)
@@ -591,7 +782,8 @@ def handle_add_ai(data):
         'joined_at': time.time() # [Sort Fix] AI 입장 시간 기록
     }
     
-    redis_client.hset(users_key, ai_id, json.dumps(ai_user))
+    room_store.add_player(room_id, ai_user)
+    room_directory.refresh(room_id)
     update_room_users(room_id)
     emit('notification', {'type': 'success', 'key': 'notification_ai_added', 'params': {'name': ai_name}}, room=room_id)
 
@@ -601,22 +793,18 @@ def handle_kick_user(data):
     requester_id = data.get('user_id')
     target_id = data.get('target_user_id')
 
-    room_key = get_room_key(room_id)
-    room_data = json.loads(redis_client.get(room_key))
-
     # 권한 체크: 방장만 가능
-    if room_data.get('host_id') != requester_id:
+    if room_store.get_room_field(room_id, 'host_id') != requester_id:
         return
 
-    users_key = f"room:{room_id}:users"
-    target_user_json = redis_client.hget(users_key, target_id)
+    target_user = room_store.get_player(room_id, target_id)
     
-    if target_user_json:
-        target_user = json.loads(target_user_json)
+    if target_user:
         username = target_user.get('username')
         
         # Redis에서 삭제
-        redis_client.hdel(users_key, target_id)
+        room_store.remove_player(room_id, target_id)
+        room_directory.refresh(room_id)
         
         # 소켓 맵에서도 삭제 (재접속 시 방에 다시 들어오는 것 방지)
         # 단, 실제 소켓 연결은 끊지 않음 (클라이언트가 'kicked' 이벤트 받고 처리)
@@ -637,18 +825,21 @@ def handle_refresh_words(data):
     room_id = data.get('room_id')
     user_id = data.get('user_id')
 
-    room_key = get_room_key(room_id)
-    room_data = json.loads(redis_client.get(room_key))
+    def reroll(session):
+        room_data = session.room
+        if room_data.get('storyteller_id') != user_id or room_data.get('reroll_count', 0) <= 0:
+            return False
+        session.set_room(word_candidates=random.sample(WORD_POOL, min(10, len(WORD_POOL))),
+                         reroll_count=room_data['reroll_count'] - 1)
+        return True
 
-    if room_data['storyteller_id'] == user_id and room_data.get('reroll_count', 0) > 0:
-        room_data['word_candidates'] = random.sample(WORD_POOL, min(10, len(WORD_POOL)))
-        room_data['reroll_count'] -= 1
-        redis_client.set(room_key, json.dumps(room_data))
-        emit_game_state(room_id)
+    session, rerolled = update_room_state(room_id, reroll)
+    if rerolled:
+        emit_game_state(room_id, session)
 
 @socketio.on('start_game')
 def handle_start_game(data):
-    print(f"🎮 [Debug] Received start_game event: {data}", flush=True)
+    log.debug("🎮 [Debug] Received start_game event: %s", data)
     room_id = data.get('room_id')
     try:
         rounds_per_user = int(data.get('rounds_per_user', 2))
@@ -656,59 +847,44 @@ def handle_start_game(data):
         rounds_per_user = 2
 
     try:
-        all_cards = []
-        if os.path.exists(CARD_LIST_FILE):
-            with open(CARD_LIST_FILE, 'r', encoding='utf-8') as f:
-                all_cards = json.load(f)
-        else:
-            static_cards_path = os.path.join(os.path.dirname(__file__), 'static', 'cards')
-            if os.path.exists(static_cards_path):
-                all_cards = [f for f in os.listdir(static_cards_path) 
-                             if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
+        # [Card Catalog] 파일을 다시 읽지 않고 메모리의 카드 목록 사용
+        all_cards = list(card_catalog.ids)
 
         if not all_cards:
             emit('error', {'message': '카드 목록(card_list.json)이 없거나 비어있습니다.'}, room=room_id)
             return
 
         random.shuffle(all_cards)
-        deck_key = f"room:{room_id}:deck"
-        redis_client.delete(deck_key)
-        redis_client.rpush(deck_key, *all_cards)
 
-        users_key = f"room:{room_id}:users"
-        user_ids = redis_client.hkeys(users_key)
+        players = room_store.get_players(room_id)
+        user_ids = list(players)
         
         random.shuffle(user_ids)
         num_users = len(user_ids)
         required_card_count = 2 if num_users == 3 else 1
 
-        for uid in user_ids:
-            user = json.loads(redis_client.hget(users_key, uid))
-            hand = []
-            for _ in range(7):
-                f = redis_client.lpop(deck_key)
-                if f:
-                    hand.append({'id': f, 'src': get_card_url(f), 'is_new': False})
-            user['hand'] = hand
-            user['score'] = 0
-            user['submitted_count'] = 0
-            user['submitted'] = False
-            user['voted'] = False
+        # [Batch] 섞은 카드에서 바로 7장씩 나눠주고 남은 카드만 덱에 넣습니다 (LPOP 반복 없음)
+        hands, player_fields = {}, {}
+        for i, uid in enumerate(user_ids):
+            hands[uid] = [{'id': f, 'src': get_card_url(f), 'is_new': False} for f in all_cards[i * 7:(i + 1) * 7]]
+            fields = {'score': 0, 'submitted_count': 0, 'submitted': False, 'voted': False}
             # [Fix] AI 상태 보존 (기존에는 False로 초기화해버려서 AI가 일반 유저가 됨)
-            # user['is_ai'] = False  <-- This was the bug
             # 만약 is_ai 키가 없다면 False로, 있다면 그대로 유지
-            if 'is_ai' not in user:
-                user['is_ai'] = False
-            
-            redis_client.hset(users_key, uid, json.dumps(user))
-
-        room_key = get_room_key(room_id)
-        room_data = redis_client.get(room_key)
-        if room_data:
-            rd = json.loads(room_data)
+            if 'is_ai' not in players[uid]:
+                fields['is_ai'] = False
+            player_fields[uid] = fields
+        deck = all_cards[num_users * 7:]
+
+        if room_store.room_exists(room_id):
             total_rounds = num_users * rounds_per_user
 
-            rd.update({
+            # 덱, 손패, 참가자, 방 상태를 MULTI 한 번으로 기록
+            pipe = redis_client.pipeline()
+            deck_key = f"room:{room_id}:deck"
+            pipe.delete(deck_key, f"room:{room_id}:submissions", f"room:{room_id}:votes")
+            if deck:
+                pipe.rpush(deck_key, *deck)
+            room_store.stage(pipe, room_id, players=player_fields, hands=hands, room={
                 'status': 'playing',
                 'phase': 'storyteller_choosing',
                 'current_round': 1,
@@ -719,176 +895,142 @@ def handle_start_game(data):
                 'audience_card_limit': required_card_count,
                 'reroll_count': 10 
             })
-            redis_client.set(room_key, json.dumps(rd))
-            
-            redis_client.delete(f"room:{room_id}:submissions")
-            redis_client.delete(f"room:{room_id}:votes")
-            
+            pipe.execute()
+            room_directory.refresh(room_id)
+
             emit_game_state(room_id)
             trigger_ai_check(room_id)
 
     except Exception as e:
-        print(f"🔥 Error in start_game: {e}", flush=True)
+        log.exception("🔥 Error in start_game: %s", e)
 
 @socketio.on('submit_story')
-def handle_submit_story(data, is_internal=False):
+def handle_submit_story(data, is_internal=False, word_candidates=None):
     room_id = data.get('room_id')
-    room_key = get_room_key(room_id)
-    room_data = json.loads(redis_client.get(room_key))
-    
-    room_data['selected_word'] = data.get('word')
-    room_data['storyteller_card_id'] = data.get('card_id')
-    room_data['phase'] = 'audience_submitting'
-    redis_client.set(room_key, json.dumps(room_data))
-    
-    submission_key = f"room:{room_id}:submissions"
-    uid = data.get('user_id') if is_internal else room_data['storyteller_id']
-    
-    users_key = f"room:{room_id}:users"
-    user_json = redis_client.hget(users_key, uid)
-    storyteller_name = json.loads(user_json).get('username', 'Unknown') if user_json else "Unknown"
+    card_id = data.get('card_id')
 
-    storyteller_submission = {
-        'user_id': uid,
-        'card_id': data.get('card_id'),
-        'card_src': get_card_url(data.get('card_id')),
-        'is_storyteller': True,
-        'username': storyteller_name 
-    }
-    redis_client.hset(submission_key, data.get('card_id'), json.dumps(storyteller_submission))
+    def choose(session):
+        room_data = session.room
+        if room_data.get('phase') != 'storyteller_choosing':
+            return False
+        uid = data.get('user_id') if is_internal else room_data.get('storyteller_id')
+        # AI 이야기꾼이 단어를 리롤했으면 후보군도 같은 커밋에 기록
+        if word_candidates:
+            session.set_room(word_candidates=word_candidates, reroll_count=room_data.get('reroll_count', 0) - 1)
+        session.set_room(selected_word=data.get('word'), storyteller_card_id=card_id, phase='audience_submitting')
+
+        storyteller = session.players.get(uid)
+        storyteller_name = storyteller.get('username', 'Unknown') if storyteller else "Unknown"
+        session.add_submission(card_id, {
+            'user_id': uid,
+            'card_id': card_id,
+            'card_src': get_card_url(card_id),
+            'is_storyteller': True,
+            'username': storyteller_name 
+        })
+        return True
+
+    session, chosen = update_room_state(room_id, choose)
+    if session is None and is_internal:
+        # AI 이야기꾼의 선택이 CAS 충돌로 끝내 밀렸으면 좌석을 다시 예약 (지금 실행 중인 타이머가 끝난 뒤 재실행)
+        trigger_ai_check(room_id)
+    if not chosen: return
     
-    emit_game_state(room_id)
-    trigger_ai_check(room_id)
+    emit_game_state(room_id, session)
+    trigger_ai_check(room_id, session)
 
 @socketio.on('submit_card')
 def handle_submit_card(data, is_internal=False):
     room_id = data.get('room_id')
     user_id = data.get('user_id')
-    card_id = data.get('card_id')
     
-    # [Fix] 먼저 유저 상태와 제출 제한을 확인하여 초과 제출 방지
-    users_key = f"room:{room_id}:users"
-    user_json = redis_client.hget(users_key, user_id)
-    if not user_json: return
-    user = json.loads(user_json)
-
-    room_key = get_room_key(room_id)
-    room_data = json.loads(redis_client.get(room_key))
-    target = int(room_data.get('audience_card_limit', 1))
-
-    current_count = user.get('submitted_count', 0)
-    if current_count >= target:
-        print(f"⚠️ [Debug] User {user['username']} tried to submit extra card ({current_count}/{target}). Ignored.", flush=True)
-        return
-
-    # 제출 처리 진행
-    submission_key = f"room:{room_id}:submissions"
     sub_data = {
         'user_id': user_id,
-        'card_id': card_id,
+        'card_id': data.get('card_id'),
         'card_src': data.get('card_src'),
         'username': data.get('username'),
         'is_storyteller': False
     }
-    redis_client.hset(submission_key, card_id, json.dumps(sub_data))
-    
-    user['submitted_count'] = current_count + 1
-    
-    if user['submitted_count'] >= target:
-        user['submitted'] = True
-    
-    redis_client.hset(users_key, user_id, json.dumps(user))
-    
-    total_users = redis_client.hlen(users_key)
-    total_required = (total_users - 1) * target + 1
-    curr_sub = redis_client.hlen(submission_key)
-    
-    print(f"📊 [Debug] Submission Check: Current={curr_sub}, Users={total_users}, TargetPerUser={target}, Required={total_required}", flush=True)
-
-    # [Safety Net] 만약 제출 수가 유저 수보다 크거나 같으면 (최소 1장씩은 냈다는 뜻) 강제 진행
-    # (비정상적인 상황 방지)
-    force_transition = False
-    if curr_sub >= total_required:
-        # [Critical Fix] 단순히 총 개수만 확인하는 것이 아니라, 모든 유저가 실제로 제출했는지 검증
-        # (AI가 중복 제출하거나 카운트 오류가 있어도, 사람이 안 냈으면 넘어가지 않도록 방지)
-        all_users_submitted = True
-        users_data = redis_client.hgetall(users_key)
-        
-        storyteller_id = room_data.get('storyteller_id')
-        
-        for uid, u_json in users_data.items():
-            if uid == storyteller_id: continue # 이야기꾼은 audience 카드를 내지 않으므로 제외
-            
-            u = json.loads(u_json)
-            if u.get('submitted_count', 0) < target:
-                print(f"🛑 [Debug] Hold transition: User {u['username']} has not submitted enough cards ({u.get('submitted_count', 0)}/{target})", flush=True)
-                all_users_submitted = False
-                break
-        
-        if all_users_submitted:
-            force_transition = True
-        else:
-            print("⚠️ [Debug] Total count met but not all users submitted. Waiting...", flush=True)
-
-    elif curr_sub >= total_users and target == 1:
-        print("⚠️ [Debug] Force transition triggered (Count mismatch safely handled)", flush=True)
-        force_transition = True
-
-    if force_transition:
-        print("🚀 [Debug] Transitioning to Voting Phase!", flush=True)
-        room_data['phase'] = 'voting'
-        subs = [json.loads(s) for s in redis_client.hvals(submission_key)]
-        random.shuffle(subs)
-        room_data['voting_candidates'] = subs
-        redis_client.set(room_key, json.dumps(room_data))
-        redis_client.delete(f"room:{room_id}:votes")
-        
-        # [Race Condition Fix] 상태 변경 알리고 즉시 리턴하여 중복 처리 방지
-        emit_game_state(room_id)
-        trigger_ai_check(room_id)
-        return
+    # [Atomic] 제출 제한 확인, 제출 기록, 카운터 증가, 투표 페이즈 전환 판단까지 Lua 스크립트 한 번으로 처리
+    # (동시에 들어온 AI/사람 제출도 전환은 정확히 한 번만 일어남)
+    result = room_store.submit_card(room_id, user_id, sub_data, seed=random.randrange(2 ** 31))
+    status = result['status']
+
+    if status in ('phase', 'missing'):
+        return status
+    if status in ('limit', 'duplicate'):
+        trace.debug("⚠️ [Debug] User %s tried to submit extra card (%s/%s, %s). Ignored.",
+                    data.get('username'), result['count'], result['required'], status)
+        return status
+
+    trace.debug("📊 [Debug] Submission Check: Current=%s, Required=%s, Status=%s",
+                result['submissions'], result['required'], status)
+    if status == 'waiting':
+        trace.debug("🛑 [Debug] Hold transition: User %s has not submitted enough cards", result['waiting_for'])
+    elif status == 'voting':
+        log.info("🚀 [Game] Transitioning to Voting Phase")
     
-    emit_game_state(room_id)
-    trigger_ai_check(room_id)
+    # 전송과 AI 예약은 스크립트 직후 한 번 읽은 상태를 함께 사용
+    session = room_store.session(room_id)
+    emit_game_state(room_id, session)
+    trigger_ai_check(room_id, session)
+    return status
 
 @socketio.on('submit_vote')
 def handle_submit_vote(data, is_internal=False):
     room_id = data.get('room_id')
     voter_id = data.get('user_id')
     
-    vote_key = f"room:{room_id}:votes"
-    redis_client.hset(vote_key, voter_id, data.get('card_id'))
-    
-    users_key = f"room:{room_id}:users"
-    user = json.loads(redis_client.hget(users_key, voter_id))
-    user['voted'] = True
-    redis_client.hset(users_key, voter_id, json.dumps(user))
-    
-    total_users = redis_client.hlen(users_key)
-    vote_count = redis_client.hlen(vote_key)
-    
-    if vote_count >= total_users - 1:
-        # [Fix] 중복 계산 방지: 이미 결과 페이즈라면 계산 스킵
-        latest_room = json.loads(redis_client.get(get_room_key(room_id)))
-        if latest_room['phase'] == 'result':
-            print("⚠️ [Debug] Round result already calculated. Skipping.", flush=True)
-        else:
-            calculate_round_result(room_id)
+    # [Atomic] 투표 기록과 결과 페이즈 전환 판단을 한 번에 처리. 마지막 표를 넣은 호출만 'result'를 받음
+    result = room_store.submit_vote(room_id, voter_id, data.get('card_id'))
+    if result['status'] == 'result':
+        # voting_closed가 선 뒤에는 이 호출만 결과를 계산하므로, 다른 쓰기와 겹쳐도 끝날 때까지 다시 시도
+        session, closed = update_room_state(room_id, calculate_round_result, retries=RESULT_RETRIES)
+        if not closed:
+            if not room_store.room_exists(room_id):
+                return
+            # 그래도 실패하면 결과 계산은 계속 이 호출이 맡아 백그라운드에서 간격을 늘려 가며 다시 시도
+            # (모두 투표를 마쳐 다른 표가 결과를 대신 계산해 줄 수 없으므로 투표를 다시 열지 않음)
+            log.warning("⚠️ [Vote] Room %s: result calculation kept conflicting, retrying in background", room_id)
+            socketio.start_background_task(retry_round_result, room_id)
+            session = room_store.session(room_id)
+    elif result['status'] == 'voted':
+        session = room_store.session(room_id)
+    else:
+        return
     
-    emit_game_state(room_id)
-    trigger_ai_check(room_id)
-
-def calculate_round_result(room_id):
-    room_key = get_room_key(room_id)
-    room_data = json.loads(redis_client.get(room_key))
-    users_key = f"room:{room_id}:users"
+    emit_game_state(room_id, session)
+    trigger_ai_check(room_id, session)
+
+@with_log_context(room='room_id')
+def retry_round_result(room_id):
+    """[Vote] 마감된 투표의 결과 계산을 RESULT_RETRY_DELAY초부터 두 배씩(최대 RESULT_RETRY_MAX_DELAY초) 늘려 가며 재시도."""
+    delay = RESULT_RETRY_DELAY
+    while True:
+        socketio.sleep(delay)
+        session, closed = update_room_state(room_id, calculate_round_result, retries=RESULT_RETRIES)
+        if closed:
+            break
+        if not room_store.room_exists(room_id):
+            return
+        delay = min(delay * 2, RESULT_RETRY_MAX_DELAY)
+    log.info("✅ [Vote] Room %s: result applied after retrying", room_id)
+    emit_game_state(room_id, session)
+    trigger_ai_check(room_id, session)
+
+def calculate_round_result(session):
+    """
+    [Unit of Work] 세션의 투표/제출로 점수를 계산해 세션에 반영합니다 (기록은 update_room_state가 한 번에).
+    이미 투표 페이즈가 아니면 아무것도 하지 않고 반환값으로 True(이미 처리됨)를 돌려줍니다.
+    """
+    room_data, players = session.room, session.players
+    if room_data.get('phase') != 'voting':
+        return True
+    submissions, votes = session.submissions, session.votes
     
     storyteller_id = room_data['storyteller_id']
     target_card_id = room_data['storyteller_card_id']
     
-    votes = redis_client.hgetall(f"room:{room_id}:votes") 
-    submissions = redis_client.hgetall(f"room:{room_id}:submissions")
-    
     correct_voters = []
     card_votes_count = {} 
     
@@ -929,7 +1071,7 @@ def calculate_round_result(room_id):
     for card_id, count in card_votes_count.items():
         if card_id == target_card_id: continue
         if card_id in submissions:
-            sub_data = json.loads(submissions[card_id])
+            sub_data = submissions[card_id]
             owner_id = sub_data['user_id']
             if owner_id != storyteller_id:
                 bonus = count
@@ -956,106 +1098,99 @@ def calculate_round_result(room_id):
                     # If they guessed right AND tricked someone (Rare? No, possible)
                     score_reasons[owner_id] = f"{existing}|{trick_str}"
 
-    for uid in redis_client.hkeys(users_key):
-        user = json.loads(redis_client.hget(users_key, uid))
+    # [Schema v2] 점수는 HINCRBY, 나머지는 바뀐 필드만 기록
+    for uid in players:
         added = scores_to_add.get(uid, 0)
-        user['score'] = user.get('score', 0) + added
-        user['last_gained_score'] = added 
-        user['last_score_reason'] = score_reasons.get(uid, "-")
-        redis_client.hset(users_key, uid, json.dumps(user))
+        session.incr_player(uid, 'score', added)
+        session.set_player(uid, last_gained_score=added, last_score_reason=score_reasons.get(uid, "-"))
+
+    voters_by_card = {}
+    for vid, v_cid in votes.items():
+        if vid in players:
+            voters_by_card.setdefault(v_cid, []).append(players[vid]['username'])
         
     results_for_client = []
-    for card_id, sub_json in submissions.items():
-        sub_data = json.loads(sub_json)
-        sub_data['voters'] = []
-        for vid, v_cid in votes.items():
-            if v_cid == card_id:
-                voter_user = json.loads(redis_client.hget(users_key, vid))
-                sub_data['voters'].append(voter_user['username'])
+    for card_id, sub_data in submissions.items():
+        sub_data['voters'] = voters_by_card.get(card_id, [])
         results_for_client.append(sub_data)
         
-    room_data['phase'] = 'result'
-    room_data['round_results'] = results_for_client
-    redis_client.set(room_key, json.dumps(room_data))
-    emit_game_state(room_id)
+    session.set_room(phase='result', round_results=results_for_client)
+    return True
 
 @socketio.on('next_round')
 def handle_next_round(data):
     room_id = data.get('room_id')
-    room_key = get_room_key(room_id)
-    room_data = json.loads(redis_client.get(room_key))
+    # [Unit of Work] 읽기 1회 + 덱 확인 1회 + 기록 1회 (참가자 수와 무관)
+    session, _ = update_room_state(room_id, advance_round)
+    if session is None: return
+    if session.room.get('phase') == 'game_over':
+        room_directory.refresh(room_id)
+    
+    emit_game_state(room_id, session)
+    trigger_ai_check(room_id, session)
+
+def advance_round(session):
+    room_data, players = session.room, session.players
+    # 결과 화면에서만 진행 (버튼 연타로 라운드를 건너뛰지 않도록)
+    if room_data.get('phase') != 'result':
+        return
     
     current = int(room_data.get('current_round', 1))
     total = int(room_data.get('total_rounds', 10))
 
     if current >= total:
-        room_data['phase'] = 'game_over'
-        redis_client.set(room_key, json.dumps(room_data))
-        emit_game_state(room_id)
+        session.set_room(phase='game_over')
         return
 
-    room_data['current_round'] = current + 1
-    users_key = f"room:{room_id}:users"
-    user_ids = redis_client.hkeys(users_key)
-    user_ids.sort()
+    user_ids = sorted(players)
     
     try:
         curr_idx = user_ids.index(room_data['storyteller_id'])
         next_idx = (curr_idx + 1) % len(user_ids)
     except ValueError:
         next_idx = 0
-    room_data['storyteller_id'] = user_ids[next_idx]
-    
-    submission_key = f"room:{room_id}:submissions"
-    submissions = redis_client.hgetall(submission_key)
     
     user_used_cards = {} 
-    for cid, sub_json in submissions.items():
-        sub = json.loads(sub_json)
+    for cid, sub in session.submissions.items():
         uid = sub['user_id']
         if uid not in user_used_cards: user_used_cards[uid] = []
         user_used_cards[uid].append(cid)
         
-    deck_key = f"room:{room_id}:deck"
-    
+    hands = {}
     for uid in user_ids:
-        user = json.loads(redis_client.hget(users_key, uid))
-        old_hand = user['hand']
-        new_hand = []
-        
         used_ids = user_used_cards.get(uid, [])
-        for card in old_hand:
+        new_hand = []
+        for card in players[uid]['hand']:
             if card['id'] not in used_ids:
                 card['is_new'] = False
                 new_hand.append(card)
-        
-        while len(new_hand) < 7: 
-            new_card_file = redis_client.lpop(deck_key)
-            if new_card_file:
-                # [수정] get_card_url 함수 사용
-                new_card_url = get_card_url(new_card_file)
-                new_hand.append({'id': new_card_file, 'src': new_card_url, 'is_new': True})
-            else:
-                break 
-        
-        user['hand'] = new_hand
-        user['submitted'] = False
-        user['submitted_count'] = 0
-        user['voted'] = False
-        redis_client.hset(users_key, uid, json.dumps(user))
-
-    room_data['phase'] = 'storyteller_choosing'
-    room_data['selected_word'] = None
-    room_data['storyteller_card_id'] = None
-    room_data['word_candidates'] = random.sample(WORD_POOL, min(10, len(WORD_POOL)))
-    room_data['reroll_count'] = 10 
-    
-    redis_client.set(room_key, json.dumps(room_data))
-    redis_client.delete(submission_key)
-    redis_client.delete(f"room:{room_id}:votes")
-    
-    emit_game_state(room_id)
-    trigger_ai_check(room_id)
+        hands[uid] = new_hand
+
+    # 모자란 장수만큼 덱 앞에서 한 번에 확인해 참가자 순서대로 채움 (덱이 모자라면 앞사람부터)
+    # 실제로 덱에서 빼는 건 커밋 때 (충돌로 재시도해도 카드가 사라지지 않음)
+    new_cards = session.peek_deck(sum(max(0, 7 - len(h)) for h in hands.values()))
+    taken = 0
+    for uid in user_ids:
+        while len(hands[uid]) < 7 and taken < len(new_cards):
+            new_card_file = new_cards[taken]
+            taken += 1
+            # [수정] get_card_url 함수 사용
+            hands[uid].append({'id': new_card_file, 'src': get_card_url(new_card_file), 'is_new': True})
+    session.take_deck(taken)
+
+    for uid in user_ids:
+        session.set_hand(uid, hands[uid])
+        session.set_player(uid, submitted=False, submitted_count=0, voted=False)
+    session.set_room(
+        current_round=current + 1,
+        storyteller_id=user_ids[next_idx],
+        phase='storyteller_choosing',
+        selected_word=None,
+        storyteller_card_id=None,
+        word_candidates=random.sample(WORD_POOL, min(10, len(WORD_POOL))),
+        reroll_count=10,
+    )
+    session.clear_round()
 
 if __name__ == '__main__':
-    socketio.run(app, host='0.0.0.0', port=5000)
\ No newline at end of file
+    socketio.run(app, host='0.0.0.0', port=int(os.getenv('PORT', 5000)))
\ No newline at end of file
@@ -0,0 +1,339 @@
+"""
+[Benchmark] 백엔드 시작(cold start) 구간별 시간/메모리 측정 스크립트
+
+각 구간을 새 파이썬 프로세스에서 실행해 import 캐시의 영향을 없애고,
+구간별 wall time과 peak RSS를 JSON으로 출력합니다. 릴리스 간 비교용으로 파일에 저장해 두세요.
+
+모델(SentenceTransformer / CLIP)은 로컬 스텁으로 대체하므로 오프라인에서도 동작합니다.
+import_app 구간은 Redis 연결을 fakeredis(인메모리)로 바꿔, 실행 중인 Redis의 상태나 네트워크 지연이 측정에 섞이지 않게 합니다.
+실제 torch / transformers import 비용은 설치되어 있을 때만 측정합니다 (없으면 skipped).
+
+사용법:
+    python bench_startup.py [--repeat 3] [--output bench.json] [--phases import_words,engine_artifact]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import resource
+import tempfile
+import subprocess
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_CARDS = 100
+EMBED_DIM = 512
+
+PHASES = [
+    'import_numpy',
+    'import_words',
+    'import_torch',
+    'import_transformers',
+    'import_ai_engine',
+    'legacy_cache_load',
+    'engine_cold_build',
+    'engine_warm_full',
+    'engine_artifact',
+    'import_app',
+]
+NEEDS_CACHE = ('engine_warm_full', 'engine_artifact', 'import_app')
+
+
+# ==========================================
+# [Fixture] 모델 스텁 (결정적 벡터)
+# ==========================================
+def install_model_stubs():
+    """sentence_transformers / transformers / torch를 가벼운 스텁 모듈로 대체합니다."""
+    import types
+    import hashlib
+    import contextlib
+    import numpy as np
+
+    def text_vec(text):
+        seed = int.from_bytes(hashlib.sha1(text.encode('utf-8')).digest()[:8], 'little')
+        return np.random.default_rng(seed).standard_normal(EMBED_DIM).astype(np.float32)
+
+    class SentenceTransformer:
+        def __init__(self, name):
+            self.name = name
+
+        def encode(self, texts):
+            return np.stack([text_vec(t) for t in texts])
+
+    class Features(np.ndarray):
+        def cpu(self):
+            return self
+
+        def numpy(self):
+            return np.asarray(self)
+
+    projection = np.random.default_rng(0).standard_normal((8 * 8 * 3, EMBED_DIM)).astype(np.float32)
+
+    class CLIPModel:
+        @classmethod
+        def from_pretrained(cls, name):
+            return cls()
+
+        def get_image_features(self, pixel_values):
+            flat = np.asarray(pixel_values, dtype=np.float32).reshape(len(pixel_values), -1)
+            return (flat @ projection).view(Features)
+
+    class CLIPProcessor:
+        @classmethod
+        def from_pretrained(cls, name):
+            return cls()
+
+        def __call__(self, images, return_tensors=None):
+            small = np.asarray(images.resize((8, 8)), dtype=np.float32) / 255.0
+            return {'pixel_values': small[None]}
+
+    st = types.ModuleType('sentence_transformers')
+    st.SentenceTransformer = SentenceTransformer
+    tf = types.ModuleType('transformers')
+    tf.CLIPModel = CLIPModel
+    tf.CLIPProcessor = CLIPProcessor
+    torch = types.ModuleType('torch')
+    torch.cat = np.concatenate
+    torch.no_grad = contextlib.nullcontext
+    sys.modules.update({'sentence_transformers': st, 'transformers': tf, 'torch': torch})
+
+
+def install_redis_stub():
+    """redis.Redis를 fakeredis로 바꿉니다 (app import 중 스키마 마이그레이션/방 목록 backfill 등이 인메모리 서버로 갑니다)."""
+    import redis
+    import fakeredis
+
+    server = fakeredis.FakeServer()
+
+    class Redis(fakeredis.FakeRedis):
+        def __init__(self, *args, **kwargs):
+            kwargs.pop('host', None)
+            kwargs.pop('port', None)
+            super().__init__(*args, server=server, **kwargs)
+
+    redis.Redis = Redis
+
+
+def make_fixture_deck(workdir):
+    """카드 이미지 픽스처를 생성합니다. PIL이 없으면 빈 덱을 사용합니다."""
+    cards_dir = os.path.join(workdir, 'cards')
+    os.makedirs(cards_dir, exist_ok=True)
+    card_ids = []
+    try:
+        from PIL import Image
+        for i in range(FIXTURE_CARDS):
+            card_id = f"card_{i + 1:03d}.png"
+            Image.new('RGB', (64, 64), ((i * 37) % 256, (i * 11) % 256, (i * 5) % 256)).save(os.path.join(cards_dir, card_id))
+            card_ids.append(card_id)
+    except ImportError:
+        pass
+    card_list = os.path.join(workdir, 'card_list.json')
+    with open(card_list, 'w', encoding='utf-8') as f:
+        json.dump(card_ids, f)
+    return card_list, cards_dir
+
+
+# ==========================================
+# [Child] 개별 구간 실행 (새 프로세스)
+# ==========================================
+def peak_rss_kb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS는 bytes, Linux는 KB 단위
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def timed_engine_warmup(workdir, mode):
+    install_model_stubs()
+    from words import WORD_POOL
+    from ai_engine import AIEngine
+
+    breakdown = {}
+    for name in ('_load_models', '_load_or_generate_cache', '_load_artifact'):
+        original = getattr(AIEngine, name)
+
+        def wrapper(self, *args, _original=original, _name=name, **kwargs):
+            start = time.perf_counter()
+            try:
+                return _original(self, *args, **kwargs)
+            finally:
+                breakdown[_name.strip('_')] = breakdown.get(_name.strip('_'), 0) + time.perf_counter() - start
+        setattr(AIEngine, name, wrapper)
+
+    card_list, cards_dir = make_fixture_deck(workdir)
+    engine = AIEngine(card_list_file=card_list, static_cards_path=cards_dir, word_pool=WORD_POOL, external_image_url=None)
+    start = time.perf_counter()
+    engine.warmup(mode=mode)
+    wall = time.perf_counter() - start
+    if not engine.is_ready:
+        raise RuntimeError(f"engine failed: {engine.error}")
+    return wall, {'breakdown_s': {k: round(v, 6) for k, v in breakdown.items()},
+                  'words': len(engine.word_index), 'cards': len(engine.card_index)}
+
+
+def run_phase(phase, workdir):
+    """구간 하나를 실행하고 (wall_s, extra)를 반환합니다. 측정 불가 시 None."""
+    sys.path.insert(0, BASE_DIR)
+    os.environ['AI_CACHE_DIR'] = os.path.join(workdir, 'cache')
+    os.makedirs(os.environ['AI_CACHE_DIR'], exist_ok=True)
+
+    if phase in ('import_numpy', 'import_words', 'import_torch', 'import_transformers', 'import_ai_engine'):
+        module = {'import_numpy': 'numpy', 'import_words': 'words', 'import_torch': 'torch',
+                  'import_transformers': 'transformers', 'import_ai_engine': 'ai_engine'}[phase]
+        start = time.perf_counter()
+        try:
+            __import__(module)
+        except ImportError as e:
+            return None, {'skipped': str(e)}
+        return time.perf_counter() - start, {}
+
+    if phase == 'legacy_cache_load':
+        import numpy as np
+        path = os.path.join(BASE_DIR, 'ai_cache_v2.npz')
+        if not os.path.exists(path):
+            return None, {'skipped': 'ai_cache_v2.npz not found'}
+        start = time.perf_counter()
+        data = np.load(path, allow_pickle=True)
+        words = data['word_embeddings'].item()
+        cards = data['card_embeddings'].item()
+        return time.perf_counter() - start, {'words': len(words), 'cards': len(cards)}
+
+    if phase == 'engine_cold_build':
+        shutil.rmtree(os.environ['AI_CACHE_DIR'], ignore_errors=True)
+        os.makedirs(os.environ['AI_CACHE_DIR'])
+        return timed_engine_warmup(workdir, 'full')
+
+    if phase == 'engine_warm_full':
+        return timed_engine_warmup(workdir, 'full')
+
+    if phase == 'engine_artifact':
+        return timed_engine_warmup(workdir, 'artifact')
+
+    if phase == 'import_app':
+        install_model_stubs()
+        try:
+            install_redis_stub()
+        except ImportError as e:
+            return None, {'skipped': str(e)}
+        os.environ['AI_ENGINE_MODE'] = 'artifact'
+        start = time.perf_counter()
+        import app
+        imported = time.perf_counter() - start
+        while app.ai_engine.state not in ('ready', 'failed'):
+            time.sleep(0.001)
+        return imported, {'time_to_engine_ready_s': round(time.perf_counter() - start, 6),
+                          'engine_state': app.ai_engine.state}
+
+    raise ValueError(f"unknown phase: {phase}")
+
+
+def child_main(phase, workdir):
+    # 구간 출력(엔진 로그 등)은 stderr로 보내고, stdout 마지막 줄에 결과 JSON만 남깁니다
+    real_stdout = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        wall, extra = run_phase(phase, workdir)
+        result = {'wall_s': None if wall is None else round(wall, 6), 'peak_rss_kb': peak_rss_kb()}
+        result.update(extra)
+    except Exception as e:
+        result = {'wall_s': None, 'error': f"{type(e).__name__}: {e}"}
+    sys.stdout = real_stdout
+    print(json.dumps(result))
+
+
+# ==========================================
+# [Parent] 구간 반복 실행 + 집계
+# ==========================================
+def median(values):
+    values = sorted(values)
+    mid = len(values) // 2
+    return values[mid] if len(values) % 2 else (values[mid - 1] + values[mid]) / 2
+
+
+def run_benchmark(phases, repeat, verbose):
+    workdir = tempfile.mkdtemp(prefix='mindsync-bench-')
+    results = {}
+    try:
+        for phase in phases:
+            # 캐시가 필요한 구간은 측정 전에 픽스처 캐시를 한 번 만들어 둡니다 (측정 제외)
+            if phase in NEEDS_CACHE and not os.path.exists(os.path.join(workdir, 'cache', 'ai_cache_v4.json')):
+                subprocess.run([sys.executable, os.path.abspath(__file__), '--child', 'engine_cold_build', '--workdir', workdir],
+                               cwd=BASE_DIR, capture_output=True, text=True)
+            runs = []
+            for _ in range(repeat):
+                proc = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '--child', phase, '--workdir', workdir],
+                    cwd=BASE_DIR, capture_output=True, text=True
+                )
+                if verbose and proc.stderr:
+                    sys.stderr.write(proc.stderr)
+                lines = proc.stdout.strip().splitlines()
+                try:
+                    runs.append(json.loads(lines[-1]))
+                except (IndexError, ValueError):
+                    runs.append({'wall_s': None, 'error': proc.stderr.strip().splitlines()[-1:] or 'no output'})
+
+            walls = [r['wall_s'] for r in runs if r.get('wall_s') is not None]
+            summary = {k: v for k, v in runs[-1].items() if k not in ('wall_s', 'peak_rss_kb')}
+            summary['wall_s'] = round(median(walls), 6) if walls else None
+            summary['wall_s_runs'] = walls
+            summary['peak_rss_kb'] = max((r.get('peak_rss_kb', 0) for r in runs), default=0)
+            results[phase] = summary
+            status = f"{summary['wall_s']:.4f}s" if walls else (summary.get('skipped') or summary.get('error'))
+            print(f"⏱️  [Bench] {phase:<22} {status}  (peak RSS {summary['peak_rss_kb'] / 1024:.1f} MB)", file=sys.stderr)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure backend startup per phase (wall time + peak RSS).")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--phases', default=','.join(PHASES), help="comma separated subset of: " + ', '.join(PHASES))
+    parser.add_argument('--output', default=None, help="write JSON results here (default: stdout)")
+    parser.add_argument('--verbose', action='store_true', help="forward phase logs to stderr")
+    parser.add_argument('--child', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child_main(args.child, args.workdir)
+        return 0
+
+    phases = [p.strip() for p in args.phases.split(',') if p.strip()]
+    unknown = [p for p in phases if p not in PHASES]
+    if unknown:
+        parser.error(f"unknown phase(s): {', '.join(unknown)}")
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'fixture_cards': FIXTURE_CARDS,
+        },
+        'phases': run_benchmark(phases, max(1, args.repeat), args.verbose),
+    }
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
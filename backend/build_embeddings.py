@@ -0,0 +1,67 @@
+"""
+[Offline Build] 임베딩 아티팩트(ai_cache_v4.*) 생성 스크립트
+
+words.py + card_list.json(또는 static/cards)을 기준으로 모델을 로드해 변경분만 임베딩하고,
+런타임이 memmap으로 바로 읽을 수 있는 아티팩트를 저장합니다.
+런타임은 AI_ENGINE_MODE=artifact 로 실행하면 torch/transformers 없이 이 파일만 로드합니다.
+
+사용법:
+    python build_embeddings.py [--cache-dir DIR] [--card-list FILE] [--cards-dir DIR] [--image-url URL]
+                               [--dtype float32|float16|int8]
+
+양자화(--dtype float16/int8) 전에는 verify_quantization.py로 결정 변화율을 확인하세요.
+"""
+import os
+import sys
+import argparse
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# app.py의 EXTERNAL_IMAGE_URL과 동일한 기본값
+DEFAULT_IMAGE_URL = os.getenv('EXTERNAL_IMAGE_URL', "https://luke-woojudaddy.github.io/Mind_Sync/decks/deck1")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the AI embedding artifact offline.")
+    parser.add_argument('--cache-dir', default=None, help="artifact output directory (default: AI_CACHE_DIR or backend/)")
+    parser.add_argument('--card-list', default=os.path.join(BASE_DIR, 'card_list.json'))
+    parser.add_argument('--cards-dir', default=os.path.join(BASE_DIR, 'static', 'cards'))
+    parser.add_argument('--image-url', default=DEFAULT_IMAGE_URL, help="fallback URL for card images not found locally")
+    parser.add_argument('--dtype', default=None, choices=['float32', 'float16', 'int8'],
+                        help="embedding storage precision (default: AI_EMBEDDING_DTYPE or float32)")
+    args = parser.parse_args(argv)
+
+    # CACHE_DIR/EMBEDDING_DTYPE는 ai_engine import 시점에 결정되므로 먼저 환경 변수로 지정
+    if args.cache_dir:
+        os.environ['AI_CACHE_DIR'] = os.path.abspath(args.cache_dir)
+    if args.dtype:
+        os.environ['AI_EMBEDDING_DTYPE'] = args.dtype
+
+    # 엔진 진행 로그(모델 로드, 임베딩 진행률 등)는 logging으로 나오므로 출력 설정 (LOG_LEVEL=DEBUG면 배치별 진행률까지)
+    from logs import setup_logging
+    setup_logging()
+
+    from words import WORD_POOL
+    from ai_engine import AIEngine, CACHE_DIR, CACHE_INDEX_FILE, EMBEDDING_DTYPE
+
+    engine = AIEngine(
+        card_list_file=args.card_list,
+        static_cards_path=args.cards_dir,
+        word_pool=WORD_POOL,
+        external_image_url=args.image_url
+    )
+    engine.warmup(mode='full')
+
+    if not engine.is_ready:
+        print(f"❌ [Build] Failed: {engine.error}")
+        return 1
+    if engine.embedding_failures:
+        print(f"❌ [Build] {len(engine.embedding_failures)} card(s) failed to embed. Artifact is incomplete.")
+        return 2
+
+    print(f"✅ [Build] Artifact ready: {os.path.join(CACHE_DIR, CACHE_INDEX_FILE)} "
+          f"(Words: {len(engine.word_index)}, Cards: {len(engine.card_index)}, {EMBEDDING_DTYPE})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
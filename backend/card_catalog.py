@@ -0,0 +1,128 @@
+import os
+import json
+import threading
+
+from logs import get_logger
+
+log = get_logger('card_catalog')
+
+
+CARD_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+# 외부 이미지 주소가 없을 때(None/빈 문자열) 쓰는 서버 static 경로
+LOCAL_IMAGE_URL = "https://api.lumiverselab.com/static/cards"
+
+
+def card_key(card_id):
+    """임베딩 조회 키 (확장자 제거: .webp vs .png 불일치 해결)."""
+    return os.path.splitext(card_id)[0]
+
+
+class Card:
+    __slots__ = ('id', 'key', 'url')
+
+    def __init__(self, card_id, url):
+        self.id = card_id
+        self.key = card_key(card_id)
+        self.url = url
+
+
+class CardCatalog:
+    """
+    [Card Catalog] 프로세스 공용 카드 목록.
+
+    card_list.json(없으면 static/cards 폴더)을 한 번 읽어 카드 id, 임베딩 키, 이미지 URL을 미리 만들어 둡니다.
+    조회는 메모리만 사용하고, 원본의 mtime 확인은 watch() 백그라운드 루프(또는 refresh() 직접 호출)에서만 합니다.
+    """
+
+    def __init__(self, card_list_file, static_cards_path, image_base_url):
+        self.card_list_file = card_list_file
+        self.static_cards_path = static_cards_path
+        self.image_base_url = (image_base_url or LOCAL_IMAGE_URL).rstrip('/')
+        self._lock = threading.Lock()
+        self._source = None  # (경로, mtime)
+        self._ids = ()
+        self._cards = {}
+        self.stats = {'loads': 0, 'checks': 0}
+        self.refresh()
+
+    # --- 조회 (파일 접근 없음) ---
+    @property
+    def ids(self):
+        """카드 id 튜플 (원본 순서)."""
+        return self._ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, card_id):
+        return card_id in self._cards
+
+    def get(self, card_id):
+        return self._cards.get(card_id)
+
+    def key(self, card_id):
+        card = self._cards.get(card_id)
+        return card.key if card else card_key(card_id)
+
+    def url(self, card_id):
+        """이미지 URL. 목록에 없는 카드(이전 덱 등)도 같은 규칙으로 만들어 줍니다."""
+        card = self._cards.get(card_id)
+        return card.url if card else f"{self.image_base_url}/{card_id}"
+
+    # --- 갱신 ---
+    def _current_source(self):
+        """(경로, mtime). card_list.json이 우선이고, 없으면 카드 폴더. 둘 다 없으면 (None, None)."""
+        for path in (self.card_list_file, self.static_cards_path):
+            try:
+                return path, os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+        return None, None
+
+    def _read(self, path):
+        if path is None:
+            return []
+        if path == self.card_list_file:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return sorted(f for f in os.listdir(path) if f.lower().endswith(CARD_EXTENSIONS))
+
+    def refresh(self):
+        """원본의 mtime이 바뀌었을 때만 다시 읽습니다. 다시 읽었으면 True."""
+        self.stats['checks'] += 1
+        source = self._current_source()
+        if source == self._source:
+            return False
+        ids = tuple(dict.fromkeys(self._read(source[0])))
+        cards = {card_id: Card(card_id, f"{self.image_base_url}/{card_id}") for card_id in ids}
+        with self._lock:
+            self._ids, self._cards, self._source = ids, cards, source
+            self.stats['loads'] += 1
+        log.info("🃏 [Card Catalog] Loaded %d cards from %s", len(ids), source[0])
+        return True
+
+    def watch(self, sleep, interval):
+        """interval초마다 refresh()를 호출하는 루프 (socketio.start_background_task로 실행)."""
+        while True:
+            sleep(interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                log.exception("❌ [Card Catalog] Refresh failed: %s", e)
+
+    def status(self):
+        return dict(self.stats, cards=len(self._ids), source=self._source[0] if self._source else None)
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared_catalog(card_list_file, static_cards_path, image_base_url):
+    """같은 원본/URL 조합이면 프로세스 안에서 하나의 카탈로그를 공유합니다."""
+    key = (os.path.abspath(card_list_file), os.path.abspath(static_cards_path), image_base_url)
+    with _shared_lock:
+        catalog = _shared.get(key)
+        if catalog is None:
+            catalog = _shared[key] = CardCatalog(card_list_file, static_cards_path, image_base_url)
+        return catalog
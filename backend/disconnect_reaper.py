@@ -0,0 +1,101 @@
+import time
+import threading
+
+from logs import get_logger
+
+log = get_logger('disconnect_reaper')
+
+# ==========================================
+# [Disconnect Reaper] 연결 끊김 유예 처리
+# ==========================================
+# disconnects:pending  ZSET "<room_id>:<user_id>" -> 유예 만료 시각(ms)
+PENDING_KEY = 'disconnects:pending'
+
+# 만료된 항목을 batch개까지 꺼내면서 지웁니다. 여러 워커가 동시에 돌아도 한 항목은 한 워커만 처리합니다.
+# KEYS: pending zset / ARGV: now(ms), batch
+CLAIM_DUE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+if #due > 0 then
+    redis.call('ZREM', KEYS[1], unpack(due))
+end
+return due
+"""
+
+
+def pending_member(room_id, user_id):
+    return f"{room_id}:{user_id}"
+
+
+class DisconnectReaper:
+    """
+    [Disconnect Reaper] 소켓이 끊긴 유저를 grace초 뒤에 한 번에 정리합니다.
+
+    disconnect 핸들러는 schedule()로 만료 시각만 기록하고 바로 반환합니다. 백그라운드 루프 하나가
+    interval초마다 만료된 항목을 batch개씩 꺼내 on_expired(room_id, user_id)를 호출합니다.
+    (재접속 여부 확인, 방장 승계, AI 전환은 on_expired에서) 그 전에 다시 들어오면 cancel()로 취소합니다.
+
+    spawn/sleep은 socketio.start_background_task / socketio.sleep을 넘겨 async 모드에 맞춥니다.
+    """
+
+    def __init__(self, redis_client, spawn, sleep, grace=3.0, interval=0.5, batch=100, on_expired=None):
+        self.redis = redis_client
+        self._spawn = spawn
+        self._sleep = sleep
+        self.grace_ms = int(grace * 1000)
+        self.interval = interval
+        self.batch = batch
+        self._on_expired = on_expired
+        self._claim_due = redis_client.register_script(CLAIM_DUE_SCRIPT)
+        self._lock = threading.Lock()
+        self._started = False
+        self.stats = {'scheduled': 0, 'cancelled': 0, 'expired': 0, 'failed': 0}
+
+    def schedule(self, room_id, user_id):
+        self.redis.zadd(PENDING_KEY, {pending_member(room_id, user_id): int(time.time() * 1000) + self.grace_ms})
+        with self._lock:
+            self.stats['scheduled'] += 1
+
+    def cancel(self, room_id, user_id):
+        if self.redis.zrem(PENDING_KEY, pending_member(room_id, user_id)):
+            with self._lock:
+                self.stats['cancelled'] += 1
+
+    # --- Background loop ---
+    def start(self):
+        if self._started:
+            return
+        self._started = True
+        self._spawn(self._reap_loop)
+
+    def _reap_loop(self):
+        while True:
+            self._sleep(self.interval)
+            try:
+                # 한꺼번에 끊긴 경우(모바일 네트워크 순단 등) batch보다 많으면 쉬지 않고 이어서 처리
+                while self.reap_due() >= self.batch:
+                    pass
+            except Exception as e:
+                log.exception("❌ [Disconnect Reaper] Sweep failed: %s", e)
+
+    def reap_due(self):
+        """만료된 항목을 최대 batch개 처리하고 꺼낸 개수를 반환합니다."""
+        due = self._claim_due(keys=[PENDING_KEY], args=[int(time.time() * 1000), self.batch])
+        for member in due:
+            room_id, _, user_id = member.partition(':')
+            try:
+                if self._on_expired:
+                    self._on_expired(room_id, user_id)
+                with self._lock:
+                    self.stats['expired'] += 1
+            except Exception as e:
+                with self._lock:
+                    self.stats['failed'] += 1
+                log.exception("❌ [Disconnect Reaper] Failed to handle %s: %s", member, e)
+        return len(due)
+
+    def pending(self):
+        return self.redis.zcard(PENDING_KEY)
+
+    def status(self):
+        with self._lock:
+            return dict(self.stats, grace=self.grace_ms / 1000)
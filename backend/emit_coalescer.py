@@ -0,0 +1,72 @@
+import threading
+
+from logs import get_logger
+
+log = get_logger('emit_coalescer')
+
+
+class EmitCoalescer:
+    """
+    [Emit Coalescer] 방 단위 상태 전송 합치기.
+
+    mark_dirty()는 방을 dirty로 표시만 하고, 방마다 하나의 flush 태스크가 window초 뒤
+    (0이면 현재 이벤트 루프 tick이 끝난 뒤) 최신 상태를 한 번만 읽어 전송합니다.
+    flush 전에 들어온 추가 요청은 합쳐지고(collapsed), 표시 사유(reason)는 합집합으로 전달됩니다.
+
+    요청에 커밋된 상태 사본(snapshot, rev 속성 필요)이 함께 오면 rev가 가장 큰 사본을 flush에 넘겨
+    다시 읽지 않게 합니다. 사본 없이 온 요청이 하나라도 있으면 사본을 버리고 flush가 직접 읽습니다.
+    """
+
+    def __init__(self, flush, spawn, sleep, window=0.0):
+        self._flush = flush
+        self._spawn = spawn
+        self._sleep = sleep
+        self.window = window
+        self._lock = threading.Lock()
+        self._pending = {}  # room_id -> {'reasons': set, 'snapshot': 사본 또는 None}
+        self.stats = {'marked': 0, 'flushed': 0, 'collapsed': 0, 'failed': 0, 'reused': 0}
+
+    def mark_dirty(self, room_id, reason='state', snapshot=None):
+        with self._lock:
+            self.stats['marked'] += 1
+            entry = self._pending.get(room_id)
+            if entry is not None:
+                entry['reasons'].add(reason)
+                current = entry['snapshot']
+                if snapshot is None or (current is not None and snapshot.rev > current.rev):
+                    entry['snapshot'] = snapshot
+                self.stats['collapsed'] += 1
+                return
+            self._pending[room_id] = {'reasons': {reason}, 'snapshot': snapshot}
+        self._spawn(self._run, room_id)
+
+    def flush_now(self, room_id):
+        """대기 중인 변경을 즉시 전송합니다 (스냅샷 직전 등 순서가 중요한 경우). 대기 중인 게 없어도 전송."""
+        with self._lock:
+            entry = self._pending.pop(room_id, None)
+        if entry:
+            self._call(room_id, entry['reasons'], entry['snapshot'])
+        else:
+            self._call(room_id, {'state'}, None)
+
+    def status(self):
+        with self._lock:
+            return dict(self.stats, pending=len(self._pending), window=self.window)
+
+    def _run(self, room_id):
+        self._sleep(self.window)
+        with self._lock:
+            entry = self._pending.pop(room_id, None)
+        # flush_now가 먼저 처리했으면 보낼 게 없음
+        if entry:
+            self._call(room_id, entry['reasons'], entry['snapshot'])
+
+    def _call(self, room_id, reasons, snapshot):
+        try:
+            self._flush(room_id, reasons, snapshot)
+            self.stats['flushed'] += 1
+            if snapshot is not None:
+                self.stats['reused'] += 1
+        except Exception as e:
+            self.stats['failed'] += 1
+            log.exception("❌ [Emit Coalescer] Flush failed for room %s: %s", room_id, e)
@@ -0,0 +1,194 @@
+import os
+import sys
+import copy
+import json
+import time
+import atexit
+import logging
+import threading
+import contextlib
+import contextvars
+import functools
+import logging.handlers
+from datetime import datetime
+
+from native_threads import native_modules
+
+# ==========================================
+# [Logging] 레벨/샘플링/방 컨텍스트가 붙는 구조화 로그
+# ==========================================
+# 모든 로거는 ROOT_LOGGER 아래에 있고, 핸들러는 큐에 넣기만 합니다. 포맷팅과 stdout 쓰기는 별도 스레드에서.
+# LOG_LEVEL=INFO(기본)면 debug 호출은 레벨 확인에서 끝나 문자열을 만들지 않습니다.
+# 그래서 메시지는 f-string 대신 %-스타일 인자로 넘기고, 인자 계산이 비싸면 isEnabledFor(DEBUG)로 감쌉니다.
+ROOT_LOGGER = 'mindsync'
+CONTEXT_FIELDS = ('room', 'user', 'event')
+MAX_SAMPLE_KEYS = 10000
+
+_context = contextvars.ContextVar('log_context', default={})
+_listener = None
+
+
+def get_logger(name, sample=None):
+    """
+    'mindsync.<name>' 로거. sample=(개수, 초)를 주면 같은 메시지 템플릿을 방마다 그 구간에 개수만큼만 내보내고
+    나머지는 버린 뒤, 다음 구간의 첫 로그에 suppressed=<버린 수>를 붙입니다 (자주 찍히는 debug 경로용).
+    """
+    logger = logging.getLogger(f"{ROOT_LOGGER}.{name}")
+    if sample and not any(isinstance(f, RateLimitFilter) for f in logger.filters):
+        logger.addFilter(RateLimitFilter(*sample))
+    return logger
+
+
+@contextlib.contextmanager
+def log_context(**fields):
+    """블록 안의 로그에 room/user/event 등 필드를 붙입니다 (contextvar라 greenlet/스레드마다 따로)."""
+    token = _context.set(dict(_context.get(), **{k: v for k, v in fields.items() if v is not None}))
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def with_log_context(**fields):
+    """log_context 데코레이터 버전. 함수 인자 이름을 값으로 주면 호출 때 그 인자를 씁니다. 예) room='room_id'"""
+    def decorator(func):
+        names = func.__code__.co_varnames[:func.__code__.co_argcount]
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = dict(zip(names, args), **kwargs)
+            with log_context(**{field: bound.get(arg) for field, arg in fields.items()}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def bind_socketio_context(socketio):
+    """socketio.on을 감싸 이후 등록되는 핸들러 안의 로그에 event와 data의 room_id/user_id를 붙입니다."""
+    register = socketio.on
+
+    def on(message, namespace=None):
+        decorator = register(message, namespace)
+
+        def bind(handler):
+            @functools.wraps(handler)
+            def wrapper(*args, **kwargs):
+                data = args[0] if args and isinstance(args[0], dict) else {}
+                with log_context(event=message, room=data.get('room_id'), user=data.get('user_id')):
+                    return handler(*args, **kwargs)
+            return decorator(wrapper)
+        return bind
+    socketio.on = on
+
+
+class RateLimitFilter(logging.Filter):
+    """(메시지 템플릿, 방)마다 per초 구간에 limit개까지만 통과시킵니다."""
+
+    def __init__(self, limit=5, per=10.0):
+        super().__init__()
+        self.limit = limit
+        self.per = per
+        self._lock = threading.Lock()
+        self._windows = {}  # key -> [구간 시작, 통과 수, 버린 수]
+
+    def filter(self, record):
+        key = (record.msg, getattr(record, 'room', None) or _context.get().get('room'))
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.per:
+                if window is None and len(self._windows) >= MAX_SAMPLE_KEYS:
+                    self._windows.clear()
+                if window is not None and window[2]:
+                    record.suppressed = window[2]
+                self._windows[key] = [now, 1, 0]
+                return True
+            if window[1] < self.limit:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+class _ContextQueueHandler(logging.handlers.QueueHandler):
+    """호출한 쪽에서는 메시지 조립과 컨텍스트 필드 복사만 하고 큐에 넣습니다."""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        for field, value in _context.get().items():
+            record.__dict__.setdefault(field, value)
+        return record
+
+
+class StructuredFormatter(logging.Formatter):
+    """text: '시각 레벨 로거 메시지 room=.. user=..' / json: 한 줄에 JSON 객체 하나."""
+
+    def __init__(self, json_output=False):
+        super().__init__()
+        self.json_output = json_output
+
+    def _fields(self, record):
+        fields = {f: getattr(record, f) for f in CONTEXT_FIELDS if getattr(record, f, None) is not None}
+        if getattr(record, 'suppressed', None):
+            fields['suppressed'] = record.suppressed
+        return fields
+
+    def format(self, record):
+        ts = datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds')
+        name = record.name[len(ROOT_LOGGER) + 1:] if record.name.startswith(ROOT_LOGGER + '.') else record.name
+        fields = self._fields(record)
+        if self.json_output:
+            entry = dict(ts=ts, level=record.levelname, logger=name, msg=record.getMessage(), **fields)
+            if record.exc_text:
+                entry['exc'] = record.exc_text
+            return json.dumps(entry, ensure_ascii=False, default=str)
+        line = f"{ts} {record.levelname:<7} {name}: {record.getMessage()}"
+        if fields:
+            line += ' ' + ' '.join(f"{k}={v}" for k, v in fields.items())
+        if record.exc_text:
+            line += '\n' + record.exc_text
+        return line
+
+
+class _Listener(logging.handlers.QueueListener):
+    def __init__(self, log_queue, handler, threading_module):
+        super().__init__(log_queue, handler)
+        self._threading = threading_module
+
+    def start(self):
+        self._thread = self._threading.Thread(target=self._monitor, name='log-writer', daemon=True)
+        self._thread.start()
+
+
+def setup_logging(level=None, fmt=None, stream=None):
+    """
+    ROOT_LOGGER에 큐 핸들러를 달고 출력 스레드를 시작합니다 (여러 번 불러도 한 번만).
+    level 기본값은 LOG_LEVEL(INFO), fmt는 LOG_FORMAT('text' | 'json').
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+    level = (level or os.getenv('LOG_LEVEL') or 'INFO').upper()
+    fmt = (fmt or os.getenv('LOG_FORMAT') or 'text').lower()
+    # eventlet 아래에서도 출력 스레드는 진짜 OS 스레드: stdout 쓰기가 허브를 막지 않고, 큐에 넣는 쪽도 바로 반환
+    native_threading, native_queue = native_modules()
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(StructuredFormatter(json_output=fmt == 'json'))
+    output.lock = native_threading.RLock()  # 출력 스레드에서만 잡는 락
+    log_queue = native_queue.Queue()
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(level)
+    root.addHandler(_ContextQueueHandler(log_queue))
+    root.propagate = False
+
+    _listener = _Listener(log_queue, output, native_threading)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
@@ -0,0 +1,284 @@
+import time
+import inspect
+import functools
+import threading
+import contextvars
+
+# ==========================================
+# [Metrics] 프로세스 내 계측 (Prometheus 텍스트 형식)
+# ==========================================
+# 외부 의존성 없이 히스토그램/카운터/게이지만 직접 구현합니다. 기록은 락 한 번 + 덧셈 정도라
+# 운영에서도 켜 둘 수 있고, 문자열 생성은 /api/metrics 요청 때만 합니다.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+ROUND_TRIP_BUCKETS = (0, 1, 2, 3, 4, 6, 8, 12, 16, 24, 32, 64)
+BACKGROUND = 'background'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.label_names, k)} {_number(v)}" for k, v in values]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}  # labels -> [버킷별 개수(누적 아님), 합계, 개수]
+
+    def observe(self, value, labels=()):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        with self._lock:
+            snapshot = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._series.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in snapshot:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), counts):
+                cumulative += n
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+class _Scope:
+    """이벤트 하나 동안의 Redis 사용량 (contextvar로 greenlet/스레드마다 따로)."""
+    __slots__ = ('event', 'commands', 'round_trips')
+
+    def __init__(self, event):
+        self.event = event
+        self.commands = 0
+        self.round_trips = 0
+
+
+_scope = contextvars.ContextVar('metrics_scope', default=None)
+
+
+class Metrics:
+    """
+    [Metrics] Socket.IO 이벤트/AI 엔진 호출의 지연 시간, 이벤트별 Redis 명령 수, 상태 게이지.
+
+    - instrument_socketio(): 이후 등록되는 모든 @socketio.on 핸들러를 감쌉니다.
+      AI가 내부 호출(is_internal=True)한 경우는 '<event>:internal'로 따로 집계합니다.
+    - instrument_redis(): 클라이언트의 명령/파이프라인 실행을 세어 현재 이벤트에 돌립니다 (이벤트 밖이면 background).
+    - instrument_methods(): 객체의 메서드 호출 시간을 잽니다 (AI 엔진).
+    - gauge(): /api/metrics 요청 때 호출되는 콜백 게이지.
+    """
+
+    def __init__(self, prefix='mindsync'):
+        self.prefix = prefix
+        self.event_duration = Histogram(f"{prefix}_event_duration_seconds",
+                                        "Socket.IO event handler latency", ('event',))
+        self.events = Counter(f"{prefix}_events_total", "Socket.IO events handled", ('event', 'outcome'))
+        self.event_round_trips = Histogram(f"{prefix}_event_redis_round_trips",
+                                           "Redis round trips per handled event", ('event',), ROUND_TRIP_BUCKETS)
+        self.redis_commands = Counter(f"{prefix}_redis_commands_total",
+                                      "Redis commands sent, by event", ('event',))
+        self.redis_round_trips = Counter(f"{prefix}_redis_round_trips_total",
+                                         "Redis round trips (single commands and pipelines), by event", ('event',))
+        self.method_duration = Histogram(f"{prefix}_ai_call_duration_seconds",
+                                         "AI engine call latency", ('method',))
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._connections = 0
+        self._gauges = []  # (name, help, label names, 콜백)
+        self.gauge(f"{prefix}_connected_sockets", "Socket.IO connections on this worker", (),
+                   lambda: self._connections)
+        self.gauge(f"{prefix}_ai_calls_in_flight", "AI engine calls currently running", (),
+                   lambda: self._in_flight)
+
+    # --- 이벤트 ---
+    def track(self, event):
+        """with metrics.track('name'): ... 블록을 이벤트 하나로 집계합니다."""
+        return _Tracked(self, event)
+
+    def tracked(self, event):
+        """함수 전체를 이벤트 하나로 집계하는 데코레이터."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.track(event):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _finish(self, scope, elapsed, failed):
+        labels = (scope.event,)
+        self.event_duration.observe(elapsed, labels)
+        self.events.inc((scope.event, 'error' if failed else 'ok'))
+        self.event_round_trips.observe(scope.round_trips, labels)
+        if scope.commands:
+            self.redis_commands.inc(labels, scope.commands)
+            self.redis_round_trips.inc(labels, scope.round_trips)
+
+    def wrap_handler(self, event, handler):
+        # Flask-SocketIO는 connect(auth)/disconnect(reason)를 인자와 함께 불러 보고 TypeError면 다시 부릅니다.
+        # 감싼 함수가 그 TypeError를 실패로 두 번 집계하지 않도록 원래 핸들러가 받는 개수만큼만 넘깁니다.
+        params = inspect.signature(handler).parameters.values()
+        if any(p.kind == p.VAR_POSITIONAL for p in params):
+            max_args = None
+        else:
+            max_args = sum(1 for p in params if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD))
+
+        @functools.wraps(handler)
+        def wrapper(*args, **kwargs):
+            if max_args is not None:
+                args = args[:max_args]
+            name = f"{event}:internal" if kwargs.get('is_internal') else event
+            with self.track(name):
+                result = handler(*args, **kwargs)
+            if event == 'connect' and result is not False:
+                self._add_connections(1)
+            elif event == 'disconnect':
+                self._add_connections(-1)
+            return result
+        return wrapper
+
+    def _add_connections(self, delta):
+        with self._lock:
+            self._connections = max(0, self._connections + delta)
+
+    def instrument_socketio(self, socketio):
+        """socketio.on을 감싸 이후 등록되는 핸들러를 계측합니다 (핸들러 정의 전에 호출)."""
+        register = socketio.on
+
+        def on(message, namespace=None):
+            decorator = register(message, namespace)
+            return lambda handler: decorator(self.wrap_handler(message, handler))
+        socketio.on = on
+
+    # --- Redis ---
+    def _count_redis(self, commands):
+        scope = _scope.get()
+        if scope is not None:
+            scope.commands += commands
+            scope.round_trips += 1
+        else:
+            self.redis_commands.inc((BACKGROUND,), commands)
+            self.redis_round_trips.inc((BACKGROUND,))
+
+    def instrument_redis(self, client):
+        """클라이언트 인스턴스의 execute_command/pipeline을 감쌉니다 (스크립트 EVALSHA 포함)."""
+        execute_command = client.execute_command
+        make_pipeline = client.pipeline
+
+        def counted_execute_command(*args, **options):
+            self._count_redis(1)
+            return execute_command(*args, **options)
+
+        def counted_pipeline(*args, **kwargs):
+            pipe = make_pipeline(*args, **kwargs)
+            execute = pipe.execute
+
+            def counted_execute(*e_args, **e_kwargs):
+                if pipe.command_stack:
+                    self._count_redis(len(pipe.command_stack))
+                return execute(*e_args, **e_kwargs)
+            pipe.execute = counted_execute
+            return pipe
+
+        client.execute_command = counted_execute_command
+        client.pipeline = counted_pipeline
+        return client
+
+    # --- 메서드 ---
+    def instrument_methods(self, obj, names):
+        """obj의 각 메서드를 호출 시간 측정 버전으로 바꿉니다 (인스턴스 속성으로 덮어씀)."""
+        for name in names:
+            setattr(obj, name, self._timed_method(name, getattr(obj, name)))
+
+    def _timed_method(self, name, method):
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            with self._lock:
+                self._in_flight += 1
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.method_duration.observe(time.perf_counter() - started, (name,))
+                with self._lock:
+                    self._in_flight -= 1
+        return timed
+
+    # --- 게이지 / 출력 ---
+    def gauge(self, name, help, labels, callback):
+        """callback()은 숫자, 또는 {라벨 값 튜플: 숫자}를 반환합니다."""
+        self._gauges.append((name, help, tuple(labels), callback))
+
+    def render(self):
+        lines = []
+        for name, help, label_names, callback in self._gauges:
+            try:
+                value = callback()
+            except Exception as e:
+                lines.append(f"# {name} unavailable: {_escape(e)}")
+                continue
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+            values = value.items() if isinstance(value, dict) else [((), value)]
+            lines += [f"{name}{_labels(label_names, k)} {_number(v)}" for k, v in sorted(values)]
+        for metric in (self.event_duration, self.events, self.event_round_trips, self.redis_commands,
+                       self.redis_round_trips, self.method_duration):
+            lines += metric.render()
+        return '\n'.join(lines) + '\n'
+
+
+class _Tracked:
+    __slots__ = ('metrics', 'scope', 'token', 'started')
+
+    def __init__(self, metrics, event):
+        self.metrics = metrics
+        self.scope = _Scope(event)
+
+    def __enter__(self):
+        self.token = _scope.set(self.scope)
+        self.started = time.perf_counter()
+        return self.scope
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        _scope.reset(self.token)
+        self.metrics._finish(self.scope, elapsed, exc_type is not None)
+        return False
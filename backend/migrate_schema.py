@@ -0,0 +1,39 @@
+"""
+[Migration] Redis 방 데이터 v1 → v2(필드 단위 스키마) 변환 스크립트
+
+v1: room:<id> = 방 JSON 문자열, room:<id>:users = {user_id: 유저 JSON(손패 포함)} 해시
+v2: room:<id> 해시 + room:<id>:players 셋 + room:<id>:player:<uid> 해시 + room:<id>:hand:<uid> 문자열
+(자세한 레이아웃은 room_store.py 참고)
+
+서버도 시작할 때 한 번 같은 변환을 시도하지만, 배포 전에 미리 돌려두면
+첫 요청이 변환을 기다리지 않습니다. 이미 변환된 방은 건너뛰므로 여러 번 실행해도 안전합니다.
+
+사용법:
+    python migrate_schema.py [--host HOST] [--port PORT]
+"""
+import os
+import sys
+import argparse
+
+import redis
+
+from room_store import RoomStore, SCHEMA_VERSION
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrate legacy JSON-blob rooms to the field-level Redis schema.")
+    parser.add_argument('--host', default=os.getenv('REDIS_HOST', 'localhost'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('REDIS_PORT', 6379)))
+    args = parser.parse_args(argv)
+
+    client = redis.Redis(host=args.host, port=args.port, decode_responses=True)
+    migrated, failed = RoomStore(client).migrate_legacy_rooms(force=True)
+    if failed:
+        print(f"❌ [Migration] {migrated} room(s) migrated, {failed} failed. Fix the errors above and re-run.")
+        return 1
+    print(f"✅ [Migration] {migrated} room(s) migrated. Schema version is now {SCHEMA_VERSION}.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
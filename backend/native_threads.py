@@ -0,0 +1,83 @@
+import threading
+import queue
+
+# ==========================================
+# [Native Threads] eventlet 패치와 무관한 OS 스레드
+# ==========================================
+# 멀티 워커 모드(app.py)에서는 eventlet.monkey_patch()가 threading/queue를 green 버전으로 바꿉니다.
+# 모델 로드/CLIP 인코딩 같은 CPU 작업이나 로그 출력처럼 허브를 막으면 안 되는 작업은 패치 전 모듈로 스레드를 만듭니다.
+
+
+def native_modules():
+    """(threading, queue). eventlet이 패치했으면 패치 전 모듈, 아니면 표준 모듈."""
+    try:
+        from eventlet import patcher
+        if patcher.is_monkey_patched('thread'):
+            return patcher.original('threading'), patcher.original('queue')
+    except ImportError:
+        pass
+    return threading, queue
+
+
+def start_native_thread(target, name=None, daemon=True):
+    native_threading, _ = native_modules()
+    thread = native_threading.Thread(target=target, name=name, daemon=daemon)
+    thread.start()
+    return thread
+
+
+class _Result:
+    __slots__ = ('_box',)
+
+    def __init__(self, box):
+        self._box = box
+
+    def result(self):
+        ok, value = self._box.get()
+        if not ok:
+            raise value
+        return value
+
+
+class NativeThreadPool:
+    """
+    ThreadPoolExecutor 대용 (submit(fn, *args).result()만 지원). 작업 스레드와 결과 대기가 항상 OS 스레드 기준이라
+    eventlet 아래에서도 병렬로 돌고 허브를 막지 않습니다. with 블록을 나가면 작업 스레드를 종료합니다.
+    """
+
+    def __init__(self, max_workers):
+        native_threading, self._queue = native_modules()
+        self._tasks = self._queue.Queue()
+        self._threads = [native_threading.Thread(target=self._work, name=f"native-pool-{i}", daemon=True)
+                         for i in range(max_workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def _work(self):
+        while True:
+            item = self._tasks.get()
+            if item is None:
+                return
+            fn, args, box = item
+            try:
+                box.put((True, fn(*args)))
+            except BaseException as e:
+                box.put((False, e))
+
+    def submit(self, fn, *args):
+        box = self._queue.Queue(maxsize=1)
+        self._tasks.put((fn, args, box))
+        return _Result(box)
+
+    def shutdown(self):
+        for _ in self._threads:
+            self._tasks.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+        return False
@@ -0,0 +1,230 @@
+import json
+import time
+
+from room_store import room_key, players_key, player_key
+
+# ==========================================
+# [Room Directory] 로비 방 목록 인덱스
+# ==========================================
+# rooms:directory              HASH room_id -> 목록에 보여줄 요약 JSON (id, name, status, players, host ...)
+# rooms:by_created             ZSET room_id -> 생성 시각(ms). 목록에 올라간 모든 방
+# rooms:<status>:by_created    ZSET 상태별 생성 시각 순
+# rooms:<status>:by_players    ZSET 상태별 인원 순 (점수 = 인원 × 10^13 + 생성 시각, 같은 인원이면 최근 방 먼저)
+# status: waiting(입장 가능) | full(대기 중이지만 만석) | playing | finished(게임 종료)
+DIRECTORY_KEY = 'rooms:directory'
+CREATED_KEY = 'rooms:by_created'
+INDEX_PREFIX = 'rooms'
+STATUSES = ('waiting', 'full', 'playing', 'finished')
+SORTS = ('created', 'players')
+
+
+def index_key(status, sort):
+    return f"{INDEX_PREFIX}:{status}:by_{sort}"
+
+
+# 상태별 인덱스 키 (STATUSES 순서대로 by_created, by_players)
+INDEX_KEYS = [index_key(status, sort) for status in STATUSES for sort in SORTS]
+
+# 방 해시와 참가자 수로 상태를 정하고, 이전 상태 인덱스에서 빼고 현재 상태 인덱스와 요약을 다시 씁니다.
+# 방이 없으면 목록에서 지웁니다. 방장 이름은 호출자가 미리 읽은 방장의 참가자 키에서 읽고,
+# 그 사이 방장이 바뀌었으면 아무것도 쓰지 않고 -1을 반환합니다 (호출자가 다시 읽어 재시도).
+# KEYS: room, players, directory, by_created, 방장 참가자 hash, INDEX_KEYS...
+# ARGV: room_id, max players, now(ms), 방장 user_id ('' = 없음)
+REFRESH_SCRIPT = """
+local room_id = ARGV[1]
+local function unindex()
+    for i = 6, #KEYS do
+        redis.call('ZREM', KEYS[i], room_id)
+    end
+end
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    unindex()
+    redis.call('ZREM', KEYS[4], room_id)
+    redis.call('HDEL', KEYS[3], room_id)
+    return 0
+end
+-- 방 필드는 JSON 값 (null이면 nil)
+local function field(raw)
+    if not raw then
+        return nil
+    end
+    local value = cjson.decode(raw)
+    if value == cjson.null then
+        return nil
+    end
+    return value
+end
+local raw = redis.call('HMGET', KEYS[1], 'status', 'phase', 'name', 'created_at', 'host_id')
+local host = field(raw[5])
+if type(host) ~= 'string' then
+    host = ''
+end
+if host ~= ARGV[4] then
+    return -1
+end
+local players = redis.call('SCARD', KEYS[2])
+local max_players = tonumber(ARGV[2])
+local status, slot = 'waiting', 0
+if field(raw[1]) == 'playing' then
+    if field(raw[2]) == 'game_over' then
+        status, slot = 'finished', 3
+    else
+        status, slot = 'playing', 2
+    end
+elseif players >= max_players then
+    status, slot = 'full', 1
+end
+local created = redis.call('ZSCORE', KEYS[4], room_id)
+if not created then
+    created = ARGV[3]
+    redis.call('ZADD', KEYS[4], created, room_id)
+end
+created = tonumber(created)
+unindex()
+redis.call('ZADD', KEYS[6 + slot * 2], string.format('%.0f', created), room_id)
+redis.call('ZADD', KEYS[7 + slot * 2], string.format('%.0f', players * 1e13 + created), room_id)
+
+local host_name = nil
+if host ~= '' then
+    host_name = field(redis.call('HGET', KEYS[5], 'username'))
+end
+redis.call('HSET', KEYS[3], room_id, cjson.encode({
+    id = room_id, name = field(raw[3]), status = status, players = players, max_players = max_players,
+    created_at = field(raw[4]), host = host_name
+}))
+return 1
+"""
+
+# 커서(마지막으로 보낸 방의 점수, id) 다음부터 limit개 + 다음 페이지가 있는지 확인용 1개.
+# 같은 점수끼리는 ZREV 순서(id 역순)를 그대로 이어갑니다.
+# KEYS: index zset, directory / ARGV: limit, cursor score ('' = 첫 페이지), cursor room_id
+# 반환: {다음 커서 점수 또는 '', 다음 커서 id 또는 '', 요약1, 요약2, ...}
+LIST_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local ids, scores = {}, {}
+local max = '+inf'
+if ARGV[2] ~= '' then
+    for _, id in ipairs(redis.call('ZREVRANGEBYSCORE', KEYS[1], ARGV[2], ARGV[2])) do
+        if id < ARGV[3] and #ids <= limit then
+            table.insert(ids, id)
+            table.insert(scores, ARGV[2])
+        end
+    end
+    max = '(' .. ARGV[2]
+end
+if #ids <= limit then
+    local rest = redis.call('ZREVRANGEBYSCORE', KEYS[1], max, '-inf', 'WITHSCORES', 'LIMIT', 0, limit + 1 - #ids)
+    for i = 1, #rest, 2 do
+        table.insert(ids, rest[i])
+        table.insert(scores, rest[i + 1])
+    end
+end
+local out = {'', ''}
+if #ids > limit then
+    ids[limit + 1] = nil
+    out = {scores[limit], ids[limit]}
+end
+if #ids > 0 then
+    for _, summary in ipairs(redis.call('HMGET', KEYS[2], unpack(ids))) do
+        table.insert(out, summary or '')
+    end
+end
+return out
+"""
+
+
+def _host_id(raw):
+    """방 해시의 host_id 값(JSON)을 user_id 문자열로. 없으면 ''."""
+    value = json.loads(raw) if raw else None
+    return value if isinstance(value, str) else ''
+
+
+class RoomDirectory:
+    """
+    [Room Directory] 로비용 방 목록.
+
+    방 데이터를 하나씩 읽지 않도록 상태별 정렬 집합(생성 시각 순, 인원 순)과 요약 해시를 따로 둡니다.
+    refresh()는 방이 만들어지거나 인원/상태가 바뀌는 곳에서 호출하며, 방장 id를 읽은 뒤 Lua 한 번으로 인덱스와 요약을 고칩니다.
+    list()는 커서 기반 페이지 조회로, 방이 몇 개든 한 페이지에 Lua 한 번입니다.
+    """
+
+    def __init__(self, redis_client, max_players=6):
+        self.redis = redis_client
+        self.max_players = max_players
+        self._refresh = redis_client.register_script(REFRESH_SCRIPT)
+        self._list = redis_client.register_script(LIST_SCRIPT)
+
+    def refresh(self, room_id, retries=3):
+        """방 하나의 인덱스와 요약을 고칩니다. 1 = 갱신, 0 = 방이 없어 목록에서 지움, -1 = 방장이 계속 바뀜."""
+        result = -1
+        for _ in range(retries):
+            result = self._run_refresh(room_id, _host_id(self.redis.hget(room_key(room_id), 'host_id')))
+            if result != -1:
+                break
+        return result
+
+    def _run_refresh(self, room_id, host_id, client=None):
+        return self._refresh(keys=[room_key(room_id), players_key(room_id), DIRECTORY_KEY, CREATED_KEY,
+                                   player_key(room_id, host_id)] + INDEX_KEYS,
+                             args=[room_id, self.max_players, int(time.time() * 1000), host_id], client=client)
+
+    def remove(self, room_id):
+        pipe = self.redis.pipeline()
+        for status in STATUSES:
+            for sort in SORTS:
+                pipe.zrem(index_key(status, sort), room_id)
+        pipe.zrem(CREATED_KEY, room_id)
+        pipe.hdel(DIRECTORY_KEY, room_id)
+        pipe.execute()
+
+    def backfill(self, room_ids, batch=200):
+        """목록이 비어 있을 때(이 기능 도입 전 방들) 기존 방을 한 번 등록합니다. 등록한 방 수를 반환합니다."""
+        if self.redis.exists(CREATED_KEY):
+            return 0
+        count = 0
+        room_ids = list(room_ids)
+        for i in range(0, len(room_ids), batch):
+            chunk = room_ids[i:i + batch]
+            pipe = self.redis.pipeline(transaction=False)
+            for room_id in chunk:
+                pipe.hget(room_key(room_id), 'host_id')
+            hosts = pipe.execute()
+            for room_id, host in zip(chunk, hosts):
+                self._run_refresh(room_id, _host_id(host), client=pipe)
+            for room_id, result in zip(chunk, pipe.execute()):
+                if result == -1:
+                    result = self.refresh(room_id)
+                count += result == 1
+        return count
+
+    def counts(self):
+        """{status: 방 수} (ZCARD 파이프라인 1회)."""
+        pipe = self.redis.pipeline(transaction=False)
+        for status in STATUSES:
+            pipe.zcard(index_key(status, 'created'))
+        return dict(zip(STATUSES, pipe.execute()))
+
+    def list(self, status='waiting', sort='created', limit=20, cursor=None):
+        """
+        {'rooms': [요약...], 'next_cursor': 다음 페이지 커서 또는 None}.
+        잘못된 status/sort/cursor는 ValueError.
+        """
+        if status not in STATUSES:
+            raise ValueError(f"status must be one of {', '.join(STATUSES)}")
+        if sort not in SORTS:
+            raise ValueError(f"sort must be one of {', '.join(SORTS)}")
+        cursor_score, cursor_id = '', ''
+        if cursor:
+            cursor_score, sep, cursor_id = cursor.partition(':')
+            try:
+                float(cursor_score)
+            except ValueError:
+                raise ValueError('invalid cursor')
+            if not sep or not cursor_id:
+                raise ValueError('invalid cursor')
+        raw = self._list(keys=[index_key(status, sort), DIRECTORY_KEY], args=[limit, cursor_score, cursor_id])
+        next_score, next_id = raw[0], raw[1]
+        return {
+            'rooms': [json.loads(summary) for summary in raw[2:] if summary],
+            'next_cursor': f"{next_score}:{next_id}" if next_id else None,
+        }
@@ -0,0 +1,133 @@
+import random
+import threading
+
+# ==========================================
+# [Room IDs] 방 코드 할당
+# ==========================================
+# room_ids:<L>        STRING(bitmap) L자리 숫자 코드 사용 여부 (비트 n = 코드 n을 0으로 채운 L자리)
+# room_ids:<L>:count  STRING         L자리 코드 중 사용 중인 개수
+# 사용률이 max_load를 넘은 자리수는 건너뛰고 한 자리 긴 코드를 씁니다. 반납되면 다시 짧은 코드부터.
+ROOM_IDS_PREFIX = 'room_ids'
+
+
+def bitmap_key(length):
+    return f"{ROOM_IDS_PREFIX}:{length}"
+
+
+def count_key(length):
+    return f"{ROOM_IDS_PREFIX}:{length}:count"
+
+
+# 사용률이 max_load 미만인 가장 짧은 자리수에서, 무작위 위치부터 BITPOS로 찾은 첫 빈 코드를 점유합니다.
+# KEYS: 자리수별 (bitmap, counter) 쌍을 min length부터 max length까지 순서대로
+# ARGV: min length, max load, random fraction [0, 1) × 2
+# 반환: 코드 문자열, 모든 자리수가 차 있으면 nil
+CLAIM_SCRIPT = """
+local min_length, max_load = tonumber(ARGV[1]), tonumber(ARGV[2])
+local fraction, pick = tonumber(ARGV[3]), tonumber(ARGV[4])
+for i = 1, #KEYS, 2 do
+    local bitmap, counter = KEYS[i], KEYS[i + 1]
+    local length = min_length + (i - 1) / 2
+    local size = 10 ^ length
+    local last_byte = size / 8 - 1
+    -- 끝 범위를 준 BITPOS는 문자열 밖을 보지 않으므로 비트맵을 처음 쓸 때 전체 크기로 늘려 둠
+    if redis.call('STRLEN', bitmap) < size / 8 then
+        redis.call('SETBIT', bitmap, size - 1, 0)
+    end
+    if tonumber(redis.call('GET', counter) or '0') < size * max_load then
+        local pos = redis.call('BITPOS', bitmap, 0, math.floor(fraction * (last_byte + 1)), last_byte)
+        if pos < 0 then
+            pos = redis.call('BITPOS', bitmap, 0, 0, last_byte)
+        end
+        if pos >= 0 then
+            -- BITPOS는 바이트 단위로 시작하므로 찾은 바이트 안의 빈 비트 중 하나를 무작위로 골라 코드가 8의 배수에 몰리지 않게 함
+            local first = pos - pos % 8
+            local byte = redis.call('BITFIELD', bitmap, 'GET', 'u8', first)[1]
+            local free = {}
+            for bit = 0, 7 do
+                if math.floor(byte / 2 ^ (7 - bit)) % 2 == 0 then
+                    table.insert(free, first + bit)
+                end
+            end
+            pos = free[math.floor(pick * #free) + 1]
+            redis.call('SETBIT', bitmap, pos, 1)
+            redis.call('INCR', counter)
+            return string.format('%0' .. length .. 'd', pos)
+        end
+    end
+end
+return nil
+"""
+# 비트맵 바깥에서 만들어진 방(이전 버전의 uuid 코드 등)과 겹친 코드는 사용 중으로 남겨 두고 다시 뽑는 횟수
+MAX_COLLISIONS = 16
+
+# KEYS: bitmap, counter / ARGV: bit offset
+RELEASE_SCRIPT = """
+if redis.call('SETBIT', KEYS[1], ARGV[1], 0) == 1 then
+    redis.call('DECR', KEYS[2])
+    return 1
+end
+return 0
+"""
+
+
+class RoomIdAllocator:
+    """
+    [Room IDs] 겹치지 않는 짧은 숫자 방 코드.
+
+    claim()은 Lua 한 번으로 빈 코드를 찾아 점유합니다. 무작위 위치에서 BITPOS로 다음 빈 비트를 찾기 때문에
+    사용률이 높아도 재시도 없이 끝나고, 자리수별 사용률이 max_load(기본 90%)에 닿으면 자동으로 한 자리 늘립니다.
+    release()는 방이 정리될 때 코드를 반납합니다.
+    """
+
+    def __init__(self, redis_client, room_key_prefix='room:', min_length=4, max_length=8, max_load=0.9):
+        self.redis = redis_client
+        self.room_key_prefix = room_key_prefix
+        self.min_length = min_length
+        self.max_length = max_length
+        self.max_load = max_load
+        self._claim = redis_client.register_script(CLAIM_SCRIPT)
+        self._release = redis_client.register_script(RELEASE_SCRIPT)
+        self._lock = threading.Lock()
+        self._keys = [key for length in range(min_length, max_length + 1)
+                      for key in (bitmap_key(length), count_key(length))]
+        self._length = min_length  # 마지막으로 할당한 코드 자리수 (widened = 자리수가 늘어난 횟수)
+        self.stats = {'claimed': 0, 'released': 0, 'widened': 0, 'collisions': 0, 'exhausted': 0}
+
+    def claim(self):
+        """새 방 코드. 모든 자리수가 차 있으면 RuntimeError."""
+        for _ in range(MAX_COLLISIONS):
+            code = self._claim(keys=self._keys,
+                               args=[self.min_length, self.max_load, random.random(), random.random()])
+            if code is None or not self.redis.exists(self.room_key_prefix + code):
+                break
+            with self._lock:
+                self.stats['collisions'] += 1
+        else:
+            code = None
+        with self._lock:
+            if code is None:
+                self.stats['exhausted'] += 1
+            else:
+                self.stats['claimed'] += 1
+                if len(code) > self._length:
+                    self.stats['widened'] += 1
+                self._length = len(code)
+        if code is None:
+            raise RuntimeError('No free room codes left')
+        return code
+
+    def release(self, room_id):
+        """코드를 반납합니다. 할당기가 만든 형식이 아닌 id는 무시합니다."""
+        room_id = str(room_id)
+        if not room_id.isdigit() or not self.min_length <= len(room_id) <= self.max_length:
+            return False
+        released = self._release(keys=[bitmap_key(len(room_id)), count_key(len(room_id))], args=[int(room_id)])
+        if released:
+            with self._lock:
+                self.stats['released'] += 1
+        return bool(released)
+
+    def status(self):
+        with self._lock:
+            return dict(self.stats, min_length=self.min_length, max_load=self.max_load)
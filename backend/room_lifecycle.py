@@ -0,0 +1,320 @@
+import json
+import time
+import threading
+
+from room_store import (room_key, players_key, player_key, hand_key, rev_key,
+                        submissions_key, votes_key, deck_key)
+from room_owner import OWNERS_KEY, owner_key
+from logs import get_logger
+
+log = get_logger('room_lifecycle')
+
+# ==========================================
+# [Room Lifecycle] 방 TTL과 Redis 정리
+# ==========================================
+# rooms:active     SET  살아 있는 방 id (create_room에서 추가, 정리될 때 제거)
+# rooms:abandoned  ZSET room_id -> 접속한 사람이 없다고 처음 확인한 시각(ms)
+# rooms:sweeper    STRING 한 번에 한 워커만 정리하도록 거는 잠금 (PX)
+ACTIVE_ROOMS_KEY = 'rooms:active'
+ABANDONED_KEY = 'rooms:abandoned'
+SWEEPER_LOCK_KEY = 'rooms:sweeper'
+SOCKET_MAP_PREFIX = 'socket_map:'
+
+
+def room_keys(room_id):
+    """참가자별 키를 제외한 방 키 (room, players, rev, submissions, votes, deck)."""
+    return [room_key(room_id), players_key(room_id), rev_key(room_id),
+            submissions_key(room_id), votes_key(room_id), deck_key(room_id)]
+
+
+# 방의 모든 키에 TTL을 다시 겁니다. 게임이 끝난 방(phase=game_over)은 짧은 TTL.
+# 방 해시가 없으면(이미 만료/정리) 아무것도 만들지 않고 0.
+# KEYS: room_keys() / ARGV: idle ttl(ms), game over ttl(ms), player key prefix, hand key prefix
+TOUCH_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+local ttl = ARGV[1]
+if redis.call('HGET', KEYS[1], 'phase') == '"game_over"' then
+    ttl = ARGV[2]
+end
+for _, key in ipairs(KEYS) do
+    redis.call('PEXPIRE', key, ttl)
+end
+for _, uid in ipairs(redis.call('SMEMBERS', KEYS[2])) do
+    redis.call('PEXPIRE', ARGV[3] .. uid, ttl)
+    redis.call('PEXPIRE', ARGV[4] .. uid, ttl)
+end
+return tonumber(ttl)
+"""
+
+# 정리 판단에 필요한 값을 한 번에 읽습니다.
+# KEYS: room, players, rev, owner / ARGV: player key prefix
+# 반환: {방 존재 여부, phase, 방 해시 PTTL, 참가자 수, 접속 중인 사람 수, rev, owner}
+INSPECT_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return {0, '', -2, 0, 0, redis.call('GET', KEYS[3]) or '0', redis.call('GET', KEYS[4]) or ''}
+end
+local members = redis.call('SMEMBERS', KEYS[2])
+local humans = 0
+for _, uid in ipairs(members) do
+    local fields = redis.call('HMGET', ARGV[1] .. uid, 'is_ai', 'connected')
+    if fields[1] ~= 'true' and fields[2] ~= 'false' then
+        humans = humans + 1
+    end
+end
+return {1, redis.call('HGET', KEYS[1], 'phase') or '', redis.call('PTTL', KEYS[1]), #members, humans,
+        redis.call('GET', KEYS[3]) or '0', redis.call('GET', KEYS[4]) or ''}
+"""
+
+# rev가 검사할 때와 같을 때만 방을 통째로 지웁니다 (그 사이 누가 들어왔으면 -1).
+# KEYS: room_keys() + owner, owners zset, active set, abandoned zset
+# ARGV: expected rev, player key prefix, hand key prefix, room_id
+# 반환: 지운 키 개수
+REAP_SCRIPT = """
+if (redis.call('GET', KEYS[3]) or '0') ~= ARGV[1] then
+    return -1
+end
+local deleted = 0
+for _, uid in ipairs(redis.call('SMEMBERS', KEYS[2])) do
+    deleted = deleted + redis.call('DEL', ARGV[2] .. uid, ARGV[3] .. uid)
+end
+for i = 1, 7 do
+    deleted = deleted + redis.call('DEL', KEYS[i])
+end
+redis.call('ZREM', KEYS[8], ARGV[4])
+redis.call('SREM', KEYS[9], ARGV[4])
+redis.call('ZREM', KEYS[10], ARGV[4])
+return deleted
+"""
+
+
+class RoomLifecycle:
+    """
+    [Room Lifecycle] 방 키의 TTL 관리와 백그라운드 정리(sweeper).
+
+    - touch(): 활동이 있을 때 방의 모든 키 TTL을 갱신합니다 (방마다 touch_interval초에 한 번,
+      게임 종료처럼 TTL 종류가 바뀌면 즉시). 진행 중인 방은 idle_ttl, 끝난 방은 game_over_ttl.
+    - sweeper는 interval초마다 (워커 중 하나만) 아래 세 가지를 SCAN 커서로 batch개씩, 커서가 한 바퀴 돌 때까지
+      처리합니다. 한 주기에 budget초를 넘기면 멈추고 다음 주기에 그 커서부터 이어갑니다.
+      1) rooms:active: 만료된 방, grace초 넘게 비어 있는 방, grace초 넘게 접속한 사람이 없는 방을 지웁니다.
+         TTL이 없는 방(이전 버전에서 만든 방)에는 TTL을 겁니다.
+      2) room:*: 방 해시가 없는데 남아 있는 참가자/손패/덱 등의 키.
+      3) socket_map:*: 방이나 참가자가 사라진 소켓 매핑.
+    - 방을 지우면 on_reaped(room_id, owner_id)로 알려 (owner 워커의) 타이머/전송 기록을 정리하게 합니다.
+
+    spawn/sleep은 socketio.start_background_task / socketio.sleep을 넘겨 async 모드에 맞춥니다.
+    """
+
+    def __init__(self, redis_client, spawn, sleep, idle_ttl=7200.0, game_over_ttl=600.0,
+                 grace=300.0, interval=60.0, batch=200, budget=10.0, on_reaped=None):
+        self.redis = redis_client
+        self._spawn = spawn
+        self._sleep = sleep
+        self.idle_ttl_ms = int(idle_ttl * 1000)
+        self.game_over_ttl_ms = int(game_over_ttl * 1000)
+        self.grace_ms = int(grace * 1000)
+        self.interval = interval
+        self.batch = batch
+        # 잠금(SWEEPER_LOCK_KEY)이 풀리기 전에 끝나도록 주기의 절반을 넘지 않게
+        self.budget = min(budget, interval / 2)
+        self.touch_interval = min(60.0, idle_ttl / 4, game_over_ttl / 4)
+        self._on_reaped = on_reaped
+        self._touch = redis_client.register_script(TOUCH_SCRIPT)
+        self._inspect = redis_client.register_script(INSPECT_SCRIPT)
+        self._reap = redis_client.register_script(REAP_SCRIPT)
+        self._lock = threading.Lock()
+        self._touched = {}  # room_id -> (마지막 touch 시각(monotonic), game_over 여부)
+        self._cursors = {'rooms': 0, 'keys': 0, 'socket_maps': 0}
+        self._started = False
+        self.stats = {'touched': 0, 'sweeps': 0, 'batches': 0, 'passes': 0, 'rooms_reaped': 0, 'expired': 0, 'empty': 0,
+                      'abandoned': 0, 'keys_deleted': 0, 'orphan_keys': 0, 'socket_maps': 0, 'failed': 0}
+
+    # --- TTL ---
+    def touch(self, room_id, room_data=None, force=False):
+        """활동 기록. room_data(세션의 방 필드)를 주면 게임 종료 전환을 바로 반영합니다."""
+        now = time.monotonic()
+        with self._lock:
+            last = self._touched.get(room_id)
+            game_over = last[1] if last else False
+            if room_data:
+                game_over = room_data.get('phase') == 'game_over'
+            if last and not force and now - last[0] < self.touch_interval and game_over == last[1]:
+                return
+            self._touched[room_id] = (now, game_over)
+        self._touch(keys=room_keys(room_id),
+                    args=[self.idle_ttl_ms, self.game_over_ttl_ms, player_key(room_id, ''), hand_key(room_id, '')])
+        self.stats['touched'] += 1
+
+    def forget(self, room_id):
+        with self._lock:
+            self._touched.pop(room_id, None)
+
+    # --- Sweeper ---
+    def start(self):
+        if self._started:
+            return
+        self._started = True
+        self._spawn(self._sweep_loop)
+
+    def _sweep_loop(self):
+        while True:
+            self._sleep(self.interval)
+            try:
+                # 여러 워커가 떠 있어도 한 주기에 한 워커만 정리
+                if self.redis.set(SWEEPER_LOCK_KEY, '1', nx=True, px=int(self.interval * 1000 * 0.9)):
+                    self.sweep()
+            except Exception as e:
+                self.stats['failed'] += 1
+                log.exception("❌ [Room Lifecycle] Sweep failed: %s", e)
+
+    def sweep(self):
+        """
+        한 주기 분량을 정리하고 이번에 지운 방 id 목록을 반환합니다.
+        각 SCAN 커서를 한 바퀴(커서가 0으로 돌아올 때까지) 돌리되, budget초가 지나면 다음 주기로 넘깁니다.
+        """
+        self.stats['sweeps'] += 1
+        deadline = time.monotonic() + self.budget
+        reaped = [room_id for batch in self._drain('rooms', self._sweep_rooms, deadline) for room_id in batch]
+        orphan_keys = sum(self._drain('keys', self._sweep_orphan_keys, deadline))
+        socket_maps = sum(self._drain('socket_maps', self._sweep_socket_maps, deadline))
+        self._prune_touched()
+        if reaped or orphan_keys or socket_maps:
+            log.info("🧹 [Room Lifecycle] Reaped %d room(s), %d orphan key(s), %d socket map(s)",
+                     len(reaped), orphan_keys, socket_maps)
+        return reaped
+
+    def _drain(self, cursor_name, step, deadline):
+        """커서가 한 바퀴 돌거나 deadline이 지날 때까지 step()(batch 하나)을 반복합니다. 최소 한 번은 실행."""
+        results = []
+        while True:
+            results.append(step())
+            self.stats['batches'] += 1
+            if self._cursors[cursor_name] == 0:
+                self.stats['passes'] += 1
+                return results
+            if time.monotonic() >= deadline:
+                return results
+            self._sleep(0)  # batch 사이에 다른 작업에 양보
+
+    def _sweep_rooms(self):
+        cursor, room_ids = self.redis.sscan(ACTIVE_ROOMS_KEY, self._cursors['rooms'], count=self.batch)
+        self._cursors['rooms'] = cursor
+        if not room_ids:
+            return []
+        pipe = self.redis.pipeline(transaction=False)
+        for room_id in room_ids:
+            self._inspect(keys=[room_key(room_id), players_key(room_id), rev_key(room_id), owner_key(room_id)],
+                          args=[player_key(room_id, '')], client=pipe)
+        inspected = pipe.execute()
+
+        now_ms = int(time.time() * 1000)
+        reap, untimed, abandoned, attended = [], [], [], []
+        for room_id, (exists, phase, pttl, players, humans, rev, owner) in zip(room_ids, inspected):
+            if not exists:
+                reap.append((room_id, rev, owner, 'expired'))
+                continue
+            if pttl < 0:
+                untimed.append(room_id)
+                continue
+            ttl = self.game_over_ttl_ms if phase == '"game_over"' else self.idle_ttl_ms
+            if players == 0:
+                if ttl - pttl >= self.grace_ms:
+                    reap.append((room_id, rev, owner, 'empty'))
+            elif humans == 0:
+                abandoned.append((room_id, rev, owner))
+            else:
+                attended.append(room_id)
+
+        pipe = self.redis.pipeline(transaction=False)
+        for room_id, _, _ in abandoned:
+            pipe.zadd(ABANDONED_KEY, {room_id: now_ms}, nx=True)
+            pipe.zscore(ABANDONED_KEY, room_id)
+        if attended:
+            pipe.zrem(ABANDONED_KEY, *attended)
+        results = pipe.execute() if (abandoned or attended) else []
+        for i, (room_id, rev, owner) in enumerate(abandoned):
+            if now_ms - int(results[i * 2 + 1]) >= self.grace_ms:
+                reap.append((room_id, rev, owner, 'abandoned'))
+
+        for room_id in untimed:
+            self.touch(room_id, force=True)
+
+        reaped = []
+        for room_id, rev, owner, reason in reap:
+            deleted = self._reap(keys=room_keys(room_id) + [owner_key(room_id), OWNERS_KEY, ACTIVE_ROOMS_KEY, ABANDONED_KEY],
+                                 args=[rev, player_key(room_id, ''), hand_key(room_id, ''), room_id])
+            if deleted < 0:
+                continue  # 검사 이후 누가 들어왔거나 상태가 바뀜: 다음 주기에 다시 판단
+            self.stats['rooms_reaped'] += 1
+            self.stats[reason] += 1
+            self.stats['keys_deleted'] += deleted
+            reaped.append(room_id)
+            self.forget(room_id)
+            if self._on_reaped:
+                self._on_reaped(room_id, owner or None)
+        return reaped
+
+    def _sweep_orphan_keys(self):
+        cursor, keys = self.redis.scan(self._cursors['keys'], match='room:*', count=self.batch)
+        self._cursors['keys'] = cursor
+        # room:<id> 해시 자체가 아닌 하위 키만 대상
+        by_room = {}
+        for key in keys:
+            parts = key.split(':', 2)
+            if len(parts) == 3:
+                by_room.setdefault(parts[1], []).append(key)
+        if not by_room:
+            return 0
+        room_ids = list(by_room)
+        pipe = self.redis.pipeline(transaction=False)
+        for room_id in room_ids:
+            pipe.exists(room_key(room_id))
+        orphans = [key for room_id, exists in zip(room_ids, pipe.execute()) if not exists
+                   for key in by_room[room_id]]
+        if not orphans:
+            return 0
+        deleted = self.redis.delete(*orphans)
+        self.stats['orphan_keys'] += deleted
+        return deleted
+
+    def _sweep_socket_maps(self):
+        cursor, keys = self.redis.scan(self._cursors['socket_maps'], match=f'{SOCKET_MAP_PREFIX}*', count=self.batch)
+        self._cursors['socket_maps'] = cursor
+        if not keys:
+            return 0
+        mappings = self.redis.mget(keys)
+        pipe = self.redis.pipeline(transaction=False)
+        checked = []
+        orphans = []
+        for key, raw in zip(keys, mappings):
+            if raw is None:
+                continue
+            try:
+                mapping = json.loads(raw)
+                room_id, user_id = mapping['room_id'], mapping['user_id']
+            except (ValueError, KeyError, TypeError):
+                orphans.append(key)
+                continue
+            pipe.sismember(players_key(room_id), user_id)
+            checked.append(key)
+        for key, member in zip(checked, pipe.execute() if checked else []):
+            if not member:
+                orphans.append(key)
+        if not orphans:
+            return 0
+        deleted = self.redis.delete(*orphans)
+        self.stats['socket_maps'] += deleted
+        return deleted
+
+    def _prune_touched(self):
+        horizon = time.monotonic() - self.idle_ttl_ms / 1000
+        with self._lock:
+            for room_id in [r for r, (at, _) in self._touched.items() if at < horizon]:
+                del self._touched[room_id]
+
+    def status(self):
+        with self._lock:
+            tracked = len(self._touched)
+        return dict(self.stats, tracked=tracked, idle_ttl=self.idle_ttl_ms / 1000,
+                    game_over_ttl=self.game_over_ttl_ms / 1000, grace=self.grace_ms / 1000)
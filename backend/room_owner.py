@@ -0,0 +1,281 @@
+import os
+import json
+import time
+import uuid
+import socket
+import threading
+
+from logs import get_logger
+
+log = get_logger('room_owner')
+
+# ==========================================
+# [Room Ownership] 방 단위 lease
+# ==========================================
+# room:<id>:owner   STRING  소유 워커 id (PX ttl)
+# rooms:owners      ZSET    room_id -> lease 만료 시각(ms). 만료된 방은 다른 워커가 넘겨받습니다.
+# worker:<id>       CHANNEL 워커별 pub/sub 채널 (소유 워커에게 작업 전달)
+OWNERS_KEY = 'rooms:owners'
+
+
+def owner_key(room_id):
+    return f"room:{room_id}:owner"
+
+
+def worker_channel(worker_id):
+    return f"worker:{worker_id}"
+
+
+def make_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+# 비어 있거나 내 것이면 (재)획득하고 1, 다른 워커 소유면 그 워커 id.
+# KEYS: owner key, owners zset / ARGV: worker id, ttl(ms), now(ms), room_id
+CLAIM_SCRIPT = """
+local owner = redis.call('GET', KEYS[1])
+if owner and owner ~= ARGV[1] then
+    return owner
+end
+redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+redis.call('ZADD', KEYS[2], tonumber(ARGV[3]) + tonumber(ARGV[2]), ARGV[4])
+return 1
+"""
+
+# 내 lease만 연장합니다. 연장했으면 1, 이미 잃었으면 0.
+RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call('PEXPIRE', KEYS[1], ARGV[2])
+redis.call('ZADD', KEYS[2], tonumber(ARGV[3]) + tonumber(ARGV[2]), ARGV[4])
+return 1
+"""
+
+# 구독자가 없는(죽은) 워커의 lease를 넘겨받습니다. 그 사이 owner가 바뀌었으면 0.
+# KEYS: owner key, owners zset / ARGV: 죽은 워커 id, 내 워커 id, ttl(ms), now(ms), room_id
+TAKEOVER_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'PX', ARGV[3])
+redis.call('ZADD', KEYS[2], tonumber(ARGV[4]) + tonumber(ARGV[3]), ARGV[5])
+return 1
+"""
+
+# 내 lease일 때만 지웁니다.
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    redis.call('ZREM', KEYS[2], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+
+class RoomOwnership:
+    """
+    [Room Ownership] 여러 워커 프로세스가 떠 있을 때 방마다 정확히 한 워커(owner)만 AI 타이머와
+    상태 전송(버전 patch)을 담당하도록 하는 lease.
+
+    - claim(): 로컬에 유효한 lease가 있으면 Redis 없이 True. 아니면 비어 있을 때만 획득합니다.
+      다른 워커가 가지고 있으면 False와 그 워커 id를 돌려주고, 호출자는 forward()로 작업을 넘깁니다.
+    - 백그라운드 루프가 ttl/3마다 lease를 연장하고, 연장에 실패한 방은 on_lost(room_id)로 알립니다.
+      같은 루프가 rooms:owners에서 만료된 방(죽은 워커의 방)을 찾아 넘겨받고 on_adopt(room_id)를 부릅니다.
+    - 워커 채널로 들어온 메시지는 on_message(dict)로 전달됩니다. forward() 때 owner 채널에 구독자가 없으면
+      (재시작/종료된 워커) TTL을 기다리지 않고 바로 lease를 넘겨받습니다.
+    - 종료 시 release_all()로 가진 lease를 모두 내려놓습니다 (app.py에서 atexit/SIGTERM에 등록).
+
+    spawn/sleep은 socketio.start_background_task / socketio.sleep을 넘겨 async 모드에 맞춥니다.
+    """
+
+    MAX_HOPS = 3
+    LISTEN_TIMEOUT = 1.0
+
+    def __init__(self, redis_client, spawn, sleep, worker_id=None, ttl=15.0,
+                 on_message=None, on_lost=None, on_adopt=None):
+        self.redis = redis_client
+        self.worker_id = worker_id or make_worker_id()
+        self.ttl_ms = int(ttl * 1000)
+        self._spawn = spawn
+        self._sleep = sleep
+        self._on_message = on_message
+        self._on_lost = on_lost
+        self._on_adopt = on_adopt
+        self._claim = redis_client.register_script(CLAIM_SCRIPT)
+        self._renew = redis_client.register_script(RENEW_SCRIPT)
+        self._release = redis_client.register_script(RELEASE_SCRIPT)
+        self._takeover = redis_client.register_script(TAKEOVER_SCRIPT)
+        self._lock = threading.Lock()
+        self._owned = {}  # room_id -> 로컬 기준 lease 만료 시각(monotonic)
+        self._started = False
+        self.stats = {'claimed': 0, 'forwarded': 0, 'received': 0, 'dropped': 0, 'lost': 0, 'adopted': 0,
+                      'taken_over': 0, 'released': 0}
+
+    # --- Ownership ---
+    def owns(self, room_id):
+        with self._lock:
+            expires = self._owned.get(room_id)
+        return expires is not None and expires > time.monotonic()
+
+    def claim(self, room_id):
+        """(True, None)이면 이 워커가 owner, (False, owner_id)면 다른 워커가 owner."""
+        if self.owns(room_id):
+            return True, None
+        started = time.monotonic()
+        result = self._claim(keys=[owner_key(room_id), OWNERS_KEY],
+                             args=[self.worker_id, self.ttl_ms, int(time.time() * 1000), room_id])
+        if result != 1:
+            return False, result
+        with self._lock:
+            # 로컬 만료는 실제 TTL보다 조금 앞당겨 Redis보다 먼저 끝나도록 (시계 오차 여유)
+            self._owned[room_id] = started + self.ttl_ms / 1000 * 0.8
+            self.stats['claimed'] += 1
+        return True, None
+
+    def release(self, room_id):
+        with self._lock:
+            self._owned.pop(room_id, None)
+        self._release(keys=[owner_key(room_id), OWNERS_KEY], args=[self.worker_id, room_id])
+
+    def release_all(self):
+        """가진 lease를 모두 내려놓습니다 (종료 시). 다른 워커가 TTL을 기다리지 않고 바로 claim할 수 있습니다."""
+        with self._lock:
+            rooms, self._owned = list(self._owned), {}
+        if not rooms:
+            return 0
+        pipe = self.redis.pipeline(transaction=False)
+        for room_id in rooms:
+            self._release(keys=[owner_key(room_id), OWNERS_KEY], args=[self.worker_id, room_id], client=pipe)
+        released = sum(1 for ok in pipe.execute() if ok == 1)
+        self.stats['released'] += released
+        log.info("👋 [Room Owner] Released %d lease(s) on shutdown", released)
+        return released
+
+    def forward(self, owner_id, message):
+        """
+        다른 워커(owner)에게 작업을 넘깁니다. 넘겼거나 버렸으면 True, 이 워커가 owner가 됐으면 False
+        (호출자가 직접 처리). 너무 여러 번 넘겨진 메시지는 버립니다(소유권 이동 중).
+        owner 채널에 구독자가 없으면 죽은 워커로 보고 lease를 넘겨받습니다.
+        """
+        room_id = message['room_id']
+        while True:
+            message = dict(message, hops=message.get('hops', 0) + 1)
+            if message['hops'] > self.MAX_HOPS:
+                self.stats['dropped'] += 1
+                log.warning("⚠️ [Room Owner] Dropped %s for room %s after %d hops",
+                            message.get('kind'), room_id, self.MAX_HOPS)
+                return True
+            if self.redis.publish(worker_channel(owner_id), json.dumps(message)):
+                self.stats['forwarded'] += 1
+                return True
+            if self._take_over(room_id, owner_id):
+                return False
+            # 그 사이 다른 워커가 넘겨받았으면 새 owner에게 다시 시도
+            owned, owner_id = self.claim(room_id)
+            if owned:
+                return False
+
+    def _take_over(self, room_id, dead_owner_id):
+        started = time.monotonic()
+        taken = self._takeover(keys=[owner_key(room_id), OWNERS_KEY],
+                               args=[dead_owner_id, self.worker_id, self.ttl_ms, int(time.time() * 1000), room_id])
+        if taken != 1:
+            return False
+        with self._lock:
+            self._owned[room_id] = started + self.ttl_ms / 1000 * 0.8
+            self.stats['taken_over'] += 1
+        log.info("🔁 [Room Owner] Took over room %s from %s (no subscriber)", room_id, dead_owner_id)
+        if self._on_adopt:
+            self._on_adopt(room_id)
+        return True
+
+    def owned_rooms(self):
+        with self._lock:
+            return list(self._owned)
+
+    def status(self):
+        with self._lock:
+            owned = len(self._owned)
+        return dict(self.stats, worker_id=self.worker_id, owned=owned, ttl=self.ttl_ms / 1000)
+
+    # --- Background loops ---
+    def start(self):
+        if self._started:
+            return
+        self._started = True
+        self._spawn(self._heartbeat_loop)
+        self._spawn(self._listen_loop)
+
+    def _heartbeat_loop(self):
+        interval = self.ttl_ms / 1000 / 3
+        while True:
+            self._sleep(interval)
+            try:
+                self._renew_owned()
+                self._adopt_orphans()
+            except Exception as e:
+                log.exception("❌ [Room Owner] Heartbeat failed: %s", e)
+
+    def _renew_owned(self):
+        rooms = self.owned_rooms()
+        if not rooms:
+            return
+        started = time.monotonic()
+        now_ms = int(time.time() * 1000)
+        pipe = self.redis.pipeline(transaction=False)
+        for room_id in rooms:
+            self._renew(keys=[owner_key(room_id), OWNERS_KEY],
+                        args=[self.worker_id, self.ttl_ms, now_ms, room_id], client=pipe)
+        results = pipe.execute()
+        lost = []
+        with self._lock:
+            for room_id, ok in zip(rooms, results):
+                if ok == 1:
+                    self._owned[room_id] = started + self.ttl_ms / 1000 * 0.8
+                elif self._owned.pop(room_id, None) is not None:
+                    lost.append(room_id)
+            self.stats['lost'] += len(lost)
+        for room_id in lost:
+            log.warning("⚠️ [Room Owner] Lost lease for room %s", room_id)
+            if self._on_lost:
+                self._on_lost(room_id)
+
+    def _adopt_orphans(self, batch=50):
+        now_ms = int(time.time() * 1000)
+        expired = self.redis.zrangebyscore(OWNERS_KEY, '-inf', now_ms, start=0, num=batch)
+        for room_id in expired:
+            owned, _ = self.claim(room_id)
+            if not owned:
+                continue
+            self.stats['adopted'] += 1
+            log.info("🔁 [Room Owner] Adopted room %s from an expired lease", room_id)
+            if self._on_adopt:
+                self._on_adopt(room_id)
+
+    def _dispatch(self, data):
+        if not self._on_message:
+            return
+        try:
+            self._on_message(json.loads(data))
+        except Exception as e:
+            log.exception("❌ [Room Owner] Failed to handle message %s: %s", data, e)
+
+    def _listen_loop(self):
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(worker_channel(self.worker_id))
+                while True:
+                    # 메시지가 올 때까지 블로킹 대기 (eventlet에서는 monkey patch된 소켓이라 허브에 양보)
+                    message = pubsub.get_message(timeout=self.LISTEN_TIMEOUT)
+                    if message is None:
+                        continue
+                    self.stats['received'] += 1
+                    self._dispatch(message['data'])
+            except Exception as e:
+                log.exception("❌ [Room Owner] Listener failed, resubscribing: %s", e)
+                self._sleep(1)
+            finally:
+                pubsub.close()
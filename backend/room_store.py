@@ -0,0 +1,500 @@
+import json
+
+from logs import get_logger
+
+log = get_logger('room_store')
+
+# ==========================================
+# [Schema v2] 필드 단위 Redis 스키마
+# ==========================================
+# room:<id>                  HASH  방 필드 (값은 필드별 JSON: 숫자/불리언/문자열/리스트)
+# room:<id>:players          SET   참가자 user_id 목록
+# room:<id>:player:<uid>     HASH  참가자 필드 (score/submitted_count는 HINCRBY로 증감)
+# room:<id>:hand:<uid>       STRING 손패 JSON (손패가 바뀔 때만 기록)
+# room:<id>:rev              STRING 방/참가자/손패가 바뀔 때마다 INCR (RoomSession의 CAS 기준)
+# room:<id>:submissions / :votes / :deck 은 기존과 동일
+#
+# 구버전(v1)은 room:<id>가 JSON 문자열, room:<id>:users가 {uid: 유저 JSON} 해시였습니다.
+#
+# [Single Node] SUBMIT_CARD_SCRIPT와 LOAD_ROOM_SCRIPT는 참가자 목록(SMEMBERS)으로 참가자/손패 키를 만들어 읽으므로
+# 그 키들을 KEYS로 미리 선언할 수 없습니다. 그래서 이 저장소는 방의 모든 키가 한 노드에 있는 단일 Redis를 전제로 합니다
+# (Redis Cluster로 옮기려면 키를 room:{<id>}... 해시 태그로 바꿔 방 키를 한 슬롯에 모아야 함). 그 외 스크립트는
+# 건드리는 키를 모두 KEYS로 받습니다.
+SCHEMA_VERSION = 2
+SCHEMA_VERSION_KEY = 'schema:version'
+
+
+def room_key(room_id):
+    return f"room:{room_id}"
+
+
+def players_key(room_id):
+    return f"room:{room_id}:players"
+
+
+def player_key(room_id, user_id):
+    return f"room:{room_id}:player:{user_id}"
+
+
+def hand_key(room_id, user_id):
+    return f"room:{room_id}:hand:{user_id}"
+
+
+# [Atomic Scripts] 검증 → 변경 → 페이즈 전환 판단을 Redis 안에서 한 번에 처리합니다.
+# 방 필드 값은 JSON 인코딩이므로 문자열 필드는 따옴표를 포함한 값('"voting"')으로 비교합니다.
+# 다른 참가자의 키는 SMEMBERS 결과로 만들기 때문에 접두사(room:<id>:player:)를 ARGV로 넘깁니다 (위 [Single Node]).
+
+# KEYS: room, players, submissions, votes, rev
+# ARGV: user_id, card_id, submission JSON, player key prefix, shuffle seed
+# 반환: {status, submitted_count, submissions, required, 미제출 유저}
+#   status = phase | missing | limit | duplicate | submitted | waiting | voting
+SUBMIT_CARD_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'phase') ~= '"audience_submitting"' then
+    return {'phase', 0, 0, 0}
+end
+if redis.call('SISMEMBER', KEYS[2], ARGV[1]) == 0 then
+    return {'missing', 0, 0, 0}
+end
+local target = tonumber(redis.call('HGET', KEYS[1], 'audience_card_limit') or '1')
+local player = ARGV[4] .. ARGV[1]
+local count = tonumber(redis.call('HGET', player, 'submitted_count') or '0')
+if count >= target then
+    return {'limit', count, 0, target}
+end
+if redis.call('HSETNX', KEYS[3], ARGV[2], ARGV[3]) == 0 then
+    return {'duplicate', count, 0, target}
+end
+count = redis.call('HINCRBY', player, 'submitted_count', 1)
+if count >= target then
+    redis.call('HSET', player, 'submitted', 'true')
+end
+redis.call('INCR', KEYS[5])
+
+local subs = redis.call('HLEN', KEYS[3])
+local members = redis.call('SMEMBERS', KEYS[2])
+local required = (#members - 1) * target + 1
+if subs < required then
+    return {'submitted', count, subs, required}
+end
+-- 총 개수만이 아니라 이야기꾼을 뺀 모든 유저가 실제로 제한만큼 냈는지 확인
+local storyteller = cjson.decode(redis.call('HGET', KEYS[1], 'storyteller_id') or 'null')
+for _, uid in ipairs(members) do
+    if uid ~= storyteller and tonumber(redis.call('HGET', ARGV[4] .. uid, 'submitted_count') or '0') < target then
+        return {'waiting', count, subs, required, uid}
+    end
+end
+
+local candidates = redis.call('HVALS', KEYS[3])
+math.randomseed(tonumber(ARGV[5]))
+for i = #candidates, 2, -1 do
+    local j = math.random(i)
+    candidates[i], candidates[j] = candidates[j], candidates[i]
+end
+redis.call('HSET', KEYS[1], 'phase', '"voting"', 'voting_candidates', '[' .. table.concat(candidates, ',') .. ']',
+           'voting_closed', 'false')
+redis.call('DEL', KEYS[4])
+return {'voting', count, subs, required}
+"""
+
+# KEYS: room, players, votes, rev, 투표자 참가자 hash
+# ARGV: voter_id, card_id
+# 반환: {status, votes, required}
+#   status = phase | missing | storyteller | voted | result
+# 마지막 표가 들어오면 voting_closed를 세워 결과 계산을 정확히 한 호출자에게만 넘깁니다.
+SUBMIT_VOTE_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'phase') ~= '"voting"' or redis.call('HGET', KEYS[1], 'voting_closed') == 'true' then
+    return {'phase', 0, 0}
+end
+if redis.call('SISMEMBER', KEYS[2], ARGV[1]) == 0 then
+    return {'missing', 0, 0}
+end
+if cjson.decode(redis.call('HGET', KEYS[1], 'storyteller_id') or 'null') == ARGV[1] then
+    return {'storyteller', 0, 0}
+end
+redis.call('HSET', KEYS[3], ARGV[1], ARGV[2])
+redis.call('HSET', KEYS[5], 'voted', 'true')
+redis.call('INCR', KEYS[4])
+
+local votes = redis.call('HLEN', KEYS[3])
+local required = redis.call('SCARD', KEYS[2]) - 1
+if votes < required then
+    return {'voted', votes, required}
+end
+redis.call('HSET', KEYS[1], 'voting_closed', 'true')
+return {'result', votes, required}
+"""
+
+# [Unit of Work] 방 상태 전체를 한 번에 읽습니다.
+# KEYS: rev, room, players, submissions, votes
+# ARGV: player key prefix, hand key prefix
+# 반환: {rev, room 필드들, submissions, votes, uid1, player1 필드들, hand1, uid2, ...}
+LOAD_ROOM_SCRIPT = """
+local out = {redis.call('GET', KEYS[1]) or '0', redis.call('HGETALL', KEYS[2]),
+             redis.call('HGETALL', KEYS[4]), redis.call('HGETALL', KEYS[5])}
+for _, uid in ipairs(redis.call('SMEMBERS', KEYS[3])) do
+    table.insert(out, uid)
+    table.insert(out, redis.call('HGETALL', ARGV[1] .. uid))
+    table.insert(out, redis.call('GET', ARGV[2] .. uid) or '')
+end
+return out
+"""
+
+# rev가 읽을 때와 같을 때만 쌓인 명령을 적용하고 rev를 올립니다. 다르면 -1.
+# KEYS: rev, 명령이 건드리는 키들
+# ARGV: expected rev, (command, KEYS 번호, field, value) 4개씩 반복
+COMMIT_ROOM_SCRIPT = """
+if (redis.call('GET', KEYS[1]) or '0') ~= ARGV[1] then
+    return -1
+end
+for i = 2, #ARGV, 4 do
+    local cmd, key = ARGV[i], KEYS[tonumber(ARGV[i + 1])]
+    if cmd == 'HSET' then
+        redis.call('HSET', key, ARGV[i + 2], ARGV[i + 3])
+    elseif cmd == 'HINCRBY' then
+        redis.call('HINCRBY', key, ARGV[i + 2], ARGV[i + 3])
+    elseif cmd == 'SET' then
+        redis.call('SET', key, ARGV[i + 3])
+    elseif cmd == 'LTRIM' then
+        redis.call('LTRIM', key, ARGV[i + 2], ARGV[i + 3])
+    elseif cmd == 'DEL' then
+        redis.call('DEL', key)
+    elseif cmd == 'SREM' then
+        redis.call('SREM', key, ARGV[i + 3])
+    end
+end
+return redis.call('INCR', KEYS[1])
+"""
+
+
+def rev_key(room_id):
+    return f"room:{room_id}:rev"
+
+
+def submissions_key(room_id):
+    return f"room:{room_id}:submissions"
+
+
+def votes_key(room_id):
+    return f"room:{room_id}:votes"
+
+
+def deck_key(room_id):
+    return f"room:{room_id}:deck"
+
+
+def encode_fields(fields):
+    """dict를 HSET용 {필드: JSON 문자열}로 변환합니다. 정수는 그대로 숫자 문자열이라 HINCRBY가 가능합니다."""
+    return {k: json.dumps(v, ensure_ascii=False) for k, v in fields.items()}
+
+
+def decode_fields(raw):
+    return {k: json.loads(v) for k, v in raw.items()}
+
+
+def _pairs(flat):
+    """HGETALL의 Lua 반환값([k1, v1, k2, v2, ...])을 dict로."""
+    return dict(zip(flat[::2], flat[1::2]))
+
+
+class RoomStore:
+    """
+    방/참가자 데이터 접근 계층. 변경은 바뀐 필드만 HSET/HINCRBY 하고, 손패는 별도 키로 다룹니다.
+    여러 참가자를 읽는 경우는 파이프라인 한 번으로 처리합니다.
+    """
+
+    def __init__(self, redis_client):
+        self.redis = redis_client
+        # register_script는 EVALSHA를 쓰고, 서버에 스크립트가 없으면(재시작 등) 자동으로 다시 로드합니다
+        self._submit_card = redis_client.register_script(SUBMIT_CARD_SCRIPT)
+        self._submit_vote = redis_client.register_script(SUBMIT_VOTE_SCRIPT)
+        self._load_room = redis_client.register_script(LOAD_ROOM_SCRIPT)
+        self._commit_room = redis_client.register_script(COMMIT_ROOM_SCRIPT)
+
+    @staticmethod
+    def _bump(pipe, room_id):
+        pipe.incr(rev_key(room_id))
+        return pipe
+
+    # --- Room ---
+    def room_exists(self, room_id):
+        return bool(self.redis.exists(room_key(room_id)))
+
+    def get_room_field(self, room_id, field, default=None):
+        raw = self.redis.hget(room_key(room_id), field)
+        return json.loads(raw) if raw is not None else default
+
+    def update_room(self, room_id, fields):
+        if fields:
+            self.write(room_id, room=fields)
+
+    # --- Players ---
+    def player_ids(self, room_id):
+        return list(self.redis.smembers(players_key(room_id)))
+
+    def count_players(self, room_id):
+        return self.redis.scard(players_key(room_id))
+
+    def has_player(self, room_id, user_id):
+        return bool(self.redis.sismember(players_key(room_id), user_id))
+
+    def get_player(self, room_id, user_id, with_hand=False):
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hgetall(player_key(room_id, user_id))
+        if with_hand:
+            pipe.get(hand_key(room_id, user_id))
+        results = pipe.execute()
+        if not results[0]:
+            return None
+        player = decode_fields(results[0])
+        if with_hand:
+            player['hand'] = json.loads(results[1]) if results[1] else []
+        return player
+
+    def get_players(self, room_id, with_hands=False):
+        """{user_id: 참가자 dict}. 목록 조회 1회 + 파이프라인 1회."""
+        return self._load_players(room_id, self.player_ids(room_id), with_hands)
+
+    def _load_players(self, room_id, user_ids, with_hands):
+        if not user_ids:
+            return {}
+        pipe = self.redis.pipeline(transaction=False)
+        for uid in user_ids:
+            pipe.hgetall(player_key(room_id, uid))
+            if with_hands:
+                pipe.get(hand_key(room_id, uid))
+        results = pipe.execute()
+        step = 2 if with_hands else 1
+        players = {}
+        for i, uid in enumerate(user_ids):
+            raw = results[i * step]
+            if not raw:
+                continue
+            player = decode_fields(raw)
+            if with_hands:
+                hand = results[i * step + 1]
+                player['hand'] = json.loads(hand) if hand else []
+            players[uid] = player
+        return players
+
+    def add_player(self, room_id, user):
+        """참가자를 추가(또는 덮어쓰기)합니다. user에 hand가 있으면 손패 키에 따로 저장합니다."""
+        user = dict(user)
+        hand = user.pop('hand', None)
+        uid = user['user_id']
+        pipe = self.redis.pipeline()
+        pipe.sadd(players_key(room_id), uid)
+        pipe.hset(player_key(room_id, uid), mapping=encode_fields(user))
+        if hand is not None:
+            pipe.set(hand_key(room_id, uid), json.dumps(hand, ensure_ascii=False))
+        self._bump(pipe, room_id).execute()
+
+    def update_player(self, room_id, user_id, fields):
+        if fields:
+            self.write(room_id, players={user_id: fields})
+
+    def remove_player(self, room_id, user_id):
+        pipe = self.redis.pipeline()
+        pipe.srem(players_key(room_id), user_id)
+        pipe.delete(player_key(room_id, user_id), hand_key(room_id, user_id))
+        self._bump(pipe, room_id).execute()
+
+    # --- Bulk read / write ---
+    def session(self, room_id):
+        """방 상태 전체(방, 참가자+손패, 제출, 투표)를 1 round trip으로 읽은 RoomSession."""
+        raw = self._load_room(
+            keys=[rev_key(room_id), room_key(room_id), players_key(room_id),
+                  submissions_key(room_id), votes_key(room_id)],
+            args=[player_key(room_id, ''), hand_key(room_id, '')],
+        )
+        rev, raw_room, raw_subs, votes = raw[:4]
+        players = {}
+        for i in range(4, len(raw), 3):
+            uid, raw_player, raw_hand = raw[i:i + 3]
+            if not raw_player:
+                continue
+            player = decode_fields(_pairs(raw_player))
+            player['hand'] = json.loads(raw_hand) if raw_hand else []
+            players[uid] = player
+        room = decode_fields(_pairs(raw_room)) if raw_room else None
+        submissions = {cid: json.loads(sub) for cid, sub in _pairs(raw_subs).items()}
+        return RoomSession(self, room_id, int(rev), room, players, submissions, _pairs(votes))
+
+    def stage(self, pipe, room_id, room=None, players=None, hands=None):
+        """
+        여러 변경과 rev 증가를 주어진 파이프라인에 쌓습니다 (실행은 호출자가).
+        players={uid: 필드}, hands={uid: 손패}
+        """
+        for uid, fields in (players or {}).items():
+            if fields:
+                pipe.hset(player_key(room_id, uid), mapping=encode_fields(fields))
+        for uid, hand in (hands or {}).items():
+            pipe.set(hand_key(room_id, uid), json.dumps(hand, ensure_ascii=False))
+        if room:
+            pipe.hset(room_key(room_id), mapping=encode_fields(room))
+        return self._bump(pipe, room_id)
+
+    def write(self, room_id, **changes):
+        """stage()의 변경을 MULTI/EXEC 한 번으로 기록합니다 (rev 확인 없음)."""
+        self.stage(self.redis.pipeline(), room_id, **changes).execute()
+
+    # --- Atomic game actions ---
+    def submit_card(self, room_id, user_id, submission, seed):
+        """
+        청중 카드 제출 + 투표 페이즈 전환 판단 (1 round trip).
+        전환된 경우 후보 순서는 seed로 섞입니다. 반환: dict(status, count, submissions, required, waiting_for)
+        """
+        result = self._submit_card(
+            keys=[room_key(room_id), players_key(room_id), submissions_key(room_id), votes_key(room_id),
+                  rev_key(room_id)],
+            args=[submission['user_id'], submission['card_id'], json.dumps(submission), player_key(room_id, ''), seed],
+        )
+        status, count, subs, required = result[:4]
+        return {'status': status, 'count': count, 'submissions': subs, 'required': required,
+                'waiting_for': result[4] if len(result) > 4 else None}
+
+    def submit_vote(self, room_id, voter_id, card_id):
+        """투표 + 결과 페이즈 전환 판단 (1 round trip). status가 'result'면 호출자가 결과를 계산합니다."""
+        status, votes, required = self._submit_vote(
+            keys=[room_key(room_id), players_key(room_id), votes_key(room_id), rev_key(room_id),
+                  player_key(room_id, voter_id)],
+            args=[voter_id, card_id],
+        )
+        return {'status': status, 'votes': votes, 'required': required}
+
+    # --- Migration ---
+    def migrate_legacy_room(self, room_id):
+        """
+        v1 레이아웃(room:<id> JSON 문자열 + room:<id>:users 해시)을 v2로 변환합니다.
+        한 방은 MULTI/EXEC 한 번으로 옮겨지므로 중간 상태가 보이지 않습니다. 변환했으면 True.
+        """
+        key = room_key(room_id)
+        if self.redis.type(key) != 'string':
+            return False
+        room_data = json.loads(self.redis.get(key))
+        legacy_users_key = f"room:{room_id}:users"
+        users = {uid: json.loads(raw) for uid, raw in self.redis.hgetall(legacy_users_key).items()}
+
+        pipe = self.redis.pipeline()
+        pipe.delete(key, legacy_users_key)
+        pipe.hset(key, mapping=encode_fields(room_data))
+        for uid, user in users.items():
+            user.setdefault('user_id', uid)
+            hand = user.pop('hand', [])
+            pipe.sadd(players_key(room_id), uid)
+            pipe.hset(player_key(room_id, uid), mapping=encode_fields(user))
+            pipe.set(hand_key(room_id, uid), json.dumps(hand, ensure_ascii=False))
+        pipe.execute()
+        return True
+
+    def migrate_legacy_rooms(self, force=False):
+        """
+        저장소 전체를 v2로 변환합니다. schema:version이 이미 최신이면 건너뜁니다.
+        (변환된 방 수, 남은 v1 방 수)를 반환합니다.
+        """
+        if not force and str(self.redis.get(SCHEMA_VERSION_KEY) or '') == str(SCHEMA_VERSION):
+            return 0, 0
+        migrated = failed = 0
+        for key in self.redis.scan_iter(match='room:*', count=500):
+            parts = key.split(':')
+            if len(parts) != 2 or self.redis.type(key) != 'string':
+                continue
+            try:
+                if self.migrate_legacy_room(parts[1]):
+                    migrated += 1
+            except Exception as e:
+                failed += 1
+                log.warning("⚠️ [Schema] Failed to migrate %s: %s", key, e)
+        if not failed:
+            self.redis.set(SCHEMA_VERSION_KEY, SCHEMA_VERSION)
+        return migrated, failed
+
+
+class RoomSession:
+    """
+    [Unit of Work] 이벤트 하나 동안 사용하는 방 상태.
+
+    RoomStore.session()이 방/참가자(손패 포함)/제출/투표를 한 번에 읽어 두고, 핸들러는 이 메모리 사본을
+    읽고 고칩니다. 변경은 _ops에 쌓였다가 commit()에서 rev가 읽을 때와 같을 때만 한 번에 기록됩니다.
+    커밋된 세션은 그대로 전송(emit)과 AI 예약에 넘겨 같은 이벤트에서 다시 읽지 않습니다.
+    """
+
+    def __init__(self, store, room_id, rev, room, players, submissions, votes):
+        self.store = store
+        self.room_id = room_id
+        self.rev = rev
+        self.room = room
+        self.players = players
+        self.submissions = submissions
+        self.votes = votes
+        self._ops = []
+
+    @property
+    def exists(self):
+        return self.room is not None
+
+    def set_room(self, **fields):
+        self.room.update(fields)
+        key = room_key(self.room_id)
+        for field, value in encode_fields(fields).items():
+            self._ops.append(('HSET', key, field, value))
+
+    def set_player(self, user_id, **fields):
+        self.players[user_id].update(fields)
+        key = player_key(self.room_id, user_id)
+        for field, value in encode_fields(fields).items():
+            self._ops.append(('HSET', key, field, value))
+
+    def incr_player(self, user_id, field, amount=1):
+        player = self.players[user_id]
+        player[field] = player.get(field, 0) + amount
+        self._ops.append(('HINCRBY', player_key(self.room_id, user_id), field, amount))
+
+    def set_hand(self, user_id, hand):
+        self.players[user_id]['hand'] = hand
+        self._ops.append(('SET', hand_key(self.room_id, user_id), '', json.dumps(hand, ensure_ascii=False)))
+
+    def remove_player(self, user_id):
+        self.players.pop(user_id, None)
+        self._ops.append(('SREM', players_key(self.room_id), '', user_id))
+        self._ops.append(('DEL', player_key(self.room_id, user_id), '', ''))
+        self._ops.append(('DEL', hand_key(self.room_id, user_id), '', ''))
+
+    def add_submission(self, card_id, submission):
+        self.submissions[card_id] = submission
+        self._ops.append(('HSET', submissions_key(self.room_id), card_id, json.dumps(submission)))
+
+    def clear_round(self):
+        """제출/투표 기록을 비웁니다."""
+        self.submissions, self.votes = {}, {}
+        self._ops.append(('DEL', submissions_key(self.room_id), '', ''))
+        self._ops.append(('DEL', votes_key(self.room_id), '', ''))
+
+    def peek_deck(self, count):
+        """덱 앞 count장을 미리 봅니다 (LRANGE). 실제로 꺼내는 건 take_deck()으로 commit 때."""
+        if count <= 0:
+            return []
+        return self.store.redis.lrange(deck_key(self.room_id), 0, count - 1)
+
+    def take_deck(self, count):
+        if count > 0:
+            self._ops.append(('LTRIM', deck_key(self.room_id), count, -1))
+
+    def commit(self):
+        """
+        쌓인 변경을 rev 확인과 함께 한 번에 기록합니다. 다른 요청이 먼저 기록했으면 False
+        (호출자가 새 세션으로 다시 시도). 바뀐 게 없으면 기록 없이 True.
+        """
+        if not self._ops:
+            return True
+        keys, slots, args = [rev_key(self.room_id)], {}, [self.rev]
+        for cmd, key, field, value in self._ops:
+            if key not in slots:
+                keys.append(key)
+                slots[key] = len(keys)
+            args.extend((cmd, slots[key], field, value))
+        rev = self.store._commit_room(keys=keys, args=args)
+        if rev == -1:
+            return False
+        self.rev = rev
+        self._ops = []
+        return True
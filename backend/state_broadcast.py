@@ -0,0 +1,132 @@
+import threading
+
+# 본인에게만 보내는 유저 필드 (공개 상태에서는 개수만 노출)
+PRIVATE_USER_FIELDS = ('hand',)
+
+
+def user_channel(room_id, user_id):
+    """유저 전용 Socket.IO room 이름 (join_game에서 가입)."""
+    return f"user:{room_id}:{user_id}"
+
+
+def split_user(user):
+    """유저 데이터를 (공개 필드, 손패)로 나눕니다."""
+    public = {k: v for k, v in user.items() if k not in PRIVATE_USER_FIELDS}
+    hand = user.get('hand') or []
+    public['hand_count'] = len(hand)
+    return public, hand
+
+
+def diff_fields(old, new):
+    """바뀐 필드만 담은 dict. 사라진 필드는 None으로 표시합니다."""
+    changes = {k: v for k, v in new.items() if k not in old or old[k] != v}
+    changes.update({k: None for k in old if k not in new})
+    return changes
+
+
+class StateBroadcaster:
+    """
+    [State Sync] 방 상태를 버전이 붙은 patch로 전송합니다.
+
+    - 공개 상태(room + 손패를 뺀 유저 정보 + 표시 순서)는 직전 전송본과 비교해 바뀐 필드만
+      방 전체에 'state_patch'로 보냅니다. 바뀐 게 없으면 아무것도 보내지 않습니다.
+    - 손패는 바뀐 경우에만 주인 전용 채널(user_channel)로 'hand_update'를 보냅니다.
+    - 방의 첫 전송이나 클라이언트 요청(sync_state) 시에는 'state_snapshot'으로 전체 상태를 보냅니다.
+      클라이언트는 patch의 base가 자신의 version과 다르면 스냅샷을 다시 요청합니다.
+    - rev(Redis room:<id>:rev)를 함께 넘기면 방마다 마지막으로 보낸 rev 이하인 상태는 버립니다.
+      먼저 읽은 상태가 늦게 도착해 클라이언트가 이전 상태로 돌아가는 일을 막습니다.
+    """
+
+    def __init__(self, emit):
+        self._emit = emit
+        self._lock = threading.Lock()
+        self._rooms = {}  # room_id -> {'version', 'room', 'users', 'order', 'hands'}
+        self.stats = {'snapshots': 0, 'patches': 0, 'skipped': 0, 'stale': 0, 'hand_updates': 0}
+
+    def publish(self, room_id, room_data, users, rev=None):
+        """
+        최신 상태(room_data, 표시 순서대로 정렬된 users 리스트)를 반영하고 변경분을 전송합니다.
+        rev가 이미 보낸 rev 이하면 아무것도 보내지 않고 False를 반환합니다.
+        """
+        order = [u['user_id'] for u in users]
+        public_users, hands = {}, {}
+        for u in users:
+            public_users[u['user_id']], hands[u['user_id']] = split_user(u)
+
+        # 전송 순서가 버전 순서와 같도록 비교와 전송을 한 번에 처리
+        with self._lock:
+            prev = self._rooms.get(room_id)
+            if rev is not None and prev is not None and prev['rev'] is not None and rev <= prev['rev']:
+                self.stats['stale'] += 1
+                return False
+            if prev is None:
+                state = {'version': 1, 'rev': rev, 'room': room_data, 'users': public_users, 'order': order,
+                         'hands': {}}
+                self._rooms[room_id] = state
+                self._emit('state_snapshot', self._snapshot(state), room=room_id)
+                self.stats['snapshots'] += 1
+            else:
+                state = prev
+                patch = {}
+                room_changes = diff_fields(prev['room'], room_data)
+                if room_changes:
+                    patch['room'] = room_changes
+                user_changes = {}
+                for uid, public in public_users.items():
+                    changes = diff_fields(prev['users'].get(uid, {}), public)
+                    if changes:
+                        user_changes[uid] = changes
+                if user_changes:
+                    patch['users'] = user_changes
+                removed = [uid for uid in prev['users'] if uid not in public_users]
+                if removed:
+                    patch['users_removed'] = removed
+                if order != prev['order']:
+                    patch['order'] = order
+
+                if patch:
+                    patch['base'] = prev['version']
+                    patch['version'] = prev['version'] + 1
+                    state.update(version=patch['version'], room=room_data, users=public_users, order=order)
+                    self._emit('state_patch', patch, room=room_id)
+                    self.stats['patches'] += 1
+                else:
+                    self.stats['skipped'] += 1
+
+            if rev is not None:
+                state['rev'] = rev
+
+            for uid, hand in hands.items():
+                if state['hands'].get(uid) != hand:
+                    self._emit('hand_update', {'hand': hand}, room=user_channel(room_id, uid))
+                    self.stats['hand_updates'] += 1
+            state['hands'] = hands
+        return True
+
+    def send_snapshot(self, room_id, user_id, sid):
+        """publish 이후 호출. 요청한 소켓에 전체 공개 상태와 본인 손패를 보냅니다."""
+        with self._lock:
+            state = self._rooms.get(room_id)
+            if state is None:
+                return
+            payload = self._snapshot(state)
+            payload['hand'] = state['hands'].get(user_id, [])
+            self._emit('state_snapshot', payload, room=sid)
+            self.stats['snapshots'] += 1
+
+    def forget(self, room_id):
+        """방이 정리될 때 전송 기록을 버립니다 (다음 publish는 스냅샷)."""
+        with self._lock:
+            self._rooms.pop(room_id, None)
+
+    def status(self):
+        with self._lock:
+            return dict(self.stats, rooms=len(self._rooms))
+
+    @staticmethod
+    def _snapshot(state):
+        return {
+            'version': state['version'],
+            'room': state['room'],
+            'users': [state['users'][uid] for uid in state['order']],
+        }
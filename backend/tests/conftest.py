@@ -0,0 +1,42 @@
+import os
+import sys
+
+# backend/ 모듈은 패키지가 아니라 평평한 스크립트 구조라 경로에 직접 추가합니다
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fakeredis
+import pytest
+
+
+@pytest.fixture
+def server():
+    """여러 워커(각자 자기 연결)가 함께 쓰는 fakeredis 서버."""
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def redis_client():
+    """테스트마다 비어 있는 인메모리 Redis (Lua 스크립트 포함)."""
+    return fakeredis.FakeStrictRedis(decode_responses=True)
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    """
+    redis.Redis를 fakeredis로 바꾼 뒤 app을 import합니다 (모듈 전역 상태라 세션마다 한 번).
+    AI 엔진은 임시 캐시 디렉터리의 artifact 모드라 모델 없이 랜덤 모드로 동작합니다.
+    """
+    import redis
+    from logs import setup_logging
+
+    setup_logging(stream=sys.__stderr__)  # pytest가 캡처한 stdout은 종료 시 닫히므로 출력 스레드는 stderr로
+    os.environ.setdefault('AI_ENGINE_MODE', 'artifact')
+    os.environ.setdefault('AI_CACHE_DIR', str(tmp_path_factory.mktemp('ai-cache')))
+    server = fakeredis.FakeServer()
+    original = redis.Redis
+    redis.Redis = lambda *args, **kwargs: fakeredis.FakeRedis(server=server, decode_responses=True)
+    try:
+        import app
+    finally:
+        redis.Redis = original
+    return app
@@ -0,0 +1,59 @@
+import threading
+import time
+
+from ai_scheduler import AITurnScheduler
+
+
+def spawn(target, *args):
+    thread = threading.Thread(target=target, args=args, daemon=True)
+    thread.start()
+    return thread
+
+
+def wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_sync_from_older_state_keeps_newer_phase_tasks():
+    scheduler = AITurnScheduler(spawn, time.sleep)
+    fired = []
+    assert scheduler.sync('1234', 1, 'voting', rev=8)
+    assert scheduler.schedule('1234', 1, 'voting', 'ai1', 0.05, fired.append, 'ai1')
+
+    # 제출 페이즈에서 읽은 상태(rev 7)로 늦게 도착한 예약 요청
+    assert not scheduler.sync('1234', 1, 'audience_submitting', rev=7)
+    assert not scheduler.schedule('1234', 1, 'audience_submitting', 'ai2', 0.01, fired.append, 'ai2')
+
+    assert wait_for(lambda: fired == ['ai1'])
+    assert scheduler.status()['stale'] == 1
+    assert scheduler.status()['cancelled'] == 0
+
+
+def test_cancelled_task_stops_waiting_early():
+    threads = []
+    scheduler = AITurnScheduler(lambda target, *args: threads.append(spawn(target, *args)), time.sleep)
+    fired = []
+    assert scheduler.schedule('1234', 1, 'voting', 'ai1', 30.0, fired.append, 'ai1')
+
+    scheduler.sync('1234', 2, 'storyteller_choosing')  # 페이즈가 바뀌어 취소됨
+
+    threads[0].join(timeout=1.0)
+    assert not threads[0].is_alive()
+    assert fired == []
+    assert scheduler.status()['cancelled'] == 1
+
+
+def test_failed_action_is_counted():
+    scheduler = AITurnScheduler(spawn, time.sleep)
+
+    def boom():
+        raise RuntimeError('boom')
+    scheduler.schedule('1234', 1, 'voting', 'ai1', 0.0, boom)
+
+    assert wait_for(lambda: scheduler.status()['failed'] == 1)
+    assert wait_for(lambda: scheduler.status()['pending'] == 0)
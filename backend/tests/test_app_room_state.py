@@ -0,0 +1,83 @@
+import time
+
+import pytest
+
+from room_store import rev_key
+
+
+def wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def app(app_module, monkeypatch):
+    for phase in app_module.AI_THINK_TIME:
+        monkeypatch.setitem(app_module.AI_THINK_TIME, phase, (0.01, 0.02))
+    return app_module
+
+
+def make_room(app, room_id, phase='result', storyteller='s', ai=()):
+    app.room_store.write(room_id, room={
+        'status': 'playing', 'phase': phase, 'current_round': 1, 'storyteller_id': storyteller,
+        'word_candidates': ['바다', '하늘'], 'reroll_count': 0, 'audience_card_limit': 1})
+    for uid in ('s', 'p0', 'p1'):
+        app.room_store.add_player(room_id, {
+            'user_id': uid, 'username': uid, 'is_ai': uid in ai, 'joined_at': 0,
+            'hand': [{'id': f"{uid}-{n}.png", 'src': ''} for n in range(6)]})
+
+
+def test_update_room_state_reapplies_after_concurrent_write(app):
+    make_room(app, 'cas1')
+    calls = []
+
+    def mutate(session):
+        calls.append(session.rev)
+        if len(calls) == 1:
+            app.redis_client.incr(rev_key('cas1'))  # 읽은 뒤 다른 요청이 먼저 기록
+        session.set_room(phase='storyteller_choosing')
+        return 'done'
+
+    session, result = app.update_room_state('cas1', mutate)
+    assert result == 'done'
+    assert len(calls) == 2 and calls[1] == calls[0] + 1
+    assert app.room_store.get_room_field('cas1', 'phase') == 'storyteller_choosing'
+
+
+def test_update_room_state_gives_up_after_retries(app):
+    make_room(app, 'cas2')
+    calls = []
+
+    def mutate(session):
+        calls.append(session.rev)
+        app.redis_client.incr(rev_key('cas2'))
+        session.set_room(phase='storyteller_choosing')
+        return 'done'
+
+    assert app.update_room_state('cas2', mutate, retries=3) == (None, None)
+    assert len(calls) == 3
+    assert app.room_store.get_room_field('cas2', 'phase') == 'result'
+    assert app.update_room_state('no-such-room', mutate) == (None, None)
+
+
+def test_ai_storyteller_retries_after_losing_every_cas(app, monkeypatch):
+    make_room(app, 'cas3', phase='storyteller_choosing', ai=('s',))
+    original = app.update_room_state
+    attempts = []
+
+    def lose_first(room_id, mutate, retries=3):
+        attempts.append(room_id)
+        if len(attempts) == 1:
+            return None, None
+        return original(room_id, mutate, retries)
+    monkeypatch.setattr(app, 'update_room_state', lose_first)
+
+    app.trigger_ai_check('cas3')
+
+    assert wait_for(lambda: app.room_store.get_room_field('cas3', 'phase') == 'audience_submitting')
+    assert len(attempts) == 2
+    assert app.room_store.session('cas3').submissions
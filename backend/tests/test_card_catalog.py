@@ -0,0 +1,28 @@
+import json
+
+from card_catalog import CardCatalog, LOCAL_IMAGE_URL
+from ai_engine import AIEngine
+
+
+def write_card_list(tmp_path, ids):
+    path = tmp_path / 'card_list.json'
+    path.write_text(json.dumps(ids), encoding='utf-8')
+    return str(path)
+
+
+def test_catalog_without_external_url_uses_local_static(tmp_path):
+    catalog = CardCatalog(write_card_list(tmp_path, ['card_001.webp']), str(tmp_path / 'cards'), None)
+    assert catalog.url('card_001.webp') == f"{LOCAL_IMAGE_URL}/card_001.webp"
+    assert catalog.url('unknown.png') == f"{LOCAL_IMAGE_URL}/unknown.png"
+
+
+def test_catalog_strips_trailing_slash(tmp_path):
+    catalog = CardCatalog(write_card_list(tmp_path, ['a.png']), str(tmp_path / 'cards'), 'https://cdn.example.com/deck/')
+    assert catalog.url('a.png') == 'https://cdn.example.com/deck/a.png'
+
+
+def test_engine_accepts_no_external_url(tmp_path):
+    engine = AIEngine(card_list_file=write_card_list(tmp_path, ['card_001.webp', 'card_002.webp']),
+                      static_cards_path=str(tmp_path / 'cards'), word_pool=['사랑'], external_image_url=None)
+    assert engine.card_catalog.ids == ('card_001.webp', 'card_002.webp')
+    assert engine.card_catalog.url('card_001.webp').startswith(LOCAL_IMAGE_URL)
@@ -0,0 +1,79 @@
+import threading
+import time
+
+import fakeredis
+import pytest
+
+from disconnect_reaper import DisconnectReaper, PENDING_KEY, pending_member
+
+
+def spawn(target, *args):
+    thread = threading.Thread(target=target, args=args, daemon=True)
+    thread.start()
+    return thread
+
+
+def wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def make_reaper(server, grace, expired):
+    """워커 하나의 reaper (자기 Redis 연결). 처리한 (방, 유저)를 expired에 기록합니다."""
+    client = fakeredis.FakeStrictRedis(server=server, decode_responses=True)
+    return DisconnectReaper(client, spawn, time.sleep, grace=grace, interval=0.01, batch=7,
+                            on_expired=lambda room_id, user_id: expired.append((room_id, user_id)))
+
+
+def test_reconnect_within_grace_cancels_reap(server):
+    expired = []
+    reaper = make_reaper(server, 0.05, expired)
+    reaper.schedule('1234', 'u1')
+    reaper.schedule('1234', 'u2')
+    reaper.cancel('1234', 'u1')  # u1은 유예 중에 다시 접속
+
+    time.sleep(0.1)
+    assert reaper.reap_due() == 1
+    assert expired == [('1234', 'u2')]
+    assert reaper.pending() == 0
+    assert reaper.status()['cancelled'] == 1
+
+
+def test_expired_entry_is_reaped_once_across_workers(server):
+    expired = []
+    a = make_reaper(server, 0.0, expired)
+    b = make_reaper(server, 0.0, expired)
+    members = [('1234', f"u{n}") for n in range(50)]
+    for room_id, user_id in members:
+        (a if int(user_id[1:]) % 2 else b).schedule(room_id, user_id)
+
+    a.start()
+    b.start()
+
+    assert wait_for(lambda: len(expired) >= len(members) and a.pending() == 0)
+    time.sleep(0.05)
+    assert sorted(expired) == sorted(members)
+    assert a.status()['expired'] + b.status()['expired'] == len(members)
+
+
+@pytest.mark.parametrize('status', ['waiting', 'playing'])
+def test_host_passes_to_a_connected_human_when_host_is_reaped(app_module, status):
+    app, room_id = app_module, f"reap-{status}"
+    app.room_store.write(room_id, room={'status': status, 'phase': 'result', 'host_id': 'h0'})
+    app.room_store.add_player(room_id, {'user_id': 'h0', 'username': 'H0', 'joined_at': 1, 'connected': False})
+    app.room_store.add_player(room_id, {'user_id': 'ai', 'username': 'AI', 'joined_at': 2, 'is_ai': True})
+    app.room_store.add_player(room_id, {'user_id': 'h1', 'username': 'H1', 'joined_at': 3, 'connected': True})
+
+    app.redis_client.zadd(PENDING_KEY, {pending_member(room_id, 'h0'): 0})  # 유예 시간이 이미 지남
+    app.disconnect_reaper.reap_due()
+
+    assert wait_for(lambda: app.room_store.get_room_field(room_id, 'host_id') == 'h1')
+    leaver = app.room_store.get_player(room_id, 'h0')
+    if status == 'waiting':
+        assert leaver is None  # 대기실이면 내보냄
+    else:
+        assert leaver['is_ai'] is True and leaver['username'] == 'H0 (AI)'  # 게임 중이면 AI로 전환
@@ -0,0 +1,47 @@
+import json
+import queue
+import logging
+
+from logs import RateLimitFilter, StructuredFormatter, _ContextQueueHandler, log_context
+
+
+def make_record(msg, room=None, args=()):
+    record = logging.LogRecord('mindsync.test', logging.DEBUG, __file__, 1, msg, args, None)
+    if room:
+        record.room = room
+    return record
+
+
+def test_rate_limit_drops_past_limit_per_template_and_room(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('logs.time.monotonic', lambda: now[0])
+    limiter = RateLimitFilter(limit=2, per=10.0)
+
+    passed = [limiter.filter(make_record('tick %s', room='1234')) for _ in range(5)]
+    assert passed == [True, True, False, False, False]
+    # 다른 방, 다른 템플릿은 따로 셈
+    assert limiter.filter(make_record('tick %s', room='5678'))
+    assert limiter.filter(make_record('tock %s', room='1234'))
+
+    now[0] += 10.0
+    record = make_record('tick %s', room='1234')
+    assert limiter.filter(record)
+    assert record.suppressed == 3
+
+
+def test_queue_handler_keeps_room_and_user_context():
+    records = queue.Queue()
+    logger = logging.getLogger('mindsync_test.logs')
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(_ContextQueueHandler(records))
+
+    with log_context(room='1234', user='u1', event=None):
+        logger.info("voted for %s", 'c1')
+
+    record = records.get_nowait()
+    assert (record.msg, record.args) == ('voted for c1', None)
+    assert (record.room, record.user) == ('1234', 'u1')
+    assert not hasattr(record, 'event')
+    entry = json.loads(StructuredFormatter(json_output=True).format(record))
+    assert entry['msg'] == 'voted for c1' and entry['room'] == '1234' and entry['user'] == 'u1'
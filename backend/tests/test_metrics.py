@@ -0,0 +1,59 @@
+import time
+
+from metrics import Counter, Histogram, Metrics
+
+
+def test_counter_renders_prometheus_text():
+    counter = Counter('mindsync_events_total', 'Events handled', ('event', 'outcome'))
+    counter.inc(('join_game', 'ok'))
+    counter.inc(('join_game', 'ok'), 2)
+    counter.inc(('say "hi"', 'error'))
+
+    assert counter.render() == [
+        '# HELP mindsync_events_total Events handled',
+        '# TYPE mindsync_events_total counter',
+        'mindsync_events_total{event="join_game",outcome="ok"} 3',
+        'mindsync_events_total{event="say \\"hi\\"",outcome="error"} 1',
+    ]
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram('mindsync_latency_seconds', 'Latency', ('event',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, ('vote',))
+
+    assert histogram.render() == [
+        '# HELP mindsync_latency_seconds Latency',
+        '# TYPE mindsync_latency_seconds histogram',
+        'mindsync_latency_seconds_bucket{event="vote",le="0.1"} 2',
+        'mindsync_latency_seconds_bucket{event="vote",le="1.0"} 3',
+        'mindsync_latency_seconds_bucket{event="vote",le="+Inf"} 4',
+        'mindsync_latency_seconds_sum{event="vote"} 3.65',
+        'mindsync_latency_seconds_count{event="vote"} 4',
+    ]
+
+
+def test_instrumented_methods_report_latency_and_in_flight():
+    class Engine:
+        def get_best_card(self, seen):
+            seen.append(metrics.render())
+            return 'c1'
+
+    metrics = Metrics()
+    engine = Engine()
+    metrics.instrument_methods(engine, ['get_best_card'])
+    seen = []
+
+    assert engine.get_best_card(seen) == 'c1'
+    assert 'mindsync_ai_calls_in_flight 1' in seen[0].splitlines()
+    text = metrics.render().splitlines()
+    assert 'mindsync_ai_calls_in_flight 0' in text
+    assert 'mindsync_ai_call_duration_seconds_count{method="get_best_card"} 1' in text
+
+
+def test_tracked_block_counts_event_outcome():
+    metrics = Metrics()
+    with metrics.track('flush_state'):
+        time.sleep(0)
+
+    assert 'mindsync_events_total{event="flush_state",outcome="ok"} 1' in metrics.render().splitlines()
@@ -0,0 +1,64 @@
+import pytest
+
+from room_directory import RoomDirectory, CREATED_KEY
+from room_store import RoomStore
+
+
+@pytest.fixture
+def directory(redis_client):
+    return RoomDirectory(redis_client, max_players=6)
+
+
+def make_room(redis_client, directory, room_id, created, players, host='u0'):
+    store = RoomStore(redis_client)
+    store.write(room_id, room={'name': f"room {room_id}", 'status': 'waiting', 'host_id': host})
+    for n in range(players):
+        store.add_player(room_id, {'user_id': f"u{n}", 'username': f"user {n}"})
+    redis_client.zadd(CREATED_KEY, {room_id: created})  # 생성 시각을 고정해 동점을 만듦
+    assert directory.refresh(room_id) == 1
+
+
+def page_through(directory, sort, limit):
+    ids, cursor = [], None
+    while True:
+        page = directory.list(status='waiting', sort=sort, limit=limit, cursor=cursor)
+        ids += [room['id'] for room in page['rooms']]
+        cursor = page['next_cursor']
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.parametrize('sort', ['created', 'players'])
+def test_cursor_paging_with_tied_scores_visits_each_room_once(redis_client, directory, sort):
+    # 생성 시각 3종 × 인원 2종: 두 정렬 모두 같은 점수의 방이 여러 페이지에 걸쳐 있음
+    rooms = {f"{n:04d}": (1000 + n % 3, 1 + n % 2) for n in range(23)}
+    for room_id, (created, players) in rooms.items():
+        make_room(redis_client, directory, room_id, created, players)
+
+    ids = page_through(directory, sort, limit=4)
+
+    def score(room_id):
+        created, players = rooms[room_id]
+        return created if sort == 'created' else players * 10 ** 13 + created
+    assert ids == sorted(rooms, key=lambda room_id: (score(room_id), room_id), reverse=True)
+
+
+def test_summary_follows_host_and_capacity(redis_client, directory):
+    make_room(redis_client, directory, '1234', 1000, 6)
+    assert directory.list(status='full')['rooms'][0]['host'] == 'user 0'
+
+    RoomStore(redis_client).update_room('1234', {'host_id': 'u3'})
+    assert directory.refresh('1234') == 1
+    assert directory.list(status='full')['rooms'][0]['host'] == 'user 3'
+    # 방장을 읽은 뒤 바뀌었으면 쓰지 않음
+    assert directory._run_refresh('1234', 'u0') == -1
+    assert directory.counts() == {'waiting': 0, 'full': 1, 'playing': 0, 'finished': 0}
+
+
+def test_refresh_of_missing_room_drops_it(redis_client, directory):
+    make_room(redis_client, directory, '1234', 1000, 1)
+    redis_client.delete('room:1234')
+
+    assert directory.refresh('1234') == 0
+    assert directory.list()['rooms'] == []
+    assert directory.counts()['waiting'] == 0
@@ -0,0 +1,39 @@
+from room_ids import RoomIdAllocator, count_key
+
+
+def test_claims_are_unique_and_widen_at_max_load(redis_client):
+    allocator = RoomIdAllocator(redis_client, min_length=3, max_length=4, max_load=0.9)
+
+    codes = [allocator.claim() for _ in range(1000)]
+
+    assert len(set(codes)) == 1000
+    assert sum(len(code) == 3 for code in codes) == 900
+    assert sum(len(code) == 4 for code in codes) == 100
+    assert codes.index(next(code for code in codes if len(code) == 4)) == 900
+    assert allocator.stats['widened'] == 1
+
+
+def test_release_is_idempotent_and_frees_the_short_length(redis_client):
+    allocator = RoomIdAllocator(redis_client, min_length=3, max_length=4, max_load=0.9)
+    codes = [allocator.claim() for _ in range(900)]
+    assert len(allocator.claim()) == 4
+
+    assert allocator.release(codes[0]) is True
+    assert allocator.release(codes[0]) is False
+    assert allocator.release('not-a-code') is False
+    assert redis_client.get(count_key(3)) == '899'
+    assert allocator.stats['released'] == 1
+
+    assert len(allocator.claim()) == 3
+
+
+def test_code_of_existing_room_is_skipped(redis_client, monkeypatch):
+    allocator = RoomIdAllocator(redis_client, min_length=3, max_length=3)
+    monkeypatch.setattr('room_ids.random.random', lambda: 0.0)  # 항상 가장 앞의 빈 코드
+    # 비트맵 밖에서 만들어진 방(이전 버전 등)이 000~007을 쓰고 있음
+    for n in range(8):
+        redis_client.hset(f"room:{n:03d}", 'status', '"waiting"')
+
+    assert allocator.claim() == '008'
+    assert allocator.stats['collisions'] == 8
+    assert allocator.claim() == '009'
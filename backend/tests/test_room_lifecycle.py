@@ -0,0 +1,40 @@
+import time
+
+import fakeredis
+
+from room_lifecycle import RoomLifecycle, ACTIVE_ROOMS_KEY
+
+
+def make_lifecycle(**kwargs):
+    client = fakeredis.FakeStrictRedis(decode_responses=True)
+    reaped = []
+    lifecycle = RoomLifecycle(client, spawn=None, sleep=lambda seconds: None,
+                              on_reaped=lambda room_id, owner_id: reaped.append(room_id), **kwargs)
+    return client, lifecycle, reaped
+
+
+def test_one_sweep_covers_every_room_in_batches():
+    client, lifecycle, reaped = make_lifecycle(batch=50)
+    # 방 해시가 이미 만료된(=정리 대상) 방 1000개
+    client.sadd(ACTIVE_ROOMS_KEY, *[f"{i:04d}" for i in range(1000)])
+
+    lifecycle.sweep()
+
+    assert len(reaped) == 1000
+    assert client.scard(ACTIVE_ROOMS_KEY) == 0
+    assert lifecycle.stats['batches'] > 3
+    assert lifecycle.stats['passes'] == 3
+
+
+def test_sweep_stops_at_budget_and_resumes_next_interval():
+    client, lifecycle, reaped = make_lifecycle(batch=10, budget=0.0)
+    client.sadd(ACTIVE_ROOMS_KEY, *[f"{i:04d}" for i in range(200)])
+
+    lifecycle.sweep()
+    first = len(reaped)
+    assert 0 < first < 200
+
+    deadline = time.monotonic() + 5
+    while len(reaped) < 200 and time.monotonic() < deadline:
+        lifecycle.sweep()
+    assert len(reaped) == 200
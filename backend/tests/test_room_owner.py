@@ -0,0 +1,87 @@
+import time
+import threading
+
+import fakeredis
+
+from room_owner import RoomOwnership, owner_key
+
+
+def spawn(target, *args):
+    thread = threading.Thread(target=target, args=args, daemon=True)
+    thread.start()
+    return thread
+
+
+def wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def make_worker(server, worker_id, ttl=15.0, start=True):
+    """워커 하나 = 자기 Redis 연결 + worker_id + 리스너. 받은 메시지/넘겨받은 방을 기록합니다."""
+    client = fakeredis.FakeStrictRedis(server=server, decode_responses=True)
+    worker = RoomOwnership(client, spawn, time.sleep, worker_id=worker_id, ttl=ttl)
+    worker.received, worker.adopted = [], []
+    worker._on_message = worker.received.append
+    worker._on_adopt = worker.adopted.append
+    if start:
+        worker.start()
+    return worker
+
+
+def subscribed(worker):
+    return worker.redis.pubsub_numsub(f"worker:{worker.worker_id}")[0][1] > 0
+
+
+def test_task_dispatched_on_non_owner_runs_on_owner(server):
+    a = make_worker(server, 'worker-a')
+    b = make_worker(server, 'worker-b')
+    assert wait_for(lambda: subscribed(a) and subscribed(b))
+
+    assert a.claim('1234') == (True, None)
+    owned, owner_id = b.claim('1234')
+    assert not owned and owner_id == 'worker-a'
+
+    assert b.forward(owner_id, {'room_id': '1234', 'kind': 'ai'}) is True
+    assert wait_for(lambda: a.received)
+    assert a.received == [{'room_id': '1234', 'kind': 'ai', 'hops': 1}]
+    assert b.received == []
+
+
+def test_other_worker_adopts_room_after_lease_expires(server):
+    # a는 lease를 잡은 뒤 죽은 워커 (heartbeat 없음)
+    a = make_worker(server, 'worker-a', ttl=0.3, start=False)
+    assert a.claim('1234') == (True, None)
+    b = make_worker(server, 'worker-b', ttl=0.3)
+
+    assert wait_for(lambda: b.adopted == ['1234'])
+    assert b.redis.get(owner_key('1234')) == 'worker-b'
+    assert b.owns('1234')
+    assert a.claim('1234') == (False, 'worker-b')
+
+
+def test_forward_to_worker_without_subscriber_takes_over(server):
+    a = make_worker(server, 'worker-a', start=False)  # 재시작 등으로 채널을 구독하는 프로세스가 없음
+    assert a.claim('1234') == (True, None)
+    b = make_worker(server, 'worker-b')
+
+    assert b.forward('worker-a', {'room_id': '1234', 'kind': 'state'}) is False
+    assert b.redis.get(owner_key('1234')) == 'worker-b'
+    assert b.adopted == ['1234']
+    assert b.stats['taken_over'] == 1
+
+
+def test_release_all_lets_another_worker_claim_immediately(server):
+    a = make_worker(server, 'worker-a', start=False)
+    b = make_worker(server, 'worker-b', start=False)
+    for room_id in ('1111', '2222'):
+        assert a.claim(room_id) == (True, None)
+
+    assert a.release_all() == 2
+    assert a.owned_rooms() == []
+    assert b.claim('1111') == (True, None)
+    assert b.claim('2222') == (True, None)
@@ -0,0 +1,105 @@
+import threading
+
+import pytest
+
+from room_store import RoomStore, room_key, submissions_key, votes_key
+
+
+@pytest.fixture
+def store(redis_client):
+    return RoomStore(redis_client)
+
+
+def make_room(store, phase, audience=('p0', 'p1', 'p2'), limit=1):
+    """이야기꾼 s + 청중. 이야기꾼 카드는 이미 제출된 상태."""
+    store.write('1234', room={'phase': phase, 'storyteller_id': 's', 'storyteller_card_id': 'sc',
+                              'audience_card_limit': limit, 'voting_closed': False})
+    for uid in ('s',) + tuple(audience):
+        store.add_player('1234', {'user_id': uid, 'username': uid})
+    store.redis.hset(submissions_key('1234'), 'sc', '{"user_id": "s", "card_id": "sc"}')
+
+
+def submit(store, user_id, card_id):
+    return store.submit_card('1234', user_id, {'user_id': user_id, 'card_id': card_id}, seed=7)['status']
+
+
+def test_submit_over_limit_is_rejected(store):
+    make_room(store, 'audience_submitting', limit=1)
+
+    assert submit(store, 'p0', 'c1') == 'submitted'
+    assert submit(store, 'p0', 'c2') == 'limit'
+    assert store.redis.hlen(submissions_key('1234')) == 2
+    assert store.session('1234').players['p0']['submitted_count'] == 1
+
+
+def test_interleaved_submits_move_to_voting_exactly_once(store):
+    audience = tuple(f"p{i}" for i in range(6))
+    make_room(store, 'audience_submitting', audience=audience, limit=2)
+    statuses = []
+    start = threading.Barrier(len(audience))
+
+    def play(uid):
+        start.wait()
+        for n in range(3):  # 제한보다 한 장 더
+            statuses.append(submit(store, uid, f"{uid}-{n}"))
+
+    threads = [threading.Thread(target=play, args=(uid,)) for uid in audience]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert statuses.count('voting') == 1
+    assert statuses.count('submitted') + statuses.count('waiting') == 2 * len(audience) - 1
+    session = store.session('1234')
+    assert session.room['phase'] == 'voting'
+    assert len(session.room['voting_candidates']) == 2 * len(audience) + 1
+
+
+def test_last_vote_alone_returns_result(store):
+    make_room(store, 'voting')
+
+    statuses = [store.submit_vote('1234', uid, 'sc')['status'] for uid in ('p0', 'p1', 'p2')]
+    assert statuses == ['voted', 'voted', 'result']
+    assert store.submit_vote('1234', 'p2', 'sc')['status'] == 'phase'
+    assert store.session('1234').room['voting_closed'] is True
+
+
+def test_storyteller_cannot_vote(store):
+    make_room(store, 'voting')
+
+    assert store.submit_vote('1234', 's', 'sc')['status'] == 'storyteller'
+    assert store.redis.hlen(votes_key('1234')) == 0
+
+
+def test_commit_with_stale_rev_is_rejected(store):
+    make_room(store, 'result')
+    session = store.session('1234')
+    store.update_player('1234', 'p0', {'score': 5})  # 다른 요청이 먼저 기록
+
+    session.set_room(phase='storyteller_choosing')
+    assert session.commit() is False
+    assert store.get_room_field('1234', 'phase') == 'result'
+
+    fresh = store.session('1234')
+    fresh.set_room(phase='storyteller_choosing')
+    assert fresh.commit() is True
+    assert store.redis.hget(room_key('1234'), 'phase') == '"storyteller_choosing"'
+
+
+def test_commit_applies_every_staged_command(store):
+    make_room(store, 'result')
+    session = store.session('1234')
+    session.incr_player('p0', 'score', 3)
+    session.set_player('p0', last_gained_score=3)
+    session.set_hand('p1', [{'id': 'c9'}])
+    session.remove_player('p2')
+    session.clear_round()
+
+    assert session.commit() is True
+    fresh = store.session('1234')
+    assert fresh.rev == session.rev
+    assert fresh.players['p0']['score'] == 3 and fresh.players['p0']['last_gained_score'] == 3
+    assert fresh.players['p1']['hand'] == [{'id': 'c9'}]
+    assert 'p2' not in fresh.players and not store.redis.exists('room:1234:player:p2')
+    assert fresh.submissions == {}
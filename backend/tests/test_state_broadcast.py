@@ -0,0 +1,34 @@
+from state_broadcast import StateBroadcaster
+
+
+def make_broadcaster():
+    sent = []
+    # 손패 전송(hand_update)은 빼고 방 상태 전송만 기록
+    broadcaster = StateBroadcaster(
+        lambda event, payload, room: event != 'hand_update' and sent.append((event, payload)))
+    return broadcaster, sent
+
+
+def users(score):
+    return [{'user_id': 'u1', 'username': 'A', 'score': score, 'hand': []}]
+
+
+def test_older_rev_is_not_published_after_newer():
+    broadcaster, sent = make_broadcaster()
+    assert broadcaster.publish('1234', {'phase': 'voting'}, users(0), rev=5)
+    assert broadcaster.publish('1234', {'phase': 'result'}, users(3), rev=7)
+    # rev 6에서 먼저 읽은 상태가 늦게 도착
+    assert not broadcaster.publish('1234', {'phase': 'voting'}, users(0), rev=6)
+    assert not broadcaster.publish('1234', {'phase': 'result'}, users(3), rev=7)
+
+    assert [event for event, _ in sent] == ['state_snapshot', 'state_patch']
+    assert sent[-1][1]['room'] == {'phase': 'result'}
+    assert broadcaster.status()['stale'] == 2
+
+
+def test_forget_resets_rev():
+    broadcaster, sent = make_broadcaster()
+    broadcaster.publish('1234', {'phase': 'result'}, users(3), rev=9)
+    broadcaster.forget('1234')
+    assert broadcaster.publish('1234', {'phase': 'voting'}, users(0), rev=2)
+    assert sent[-1][0] == 'state_snapshot'
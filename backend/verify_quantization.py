@@ -0,0 +1,194 @@
+"""
+[Verification] 양자화 임베딩(float16 / int8) 정확도 검증 스크립트
+
+float32 임베딩 아티팩트를 기준으로 각 정밀도의 엔진을 메모리에서 구성한 뒤,
+전체 카드×단어 공간에서 AI 의사결정 함수를 재실행해 기준과 달라지는 결정을 셉니다.
+    - get_best_card: 모든 단어 × 손패 크기 단위로 나눈 덱 (--hand-size)
+    - get_voted_card: 모든 단어 × 투표 후보 묶음 (--vote-size, 첫 카드는 본인 카드로 제외)
+    - storyteller: 모든 카드×단어 칸의 구간(sweet spot / too obvious / too unrelated) 소속과
+      카드별 후보 단어 묶음에 대한 analyze_storyteller_candidates (같은 seed로 비교)
+
+사용법:
+    python build_embeddings.py                      # float32 아티팩트가 먼저 필요
+    python verify_quantization.py [--dtypes float16,int8] [--output report.json] [--tolerance 0.01]
+
+결정 변화율이 --tolerance를 넘는 정밀도가 있으면 종료 코드 1을 반환합니다.
+"""
+import os
+import sys
+import json
+import random
+import argparse
+import contextlib
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# app.py의 EXTERNAL_IMAGE_URL과 동일한 기본값
+DEFAULT_IMAGE_URL = os.getenv('EXTERNAL_IMAGE_URL', "https://luke-woojudaddy.github.io/Mind_Sync/decks/deck1")
+MAX_EXAMPLES = 5
+
+
+def chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size) if len(items[i:i + size]) > 1]
+
+
+def make_engine(args):
+    from words import WORD_POOL
+    from ai_engine import AIEngine
+    return AIEngine(
+        card_list_file=args.card_list,
+        static_cards_path=args.cards_dir,
+        word_pool=WORD_POOL,
+        external_image_url=DEFAULT_IMAGE_URL
+    )
+
+
+class Tally:
+    """결정 비교 결과 (총 횟수, 달라진 횟수, 예시 몇 개)."""
+
+    def __init__(self):
+        self.total = 0
+        self.diffs = 0
+        self.examples = []
+
+    def add(self, expected, actual, context):
+        self.total += 1
+        if expected != actual:
+            self.diffs += 1
+            if len(self.examples) < MAX_EXAMPLES:
+                self.examples.append({'context': context, 'float32': expected, 'quantized': actual})
+
+    def report(self):
+        rate = self.diffs / self.total if self.total else 0.0
+        return {'total': self.total, 'diffs': self.diffs, 'rate': round(rate, 6), 'examples': self.examples}
+
+
+def compare(base, variant, meta, args):
+    """기준(float32) 엔진과 양자화 엔진의 결정을 비교합니다."""
+    rng = random.Random(args.seed)
+    card_ids = list(meta['card_ids'])
+    rng.shuffle(card_ids)
+    words = list(base.word_keys)
+
+    best, vote, bands, story = Tally(), Tally(), Tally(), Tally()
+    hands = chunks(card_ids, args.hand_size)
+    votes = chunks(card_ids, args.vote_size)
+
+    for word in words:
+        for hand in hands:
+            hand_list = [{'id': c} for c in hand]
+            best.add(base.get_best_card(word, hand_list), variant.get_best_card(word, hand_list), [word, hand])
+        for group in votes:
+            candidates = [{'user_id': i, 'card_id': c} for i, c in enumerate(group)]
+            vote.add(base.get_voted_card(word, candidates, group[0]),
+                     variant.get_voted_card(word, candidates, group[0]), [word, group])
+
+    band_names = ('sweet_spot_words', 'obvious_words', 'unrelated_words')
+    for row in range(len(base.score_table)):
+        for name in band_names:
+            expected, actual = getattr(base, name)[row], getattr(variant, name)[row]
+            bands.total += len(words)
+            changed = expected ^ actual
+            bands.diffs += len(changed)
+            for col in sorted(changed)[:MAX_EXAMPLES - len(bands.examples)]:
+                bands.examples.append({'context': [name, meta['cards'][row], words[col]],
+                                       'float32': col in expected, 'quantized': col in actual})
+
+    for card_id in card_ids:
+        pool = words[:]
+        rng.shuffle(pool)
+        for candidates in chunks(pool, args.candidate_count):
+            seed = rng.random()
+            random.seed(seed)
+            expected = base.analyze_storyteller_candidates(card_id, candidates)
+            random.seed(seed)
+            actual = variant.analyze_storyteller_candidates(card_id, candidates)
+            story.add(list(expected), list(actual), [card_id, candidates])
+
+    return {'get_best_card': best.report(), 'get_voted_card': vote.report(),
+            'storyteller_bands': bands.report(), 'analyze_storyteller_candidates': story.report()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay AI decisions on quantized embeddings and report diffs vs float32.")
+    parser.add_argument('--cache-dir', default=None, help="float32 artifact directory (default: AI_CACHE_DIR or backend/)")
+    parser.add_argument('--card-list', default=os.path.join(BASE_DIR, 'card_list.json'))
+    parser.add_argument('--cards-dir', default=os.path.join(BASE_DIR, 'static', 'cards'))
+    parser.add_argument('--dtypes', default='float16,int8')
+    parser.add_argument('--hand-size', type=int, default=7)
+    parser.add_argument('--vote-size', type=int, default=6)
+    parser.add_argument('--candidate-count', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--tolerance', type=float, default=0.01, help="max allowed decision change rate")
+    parser.add_argument('--output', default=None, help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    if args.cache_dir:
+        os.environ['AI_CACHE_DIR'] = os.path.abspath(args.cache_dir)
+    os.environ['AI_EMBEDDING_DTYPE'] = 'float32'
+    from ai_engine import EMBEDDING_DTYPES, SCORE_DTYPES
+
+    dtypes = [d.strip() for d in args.dtypes.split(',') if d.strip()]
+    unknown = [d for d in dtypes if d not in EMBEDDING_DTYPES]
+    if unknown:
+        print(f"❌ [Verify] Unsupported dtype(s): {unknown}")
+        return 2
+
+    base = make_engine(args)
+    meta, matrix, scales, scores = base._open_cache()
+    if meta['dtype'] != 'float32' or scores is None:
+        print(f"❌ [Verify] Need a float32 artifact with a score table (found {meta['dtype']}). Run build_embeddings.py first.")
+        return 2
+    # 로그 출력은 결정 하나마다 찍히므로 비교 중에는 버립니다
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        base._index_cache(meta, matrix, scales, scores)
+        base.is_ready = True
+
+    report = {
+        'cards': len(meta['cards']),
+        'words': len(meta['words']),
+        'dim': int(meta['dim']),
+        'float32': {'matrix_bytes': int(matrix.nbytes), 'score_bytes': int(scores.nbytes)},
+    }
+    failed = []
+    for dtype in dtypes:
+        print(f"🔍 [Verify] Replaying decisions with {dtype}...")
+        stored, row_scales = base._quantize_rows(matrix, dtype)
+        table = np.ascontiguousarray(scores, dtype=SCORE_DTYPES[dtype])
+        variant = make_engine(args)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            variant._index_cache(meta, stored, row_scales, table)
+            variant.is_ready = True
+            result = compare(base, variant, meta, args)
+
+        restored = base._dequantize_rows(stored, row_scales)
+        n_words = len(meta['words'])
+        errors = np.abs(restored[n_words:] @ restored[:n_words].T - np.asarray(scores))
+        result['matrix_bytes'] = int(stored.nbytes + (row_scales.nbytes if row_scales is not None else 0))
+        result['score_bytes'] = int(table.nbytes)
+        result['score_error'] = {'max': float(errors.max()) if errors.size else 0.0,
+                                 'mean': float(errors.mean()) if errors.size else 0.0}
+        report[dtype] = result
+
+        worst = max(result[k]['rate'] for k in ('get_best_card', 'get_voted_card', 'storyteller_bands',
+                                                 'analyze_storyteller_candidates'))
+        status = '✅' if worst <= args.tolerance else '❌'
+        if worst > args.tolerance:
+            failed.append(dtype)
+        print(f"{status} [Verify] {dtype}: matrix {result['matrix_bytes'] // 1024} KiB "
+              f"(float32 {report['float32']['matrix_bytes'] // 1024} KiB), "
+              f"max score error {result['score_error']['max']:.4f}")
+        for key in ('get_best_card', 'get_voted_card', 'storyteller_bands', 'analyze_storyteller_candidates'):
+            r = result[key]
+            print(f"   {key}: {r['diffs']}/{r['total']} changed ({r['rate']:.4%})")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📝 [Verify] Report written to {args.output}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
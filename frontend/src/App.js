@@ -21,6 +21,8 @@ const socket = io(SERVER_URL, {
     autoConnect: false,
 });
 
+// [State Sync] 스냅샷 재요청 후 이 시간 안에 도착하지 않으면 다음 patch에서 다시 요청
+const SYNC_RETRY_MS = 3000;
 const TUTORIAL_BASE_URL = "https://cdn.jsdelivr.net/gh/luke-woojudaddy/Mind_Sync@main/frontend/public/assets/tutorial/";
 
 // --- Language Toggle Component (Fixed) ---
@@ -230,6 +232,8 @@ function App() {
     const [isLoading, setIsLoading] = useState(false);
 
     const prevPhaseRef = useRef(null);
+    // [State Sync] 서버 상태 사본 (버전 patch 적용용)
+    const syncRef = useRef({ version: 0, room: null, users: {}, order: [], pending: false });
     const [zoomCard, setZoomCard] = useState(null);
     const [confirmedCard, setConfirmedCard] = useState(null);
     const [selectedWord, setSelectedWord] = useState(null);
@@ -339,21 +343,13 @@ function App() {
     };
 
     useEffect(() => {
-        socket.on('update_user_list', (data) => {
-            setUsers(data.users);
-            const me = data.users.find(u => u.user_id === sessionStorage.getItem('mind_sync_user_id'));
-            if (me) {
-                if (me.hand) setMyHand(me.hand);
-                setMySubmitCount(me.submitted_count || 0);
-                setAmISubmitted(me.submitted || false);
-                setAmIVoted(me.voted || false);
-            }
-        });
-
-        socket.on('game_state_update', (data) => {
+        // [State Sync] 스냅샷/patch로 맞춘 서버 상태를 화면 상태에 반영
+        const applyServerState = () => {
+            const { room, users: userMap, order } = syncRef.current;
+            const userList = order.map(uid => userMap[uid]).filter(Boolean);
             setIsLoading(false); // [속도 개선] 데이터 수신 시 로딩 해제
-            setUsers(data.users);
-            const currentPhase = data.room.phase;
+            setUsers(userList);
+            const currentPhase = room.phase;
 
             // 단계 변경 시 처리
             if (prevPhaseRef.current !== currentPhase) {
@@ -374,33 +370,86 @@ function App() {
 
                 if (currentPhase === 'result') {
                     setResultDelayCount(7);
-                    determineResultMessage(data.room, data.users);
+                    determineResultMessage(room, userList);
                 }
             }
 
-            setRoomState(data.room);
+            setRoomState(room);
             prevPhaseRef.current = currentPhase;
 
-            const me = data.users.find(u => u.user_id === sessionStorage.getItem('mind_sync_user_id'));
+            const me = userMap[sessionStorage.getItem('mind_sync_user_id')];
             if (me) {
-                if (me.hand) setMyHand(me.hand);
                 setMySubmitCount(me.submitted_count || 0);
                 setAmISubmitted(me.submitted || false);
                 setAmIVoted(me.voted || false);
             }
-            if (data.room.audience_card_limit) {
-                setTargetSubmitCount(data.room.audience_card_limit);
+            if (room.audience_card_limit) {
+                setTargetSubmitCount(room.audience_card_limit);
             }
 
             // [중요] 게임 중이라면 view 강제 전환
-            if (view !== 'game' && data.room.status === 'playing') {
+            if (view !== 'game' && room.status === 'playing') {
                 setView('game');
-            } else if (view === 'lobby' && data.room.status === 'waiting') {
+            } else if (view === 'lobby' && room.status === 'waiting') {
                 // 로비에서 대기실로 복구
                 setView('waiting');
             }
+        };
+
+        const requestSync = () => {
+            const sync = syncRef.current;
+            sync.pending = true;
+            clearTimeout(sync.retryTimer);
+            // 응답이 없거나 서버가 거절(false)하면 pending을 풀어 다음 patch에서 다시 요청
+            sync.retryTimer = setTimeout(() => { syncRef.current.pending = false; }, SYNC_RETRY_MS);
+            socket.emit('sync_state', {}, (ok) => {
+                if (ok === false) {
+                    clearTimeout(syncRef.current.retryTimer);
+                    syncRef.current.pending = false;
+                }
+            });
+        };
+
+        socket.on('state_snapshot', (data) => {
+            clearTimeout(syncRef.current.retryTimer);
+            syncRef.current = {
+                version: data.version,
+                room: data.room,
+                users: Object.fromEntries(data.users.map(u => [u.user_id, u])),
+                order: data.users.map(u => u.user_id),
+                pending: false,
+            };
+            if (data.hand) setMyHand(data.hand);
+            applyServerState();
+        });
+
+        socket.on('state_patch', (patch) => {
+            const sync = syncRef.current;
+            // 입장 직후에는 스냅샷이 곧 도착하므로 무시
+            if (sync.version === 0 || sync.pending) return;
+            if (patch.base !== sync.version) {
+                // 중간 patch를 놓친 경우 전체 스냅샷 재요청
+                requestSync();
+                return;
+            }
+            const users = { ...sync.users };
+            Object.entries(patch.users || {}).forEach(([uid, changes]) => {
+                users[uid] = { ...users[uid], ...changes };
+            });
+            (patch.users_removed || []).forEach(uid => delete users[uid]);
+            syncRef.current = {
+                ...sync,
+                version: patch.version,
+                room: { ...sync.room, ...(patch.room || {}) },
+                users,
+                order: patch.order || sync.order,
+            };
+            applyServerState();
         });
 
+        // [State Sync] 손패는 본인에게만 전송됨
+        socket.on('hand_update', (data) => setMyHand(data.hand));
+
         socket.on('timer_update', (data) => setTimeLeft(data.time));
 
         socket.on('notification', (data) => {
@@ -422,8 +471,10 @@ function App() {
         });
 
         return () => {
-            socket.off('update_user_list');
-            socket.off('game_state_update');
+            clearTimeout(syncRef.current.retryTimer);
+            socket.off('state_snapshot');
+            socket.off('state_patch');
+            socket.off('hand_update');
             socket.off('timer_update');
             socket.off('notification');
             socket.off('error');
@@ -534,7 +585,7 @@ function App() {
         setIsLoading(true);
         if (!socket.connected) socket.connect();
         socket.emit('join_game', { room_id: rId, user_id: uId, username: uName });
-        // 뷰 상태는 서버 응답(game_state_update)에서 처리됨
+        // 뷰 상태는 서버 응답(state_snapshot)에서 처리됨
     };
 
     const handleCreateRoom = async () => {